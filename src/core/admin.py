@@ -1,35 +1,90 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
+from modeltranslation.settings import AVAILABLE_LANGUAGES
+from modeltranslation.utils import build_localized_fieldname
 
 # Register your models here.
-from .models import (City, Country, CVLanguage, Education, EducationCourse,
-                     EducationDegree, EducationInstitution, Experience,
-                     ExperienceCompany, ExperienceRole, Language, Project,
-                     Role, Skill, SocialNetwork, State, User, UserLanguage,
-                     UserRole, UserSkill, UserSocialNetwork)
+from .forms import ReferenceChoiceField
+from .models import (City, Country, CVLanguage, CvJob, Education,
+                     EducationCourse, EducationDegree, EducationInstitution,
+                     Experience, ExperienceCompany, ExperienceRole, Language,
+                     Project, Role, Skill, SocialNetwork, State, User,
+                     UserLanguage, UserRole, UserSkill, UserSocialNetwork)
+from .references import REFERENCE_MODELS
+
+# Prefix search over every translation of `name`, indexed on PostgreSQL by migration 0013.
+TRANSLATED_NAME_SEARCH = [f'^{build_localized_fieldname("name", language)}' for language in AVAILABLE_LANGUAGES]
+
+# Tables this large are paginated with the planner's row estimate instead of COUNT(*).
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+  @cached_property
+  def count(self):
+    queryset = self.object_list
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+      with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+      if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+        return int(row[0])
+    return super().count
+
+
+class ModelAdmin(admin.ModelAdmin):
+  paginator = EstimatedCountPaginator
+  show_full_result_count = False
+  # Related fields whose choices need `select_related` to be labelled, by field name.
+  formfield_select_related = {}
+
+  def formfield_for_foreignkey(self, db_field, request, **kwargs):
+    if db_field.name in self.formfield_select_related:
+      kwargs['queryset'] = db_field.related_model.objects.select_related(*self.formfield_select_related[db_field.name])
+    # Plain selects of reference tables are filled from the per-worker reference cache.
+    elif (db_field.related_model in REFERENCE_MODELS
+          and db_field.name not in [*self.get_autocomplete_fields(request), *self.raw_id_fields]):
+      kwargs.setdefault('form_class', ReferenceChoiceField)
+    return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+  def formfield_for_manytomany(self, db_field, request, **kwargs):
+    if db_field.name in self.formfield_select_related:
+      kwargs['queryset'] = db_field.related_model.objects.select_related(*self.formfield_select_related[db_field.name])
+    return super().formfield_for_manytomany(db_field, request, **kwargs)
 
 
 @admin.register(EducationCourse)
-class EducationCourseAdmin(admin.ModelAdmin):
+class EducationCourseAdmin(ModelAdmin):
   list_display = ['name']
+  search_fields = TRANSLATED_NAME_SEARCH
   exclude = ['id']
 
 
 @admin.register(EducationDegree)
-class EducationDegreeAdmin(admin.ModelAdmin):
+class EducationDegreeAdmin(ModelAdmin):
   list_display = ['name']
+  search_fields = TRANSLATED_NAME_SEARCH
   exclude = ['id']
 
 
 @admin.register(EducationInstitution)
-class EducationInstitutionAdmin(admin.ModelAdmin):
+class EducationInstitutionAdmin(ModelAdmin):
   list_display = ['name', 'acronym', 'city']
+  list_select_related = ['city']
+  search_fields = TRANSLATED_NAME_SEARCH + ['^acronym']
+  autocomplete_fields = ['city']
   exclude = ['id']
 
 
 @admin.register(Experience)
-class ExperienceAdmin(admin.ModelAdmin):
+class ExperienceAdmin(ModelAdmin):
   list_display = ['user', 'company', 'role', 'description_display', 'start_date', 'end_date', 'created_at', 'updated_at']
+  list_select_related = ['user', 'company', 'role']
+  autocomplete_fields = ['user', 'company', 'role']
   exclude = ['id', 'created_at', 'updated_at']
 
   @admin.display(description=_('Description'))
@@ -38,20 +93,23 @@ class ExperienceAdmin(admin.ModelAdmin):
 
 
 @admin.register(ExperienceRole)
-class ExperienceRoleAdmin(admin.ModelAdmin):
+class ExperienceRoleAdmin(ModelAdmin):
   list_display = ['name']
+  search_fields = TRANSLATED_NAME_SEARCH
   exclude = ['id']
 
 
 @admin.register(Language)
-class LanguageAdmin(admin.ModelAdmin):
+class LanguageAdmin(ModelAdmin):
   list_display = ['name']
+  search_fields = TRANSLATED_NAME_SEARCH
   exclude = ['id']
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(ModelAdmin):
   list_display = ['name', 'description_display', 'start_date', 'end_date', 'created_at', 'updated_at']
+  autocomplete_fields = ['user']
   exclude = ['id', 'created_at', 'updated_at']
 
   @admin.display(description=_('Description'))
@@ -60,20 +118,24 @@ class ProjectAdmin(admin.ModelAdmin):
 
 
 @admin.register(Role)
-class RoleAdmin(admin.ModelAdmin):
+class RoleAdmin(ModelAdmin):
   list_display = ['name']
+  search_fields = TRANSLATED_NAME_SEARCH
   exclude = ['id']
 
 
 @admin.register(Skill)
-class SkillAdmin(admin.ModelAdmin):
+class SkillAdmin(ModelAdmin):
   list_display = ['name']
+  search_fields = TRANSLATED_NAME_SEARCH
   exclude = ['id']
 
 
 @admin.register(UserSkill)
-class UserSkillAdmin(admin.ModelAdmin):
+class UserSkillAdmin(ModelAdmin):
   list_display = ['user', 'skill', 'created_at', 'updated_at']
+  list_select_related = ['user', 'skill']
+  autocomplete_fields = ['user', 'skill']
   exclude = ['id', 'created_at', 'updated_at']
 
   @admin.display
@@ -82,8 +144,10 @@ class UserSkillAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserLanguage)
-class UserLanguageAdmin(admin.ModelAdmin):
+class UserLanguageAdmin(ModelAdmin):
   list_display = ['user', 'language', 'level_display', 'created_at', 'updated_at']
+  list_select_related = ['user', 'language']
+  autocomplete_fields = ['user', 'language']
   exclude = ['id', 'created_at', 'updated_at']
 
   @admin.display(description=_("Level"))
@@ -92,32 +156,40 @@ class UserLanguageAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserRole)
-class UserRoleAdmin(admin.ModelAdmin):
+class UserRoleAdmin(ModelAdmin):
   list_display = ['user', 'role', 'created_at', 'updated_at']
+  list_select_related = ['user', 'role']
+  autocomplete_fields = ['user', 'role']
   exclude = ['id', 'created_at', 'updated_at']
 
 
 @admin.register(UserSocialNetwork)
-class UserSocialNetworkAdmin(admin.ModelAdmin):
+class UserSocialNetworkAdmin(ModelAdmin):
   list_display = ['user', 'social_network', 'username']
+  list_select_related = ['user', 'social_network']
+  autocomplete_fields = ['user', 'social_network']
   exclude = ['id']
 
 
 @admin.register(SocialNetwork)
-class SocialNetworkAdmin(admin.ModelAdmin):
+class SocialNetworkAdmin(ModelAdmin):
   list_display = ['name', 'base_url', 'icon_url']
+  search_fields = ['^name']
   exclude = ['id']
 
 
 @admin.register(ExperienceCompany)
-class ExperienceCompanyAdmin(admin.ModelAdmin):
+class ExperienceCompanyAdmin(ModelAdmin):
   list_display = ['name']
+  search_fields = ['^name']
   exclude = ['id']
 
 
 @admin.register(Education)
-class EducationAdmin(admin.ModelAdmin):
+class EducationAdmin(ModelAdmin):
   list_display = ['user', 'institution', 'degree', 'course', 'date_range', 'created_at', 'updated_at']
+  list_select_related = ['user', 'institution', 'degree', 'course']
+  autocomplete_fields = ['user', 'institution', 'degree', 'course']
   exclude = ['id', 'created_at', 'updated_at']
 
   @admin.display(description=_('Date range'))
@@ -126,30 +198,50 @@ class EducationAdmin(admin.ModelAdmin):
 
 
 @admin.register(CVLanguage)
-class CVLanguageAdmin(admin.ModelAdmin):
+class CVLanguageAdmin(ModelAdmin):
   list_display = ['language']
   exclude = ['id']
 
 
 @admin.register(Country)
-class CountryAdmin(admin.ModelAdmin):
+class CountryAdmin(ModelAdmin):
   list_display = ['name']
+  search_fields = TRANSLATED_NAME_SEARCH
   exclude = ['id']
 
 
 @admin.register(State)
-class StateAdmin(admin.ModelAdmin):
+class StateAdmin(ModelAdmin):
   list_display = ['name', 'country', 'abbreviation']
+  list_select_related = ['country']
+  search_fields = TRANSLATED_NAME_SEARCH
+  autocomplete_fields = ['country']
   exclude = ['id']
 
 
 @admin.register(City)
-class CityAdmin(admin.ModelAdmin):
+class CityAdmin(ModelAdmin):
   list_display = ['name', 'state']
+  list_select_related = ['state']
+  search_fields = TRANSLATED_NAME_SEARCH
+  autocomplete_fields = ['state']
   exclude = ['id']
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
-  list_display = ['first_name', 'last_name', 'email', 'birth_date', 'city','created_at', 'updated_at']
+class UserAdmin(ModelAdmin):
+  list_display = ['first_name', 'last_name', 'email', 'birth_date', 'city', 'created_at', 'updated_at']
+  list_select_related = ['city']
+  search_fields = ['^email', '^first_name', '^last_name']
+  autocomplete_fields = ['city']
   exclude = ['id', 'password', 'last_login', 'is_superuser', 'is_staff', 'is_active', 'groups', 'user_permissions', 'created_at', 'updated_at']
+
+
+@admin.register(CvJob)
+class CvJobAdmin(ModelAdmin):
+  list_display = ['user', 'cv_language', 'status', 'created_at', 'wait_time', 'run_time']
+  list_filter = ['status']
+  list_select_related = ['user', 'cv_language']
+  exclude = ['id']
+  readonly_fields = ['status', 'artifact', 'error', 'created_at', 'started_at', 'finished_at']
+  formfield_select_related = {'role': ['role'], 'skills': ['skill']}
@@ -0,0 +1,138 @@
+import fcntl
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Tuple
+
+from django.conf import settings
+
+from . import metrics
+
+POLL_INTERVAL = 0.05
+
+
+class RenderRejected(Exception):
+    """Raised when admission control refuses to start a render."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'Render rejected, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bound the number of PDF renders running on the host, overall and per user.
+
+    Each render holds a slot: an exclusive `flock` on one of a fixed set of lock files, so the
+    limits hold across threads and worker processes, and a crashed worker frees its slots.
+    Per-user lock files are unlinked by their holder on release, as single-flight lock files are.
+    A render waits up to CV_ADMISSION_QUEUE_TIMEOUT seconds for a global slot, but is refused
+    at once when its user already uses all of theirs.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.CV_ADMISSION_DIR)
+
+    @property
+    def max_renders(self) -> int:
+        return int(settings.CV_ADMISSION_MAX_RENDERS)
+
+    @property
+    def max_per_user(self) -> int:
+        return int(settings.CV_ADMISSION_MAX_PER_USER)
+
+    def acquire(self, name: str, size: int) -> Optional[Tuple[Path, int]]:
+        """Lock a free slot among `size` slots called `name`, returning its path and descriptor or None when all are taken."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for slot in range(size):
+            path = self.directory / f'{name}-{slot}.lock'
+            while True:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    break
+                try:
+                    current = os.stat(path).st_ino == os.fstat(fd).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    return path, fd
+                # The previous holder released the slot and unlinked this file: lock the one now at `path`.
+                os.close(fd)
+        return None
+
+    def wait(self, name: str, size: int, timeout: float) -> Optional[Tuple[Path, int]]:
+        slot = self.acquire(name, size)
+        if slot is not None or timeout <= 0:
+            return slot
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self.queued += 1
+        try:
+            while slot is None and time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                slot = self.acquire(name, size)
+            return slot
+        finally:
+            with self._lock:
+                self.queued -= 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+        raise RenderRejected(int(settings.CV_ADMISSION_RETRY_AFTER))
+
+    @contextmanager
+    def admit(self, user_pk):
+        held = []
+        start = time.perf_counter()
+        try:
+            if self.max_per_user > 0:
+                user = hashlib.sha1(str(user_pk).encode()).hexdigest()[:16]
+                slot = self.acquire(f'user-{user}', self.max_per_user)
+                if slot is None:
+                    self.reject()
+                # One file per user and slot would pile up: it is removed once released.
+                held.append((*slot, True))
+            if self.max_renders > 0:
+                slot = self.wait('global', self.max_renders, float(settings.CV_ADMISSION_QUEUE_TIMEOUT))
+                if slot is None:
+                    self.reject()
+                held.append((*slot, False))
+            metrics.record('admission', time.perf_counter() - start)
+            with self._lock:
+                self.admitted += 1
+                self.in_flight += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        finally:
+            for path, fd, unlink in held:
+                if unlink:
+                    path.unlink(missing_ok=True)
+                os.close(fd)
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+        }
+
+
+admission = AdmissionController()
@@ -6,4 +6,8 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
-        from . import receivers  # noqa
\ No newline at end of file
+        from . import receivers  # noqa
+        from .indexes import register_index_wrappers
+        register_index_wrappers()
+        from .rendering import render_assets
+        render_assets.warm()
\ No newline at end of file
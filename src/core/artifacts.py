@@ -0,0 +1,46 @@
+import hashlib
+from typing import Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.functional import LazyObject, empty
+from django.utils.module_loading import import_string
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ArtifactStorage(LazyObject):
+    """Storage backend of CV artifacts, built from CV_ARTIFACT_STORAGE and CV_ARTIFACT_STORAGE_OPTIONS."""
+
+    def _setup(self):
+        self._wrapped = import_string(settings.CV_ARTIFACT_STORAGE)(**settings.CV_ARTIFACT_STORAGE_OPTIONS)
+
+
+artifact_storage = ArtifactStorage()
+
+
+def get_artifact_storage():
+    return artifact_storage
+
+
+@receiver(setting_changed)
+def reset_artifact_storage(setting, **kwargs):
+    if setting.startswith('CV_ARTIFACT_STORAGE'):
+        artifact_storage._wrapped = empty
+
+
+def content_digest(source) -> Tuple[str, int]:
+    """Return the sha256 and size of the file object `source`, leaving it rewound."""
+    digest = hashlib.sha256()
+    size = 0
+    source.seek(0)
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    source.seek(0)
+    return digest.hexdigest(), size
+
+
+def artifact_name(digest: str) -> str:
+    return f'{digest[:2]}/{digest}.pdf'
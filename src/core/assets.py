@@ -0,0 +1,187 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import time
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from urllib.parse import urljoin, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from weasyprint import default_url_fetcher
+
+# Base URL of the HTML handed to WeasyPrint. Relative links such as
+# `{% static %}` resolve under it and are served from disk by `url_fetcher`.
+BASE_URL = 'http://assets.cv-maker.invalid/'
+
+# Remote stylesheets linked by cv/index.html.
+FONT_URLS = [
+    'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;900&display=swap',
+]
+
+CSS_URL_RE = re.compile(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)')
+
+
+class AssetNotAvailable(ValueError):
+    pass
+
+
+def find_static(path: str):
+    """Locate a static file by its path relative to STATIC_URL, collected or not."""
+    found = finders.find(path)
+    if found:
+        return found
+    if settings.STATIC_ROOT:
+        collected = Path(settings.STATIC_ROOT) / path
+        if collected.is_file():
+            return str(collected)
+    return None
+
+
+class AssetStore:
+    """Disk cache of remote assets keyed by URL.
+
+    Each asset is a body file plus a JSON sidecar with its mime type. Stored entries are served
+    whatever their age, so renders only reach the network for assets never stored; entries older
+    than CV_ASSET_TTL are refreshed by `manage.py fetch_assets`. A failed download leaves a marker
+    and is not retried for CV_ASSET_RETRY_AFTER seconds. With CV_ASSET_OFFLINE enabled the network
+    is never used.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.failures = 0
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.CV_ASSET_DIR)
+
+    def paths_for(self, url: str):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / key, self.directory / f'{key}.json'
+
+    def failure_path(self, url: str) -> Path:
+        return self.directory / f'{hashlib.sha256(url.encode()).hexdigest()}.failed'
+
+    def age(self, url: str):
+        """Seconds since `url` was stored, None when it is not."""
+        try:
+            return time.time() - self.paths_for(url)[1].stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def failed_recently(self, url: str) -> bool:
+        try:
+            failed_at = self.failure_path(url).stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return time.time() - failed_at < settings.CV_ASSET_RETRY_AFTER
+
+    def record_failure(self, url: str):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.failure_path(url).touch()
+
+    def load(self, url: str):
+        body, meta = self.paths_for(url)
+        try:
+            with open(meta) as file:
+                info = json.load(file)
+            age = time.time() - meta.stat().st_mtime
+            return body.read_bytes(), info, age
+        except FileNotFoundError:
+            return None
+
+    def save(self, url: str, data: bytes, mime_type: str, encoding=None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        body, meta = self.paths_for(url)
+        for path, content in ((body, data), (meta, json.dumps({
+            'url': url, 'mime_type': mime_type, 'encoding': encoding,
+        }).encode())):
+            with NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as file:
+                file.write(content)
+            os.replace(file.name, path)
+        self.failure_path(url).unlink(missing_ok=True)
+
+    def download(self, url: str, timeout=10, ssl_context=None):
+        result = default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+        try:
+            data = result['string'] if 'string' in result else result['file_obj'].read()
+        finally:
+            if 'file_obj' in result:
+                result['file_obj'].close()
+        if isinstance(data, str):
+            data = data.encode(result.get('encoding') or 'utf-8')
+        mime_type = result.get('mime_type') or mimetypes.guess_type(url)[0] or 'application/octet-stream'
+        self.save(url, data, mime_type, result.get('encoding'))
+        return data, mime_type, result.get('encoding')
+
+    def fetch(self, url: str, timeout=10, ssl_context=None):
+        cached = self.load(url)
+        if cached is not None:
+            data, info, age = cached
+            if age < settings.CV_ASSET_TTL:
+                self.hits += 1
+            else:
+                self.stale += 1
+            return self._result(url, data, info['mime_type'], info.get('encoding'))
+        self.misses += 1
+        if settings.CV_ASSET_OFFLINE:
+            raise AssetNotAvailable(f'{url} is not in the asset store')
+        if self.failed_recently(url):
+            raise AssetNotAvailable(f'{url} failed to download recently')
+        try:
+            data, mime_type, encoding = self.download(url, timeout, ssl_context)
+        except Exception:
+            self.failures += 1
+            self.record_failure(url)
+            raise
+        return self._result(url, data, mime_type, encoding)
+
+    def populate(self, url: str, timeout=10):
+        """Download `url` and, for stylesheets, every asset it references. Returns the stored URLs."""
+        data, mime_type, encoding = self.download(url, timeout)
+        stored = [url]
+        if mime_type == 'text/css':
+            for ref in CSS_URL_RE.findall(data.decode(encoding or 'utf-8')):
+                if ref.startswith('data:'):
+                    continue
+                stored += self.populate(urljoin(url, ref), timeout)
+        return stored
+
+    def _result(self, url, data, mime_type, encoding):
+        return {'string': data, 'mime_type': mime_type, 'encoding': encoding, 'redirected_url': url}
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'failures': self.failures,
+        }
+
+
+asset_store = AssetStore()
+
+
+def url_fetcher(url, timeout=10, ssl_context=None):
+    """WeasyPrint url_fetcher serving static files from disk and remote assets from the store."""
+    if url.startswith(BASE_URL):
+        path = urlsplit(url).path
+        static_prefix = urlsplit(settings.STATIC_URL).path
+        if path.startswith(static_prefix):
+            found = find_static(path[len(static_prefix):])
+            if found:
+                return {
+                    'filename': found,
+                    'file_obj': open(found, 'rb'),
+                    'mime_type': mimetypes.guess_type(found)[0],
+                    'redirected_url': url,
+                }
+        raise AssetNotAvailable(f'{url} is not a static file')
+    if url.startswith(('http://', 'https://')):
+        return asset_store.fetch(url, timeout, ssl_context)
+    return default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
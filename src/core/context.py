@@ -0,0 +1,69 @@
+from typing import Optional
+
+from django.db.models import QuerySet
+
+from .fragments import fragment_cache
+from .models import User, UserRole, UserSocialNetwork
+from .references import reference_cache
+
+# Number of queries issued by `build_cv_context`, whatever the size of the profile,
+# once the reference cache holds the tables it reads.
+CV_CONTEXT_QUERIES = 7
+
+
+def format_tel(tel: str) -> str:
+    return f'({tel[3:5]}) {tel[5]} {tel[6:10]}-{tel[10:]}'
+
+
+def section_querysets(user: User):
+    return {
+        'socials': UserSocialNetwork.objects.filter(user=user),
+        'experiences': user.experiences.select_related('company', 'role'),
+        'educations': user.educations.select_related('institution', 'course'),
+        'languages': user.languages.select_related('language'),
+    }
+
+
+# Rows of the sections pointing at reference tables, filled from the reference cache instead of joins.
+SECTION_REFERENCES = {'socials': 'social_network', 'educations': 'degree'}
+
+
+def section_rows(section: str, queryset: QuerySet) -> list:
+    rows = list(queryset)
+    if section in SECTION_REFERENCES:
+        reference_cache.attach(rows, SECTION_REFERENCES[section])
+    return rows
+
+
+def build_cv_context(user: User, role: UserRole, brief: str, skills: QuerySet, language: Optional[str] = None) -> dict:
+    """Fetch everything `cv/index.html` displays in a fixed number of queries.
+
+    The returned context only holds lists and fully loaded instances, so rendering it
+    issues no further queries and it can be pickled into a render worker.
+
+    When `language` is given, the socials, experiences, educations and languages sections
+    are served from the fragment cache and only fetched for the sections that missed.
+    """
+    user = User.objects.select_related('city__state').get(pk=user.pk)
+    user.tel = format_tel(user.tel)
+    if user.city:
+        reference_cache.attach([user.city.state], 'country')
+    context = {
+        'user': user,
+        'brief': brief,
+        'role': reference_cache.attach([UserRole.objects.get(pk=role.pk)], 'role')[0],
+        'skills': list(skills.values_list('skill__name', flat=True)),
+    }
+    querysets = section_querysets(user)
+    if language is None or not fragment_cache.enabled:
+        context.update({section: section_rows(section, queryset) for section, queryset in querysets.items()})
+        return context
+
+    fragments, keys = fragment_cache.get_many(user.pk, language)
+    for section, queryset in querysets.items():
+        if section not in fragments:
+            fragments[section] = fragment_cache.render(
+                section, language, {section: section_rows(section, queryset)}, keys[section],
+            )
+    context['fragments'] = fragments
+    return context
@@ -1,7 +1,60 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
 from django.utils.translation import gettext_lazy as _
 
 from core.models import CVLanguage, User
+from core.references import reference_cache
+
+
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    def rows(self):
+        return reference_cache.all(self.queryset.model)
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for row in self.rows():
+            yield self.choice(row)
+
+    def __len__(self):
+        return len(self.rows()) + (self.field.empty_label is not None)
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    """Choice among the rows of a reference table, listed and validated from the reference cache."""
+    iterator = ReferenceChoiceIterator
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        model = self.queryset.model
+        try:
+            return reference_cache.get(model, model._meta.pk.to_python(value))
+        except (ValidationError, model.DoesNotExist):
+            raise ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value},
+            )
+
+
+class ReferenceLabelMixin:
+    """Label rows by the reference row their `reference` foreign key points at, read from the reference cache."""
+
+    def __init__(self, *args, reference, **kwargs):
+        self.reference = reference
+        super().__init__(*args, **kwargs)
+
+    def label_from_instance(self, obj):
+        field = obj._meta.get_field(self.reference)
+        return str(reference_cache.get(field.related_model, getattr(obj, field.attname)))
+
+
+class ReferenceLabelChoiceField(ReferenceLabelMixin, forms.ModelChoiceField):
+    pass
+
+
+class ReferenceLabelMultipleChoiceField(ReferenceLabelMixin, forms.ModelMultipleChoiceField):
+    pass
 
 
 class LoginForm(forms.Form):
@@ -38,20 +91,22 @@ class GenerateForm(forms.Form):
         'class': 'resize-none bg-zinc-800 text-zinc-200 rounded'
     }))
 
-    language = forms.ModelChoiceField(
+    language = ReferenceChoiceField(
         queryset=CVLanguage.objects.all(),
         widget=forms.Select(attrs={
             'class': 'bg-zinc-800 text-zinc-200 rounded'
         })
     )
-    role = forms.ModelChoiceField(
+    role = ReferenceLabelChoiceField(
         queryset=None,
+        reference='role',
         widget=forms.Select(attrs={
             'class': 'bg-zinc-800 text-zinc-200 rounded'
         })
     )
-    skills = forms.ModelMultipleChoiceField(
+    skills = ReferenceLabelMultipleChoiceField(
         queryset=None,
+        reference='skill',
         widget=forms.CheckboxSelectMultiple(attrs={
             'class': 'text-zinc-200 rounded'
             }),
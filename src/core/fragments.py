@@ -0,0 +1,104 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import override
+
+SECTIONS = {
+    'socials': 'cv/_socials.html',
+    'experiences': 'cv/_experiences.html',
+    'educations': 'cv/_educations.html',
+    'languages': 'cv/_languages.html',
+}
+
+
+class FragmentCache:
+    """Rendered CV sections per user and language, stored in the `cv` cache.
+
+    Keys embed a per-user generation, bumped when one of the user's rows changes, and a global
+    generation, bumped when a shared reference row changes, so invalidation is a single
+    counter increment visible to every worker sharing the cache.
+    """
+
+    def __init__(self):
+        self.hits = {section: 0 for section in SECTIONS}
+        self.misses = {section: 0 for section in SECTIONS}
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches['cv']
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CV_FRAGMENT_CACHE_TIMEOUT > 0
+
+    def _generations(self, user_pk):
+        user_key = f'cv-fragment-generation:{user_pk}'
+        values = self.cache.get_many(['cv-fragment-generation', user_key])
+        return values.get('cv-fragment-generation', 0), values.get(user_key, 0)
+
+    def keys(self, user_pk, language):
+        from .pdf_cache import templates_digest
+
+        global_generation, user_generation = self._generations(user_pk)
+        # Editing a partial on deploy must not serve sections rendered from its previous version.
+        digest = templates_digest()[:16]
+        return {
+            section: f'cv-fragment:{section}:{user_pk}:{language}:{global_generation}.{user_generation}:{digest}'
+            for section in SECTIONS
+        }
+
+    def get_many(self, user_pk, language):
+        keys = self.keys(user_pk, language)
+        found = self.cache.get_many(keys.values())
+        fragments = {section: mark_safe(found[key]) for section, key in keys.items() if key in found}
+        with self._lock:
+            for section in SECTIONS:
+                if section in fragments:
+                    self.hits[section] += 1
+                else:
+                    self.misses[section] += 1
+        return fragments, keys
+
+    def render(self, section, language, context, key):
+        with override(language):
+            html = render_to_string(SECTIONS[section], context)
+        self.cache.set(key, str(html), settings.CV_FRAGMENT_CACHE_TIMEOUT)
+        return mark_safe(html)
+
+    def _bump(self, key):
+        # Not `incr`: backends emulating it, such as FileBasedCache, rewrite the counter with the
+        # default timeout, after which it would restart at a generation already used.
+        self.cache.set(key, self.cache.get(key, 0) + 1, None)
+
+    def _invalidate(self, key):
+        # The second bump covers the workers that rendered the sections before the change was committed.
+        self._bump(key)
+        transaction.on_commit(lambda: self._bump(key))
+
+    def invalidate_user(self, user_pk):
+        """Drop the cached sections of a user, now and once the current transaction commits."""
+        self._invalidate(f'cv-fragment-generation:{user_pk}')
+
+    def invalidate_all(self):
+        """Drop every cached section, now and once the current transaction commits."""
+        self._invalidate('cv-fragment-generation')
+
+    def stats(self):
+        with self._lock:
+            return {
+                section: {
+                    'hits': self.hits[section],
+                    'misses': self.misses[section],
+                    'hit_rate': self.hits[section] / (self.hits[section] + self.misses[section])
+                    if self.hits[section] + self.misses[section] else 0.0,
+                }
+                for section in SECTIONS
+            }
+
+
+fragment_cache = FragmentCache()
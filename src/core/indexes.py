@@ -0,0 +1,53 @@
+from django.contrib.postgres.indexes import OpClass
+from django.db import migrations, models
+from django.db.models.functions import Upper
+from django.db.models.indexes import IndexExpression
+
+
+class PortableOpClass(OpClass):
+    """`OpClass` that databases without operator classes compile to the bare expression.
+
+    Django ignores `Index.opclasses` outside PostgreSQL the same way. It matters when SQLite
+    rebuilds a table to alter it, which recreates every index of the model state.
+    """
+
+    def as_sql(self, compiler, connection, **extra_context):
+        if connection.vendor != 'postgresql':
+            return compiler.compile(self.source_expressions[0])
+        return super().as_sql(compiler, connection, **extra_context)
+
+
+def register_index_wrappers():
+    """Let index expressions wrap `PortableOpClass` like `django.contrib.postgres` lets them wrap `OpClass`."""
+    wrappers = list(IndexExpression.wrapper_classes)
+    if PortableOpClass not in wrappers:
+        wrappers.insert(wrappers.index(OpClass) + 1, PortableOpClass)
+        IndexExpression.register_wrappers(*wrappers)
+
+
+def prefix_index(field_name: str, name: str) -> models.Index:
+    """Index serving the `istartswith` searches of the admin autocomplete lookups on `field_name`.
+
+    PostgreSQL compiles them to UPPER(column::text) LIKE UPPER(%s), which only a text_pattern_ops
+    index on that expression serves. Migrations add these with `AddPostgresIndex`.
+    """
+    return models.Index(PortableOpClass(Upper(field_name), name='text_pattern_ops'), name=name)
+
+
+class AddPostgresIndex(migrations.AddIndex):
+    """Add an index only PostgreSQL can build, such as one with an operator class.
+
+    The index is part of the model state on every database, but only created on PostgreSQL;
+    the others keep their default plans.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return f'{super().describe()} on PostgreSQL'
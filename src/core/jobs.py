@@ -0,0 +1,101 @@
+import logging
+from typing import Optional
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .admission import RenderRejected
+from .models import CvArtifact, CvJob
+
+logger = logging.getLogger(__name__)
+
+# Shown to the user instead of the exception, which is logged.
+FAILED_ERROR = 'The CV could not be generated, please try again.'
+
+
+def enqueue(user, language, role, brief, skills, company_name, company_brief) -> CvJob:
+    job = CvJob.objects.create(
+        user=user,
+        cv_language=language,
+        role=role,
+        brief=brief or '',
+        company_name=company_name or '',
+        company_brief=company_brief or '',
+    )
+    job.skills.set(skills)
+    return job
+
+
+def claim_next() -> Optional[CvJob]:
+    """Atomically move the oldest queued job to running and return it, or None when the queue is empty."""
+    queued = CvJob.objects.filter(status=CvJob.StatusEnum.QUEUED).order_by('created_at')
+    while True:
+        pk = queued.values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        claimed = CvJob.objects.filter(pk=pk, status=CvJob.StatusEnum.QUEUED).update(
+            status=CvJob.StatusEnum.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return CvJob.objects.select_related('user', 'cv_language', 'role').get(pk=pk)
+
+
+def run(job: CvJob) -> CvJob:
+    try:
+        cv = job.user.generate_cv(
+            job.cv_language, job.role, job.brief, job.skills.all(), job.company_name, job.company_brief
+        )
+        with cv:
+            # The PDF was just recorded as an artifact, so this only looks it up by content.
+            job.artifact = CvArtifact.objects.store(cv)
+        job.status = CvJob.StatusEnum.DONE
+    except RenderRejected:
+        # The host is busy: leave the job for a later attempt rather than failing it.
+        job.status = CvJob.StatusEnum.QUEUED
+        job.started_at = None
+        job.save(update_fields=['status', 'started_at'])
+        return job
+    except Exception:
+        logger.exception('CV job %s failed', job.pk)
+        job.status = CvJob.StatusEnum.FAILED
+        job.error = FAILED_ERROR
+    job.finished_at = timezone.now()
+    job.save(update_fields=['artifact', 'status', 'error', 'finished_at'])
+    return job
+
+
+def requeue_stale(older_than) -> int:
+    """Put back jobs left running by a worker that died before `older_than`."""
+    return CvJob.objects.filter(status=CvJob.StatusEnum.RUNNING, started_at__lt=older_than).update(
+        status=CvJob.StatusEnum.QUEUED, started_at=None
+    )
+
+
+def queue_depth() -> int:
+    return CvJob.objects.filter(status=CvJob.StatusEnum.QUEUED).count()
+
+
+def position(job: CvJob) -> Optional[int]:
+    if job.status != CvJob.StatusEnum.QUEUED:
+        return None
+    return CvJob.objects.filter(status=CvJob.StatusEnum.QUEUED, created_at__lt=job.created_at).count()
+
+
+def stats():
+    counts = dict(CvJob.objects.order_by().values_list('status').annotate(total=Count('pk')))
+    return {status: counts.get(status, 0) for status in CvJob.StatusEnum.values}
+
+
+def describe(job: CvJob):
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'error': job.error,
+        'position': position(job),
+        'queue_depth': queue_depth(),
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'wait_time': job.wait_time,
+        'run_time': job.run_time,
+    }
@@ -0,0 +1,146 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+import weasyprint
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.template.loader import get_template
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from django.utils.translation import activate, deactivate
+from weasyprint import HTML
+
+from core.assets import BASE_URL, url_fetcher
+from core.context import build_cv_context
+from core.render_engine import TEMPLATE_NAME
+from core.rendering import render_assets
+from core.synthetic import create_benchmark_profile
+
+
+class Rollback(Exception):
+    pass
+
+
+def measure(function, repeat):
+    """Run `function` `repeat` times, returning its last result with wall time, query and memory figures."""
+    walls = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = function()
+            walls.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {
+        'wall': {
+            'median': statistics.median(walls),
+            'min': min(walls),
+            'max': max(walls),
+        },
+        'peak_memory': peak,
+        'queries': len(queries.captured_queries),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark User.generate_cv and each of its stages on synthetic profiles of growing size. '
+        'The synthetic data is rolled back at the end; remote assets are only read from the local store.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 200],
+                            help='Number of experiences, educations, languages and socials per profile')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per stage')
+        parser.add_argument('--output', '-o', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Fail when a median wall time regresses by more than this fraction of the baseline')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            # Remote assets missing from the store are skipped rather than downloaded, keeping the
+            # network out of the timings.
+            with transaction.atomic(), override_settings(CV_PDF_CACHE_MAX_BYTES=0, CV_ASSET_OFFLINE=True):
+                render_assets.warm()
+                for number, size in enumerate(options['sizes']):
+                    results.append(self.benchmark(size, number, options['repeat']))
+                raise Rollback
+        except Rollback:
+            pass
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'weasyprint': weasyprint.__version__,
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+        self.stdout.write(json.dumps(report, indent=2))
+
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['threshold'])
+
+    def benchmark(self, size, number, repeat):
+        user, role, language, skills = create_benchmark_profile(size, number)
+        stages = {}
+
+        def end_to_end():
+            with user.generate_cv(language, role, 'Synthetic brief', skills, 'Synthetic Inc.', 'Synthetic') as cv:
+                return len(cv.read())
+
+        pdf_size, stages['end_to_end'] = measure(end_to_end, repeat)
+        context, stages['context'] = measure(lambda: build_cv_context(user, role, 'Synthetic brief', skills), repeat)
+
+        activate(language.language)
+        try:
+            template = get_template(TEMPLATE_NAME)
+            html, stages['template'] = measure(lambda: template.render({**context, 'pdf': True}), repeat)
+            stylesheets, font_config = render_assets.get()
+            document, stages['layout'] = measure(
+                lambda: HTML(string=html, base_url=BASE_URL, url_fetcher=url_fetcher).render(
+                    stylesheets=stylesheets, font_config=font_config
+                ),
+                repeat,
+            )
+            _, stages['pdf'] = measure(document.write_pdf, repeat)
+        finally:
+            deactivate()
+
+        self.stderr.write(f'size {size}: {stages["end_to_end"]["wall"]["median"]:.3f}s end to end')
+        return {'size': size, 'pdf_size': pdf_size, 'stages': stages}
+
+    def compare(self, report, baseline_path, threshold):
+        with open(baseline_path) as file:
+            baseline = {result['size']: result for result in json.load(file)['results']}
+        regressions = []
+        for result in report['results']:
+            previous = baseline.get(result['size'])
+            if previous is None:
+                continue
+            for stage, figures in result['stages'].items():
+                if stage not in previous['stages']:
+                    continue
+                before = previous['stages'][stage]['wall']['median']
+                after = figures['wall']['median']
+                if before and (after - before) / before > threshold:
+                    regressions.append(f'size {result["size"]} {stage}: {before:.4f}s -> {after:.4f}s')
+        if regressions:
+            raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+        self.stderr.write(f'No regression above {threshold:.0%} against {baseline_path}')
@@ -0,0 +1,135 @@
+import json
+import platform
+import statistics
+import time
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.context import build_cv_context
+from core.models import Cv, User, UserRole
+
+
+def table_sizes():
+    """Bytes used by each core table and by its indexes, by table name."""
+    tables = sorted({
+        model._meta.db_table
+        for model in apps.get_app_config('core').get_models(include_auto_created=True)
+    })
+    sizes = {}
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT relname, pg_table_size(relid), pg_indexes_size(relid) '
+                'FROM pg_stat_user_tables WHERE relname = ANY(%s)',
+                [tables],
+            )
+            for table, data, indexes in cursor.fetchall():
+                sizes[table] = {'data': data, 'indexes': indexes}
+        elif connection.vendor == 'sqlite':
+            # Needs SQLite built with SQLITE_ENABLE_DBSTAT_VTAB, as the Python builds are.
+            cursor.execute('SELECT name, tbl_name FROM sqlite_master WHERE type = %s', ['index'])
+            index_tables = dict(cursor.fetchall())
+            cursor.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')
+            for name, size in cursor.fetchall():
+                table = index_tables.get(name, name)
+                if table not in tables:
+                    continue
+                figures = sizes.setdefault(table, {'data': 0, 'indexes': 0})
+                figures['indexes' if name in index_tables else 'data'] += size
+        else:
+            raise CommandError(f'Table sizes are not available on {connection.vendor}')
+    return sizes
+
+
+def timed(function, repeat):
+    walls = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            function()
+            walls.append(time.perf_counter() - start)
+    return {
+        'wall': {'median': statistics.median(walls), 'min': min(walls), 'max': max(walls)},
+        'queries': len(queries.captured_queries),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the size of the core tables and indexes and the speed of the joins behind the CV context '
+        'on the existing data. Run it before and after migrating the primary keys (core.0014) with '
+        '--output and --baseline to compare both.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Number of existing users to build contexts for')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+        parser.add_argument('--output', '-o', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+
+    def handle(self, *args, **options):
+        profiles = [
+            (role.user, role)
+            for role in UserRole.objects.select_related('user').order_by('user__email')[:options['users']]
+        ]
+        if not profiles:
+            raise CommandError('No user with a role to benchmark, run seed_synthetic first')
+        pk_field = User._meta.pk
+
+        def contexts():
+            for user, role in profiles:
+                build_cv_context(user, role, '', user.skills.all())
+
+        def history():
+            for user, _ in profiles:
+                list(Cv.objects.filter(user=user).prefetch_related('skills'))
+
+        def lookups():
+            for user, role in profiles:
+                User.objects.get(pk=str(user.pk))
+                UserRole.objects.filter(user_id=user.pk, role_id=role.role_id).exists()
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'primary_key': pk_field.db_type(connection),
+                'users': len(profiles),
+                'repeat': options['repeat'],
+            },
+            'sizes': table_sizes(),
+            'queries': {
+                'context': timed(contexts, options['repeat']),
+                'history': timed(history, options['repeat']),
+                'lookups': timed(lookups, options['repeat']),
+            },
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+        self.stdout.write(json.dumps(report, indent=2))
+
+        if options['baseline']:
+            self.compare(report, options['baseline'])
+
+    def compare(self, report, baseline_path):
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        self.stderr.write(f'{baseline["meta"]["primary_key"]} -> {report["meta"]["primary_key"]}')
+        for kind in ('data', 'indexes'):
+            before = sum(sizes[kind] for sizes in baseline['sizes'].values())
+            after = sum(sizes[kind] for sizes in report['sizes'].values())
+            self.stderr.write(f'{kind}: {before} -> {after} bytes ({(after - before) / before:+.1%})')
+        for name, figures in report['queries'].items():
+            if name not in baseline['queries']:
+                continue
+            before = baseline['queries'][name]['wall']['median']
+            after = figures['wall']['median']
+            self.stderr.write(f'{name}: {before:.4f}s -> {after:.4f}s ({(after - before) / before:+.1%})')
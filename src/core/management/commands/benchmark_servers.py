@@ -0,0 +1,184 @@
+import http.client
+import importlib.util
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import create_benchmark_profile
+
+SERVERS = {
+    'wsgi': ['cv_maker.wsgi:application'],
+    'asgi': ['cv_maker.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker'],
+}
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Client:
+    """A logged in browser talking to one server over a keep-alive connection."""
+
+    def __init__(self, port, session_key):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+        self.cookies = {settings.SESSION_COOKIE_NAME: session_key}
+
+    def request(self, method, path, body=None):
+        headers = {'Cookie': '; '.join(f'{name}={value}' for name, value in self.cookies.items())}
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        for header in response.headers.get_all('Set-Cookie') or []:
+            name, _, value = header.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value
+        return response.status, content
+
+    def close(self):
+        self.connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/s and latency of the sync WSGI and async ASGI setups under gunicorn, '
+        'with a mix of login pages, form pages and CV renders'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn workers per server')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=16, help='Simultaneous clients')
+        parser.add_argument('--render-ratio', type=float, default=0.1, help='Fraction of requests rendering a CV')
+        parser.add_argument('--size', type=int, default=10, help='Size of the synthetic profile rendered')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', '-o', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        if 'asgi' in options['servers'] and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('The asgi server needs uvicorn: pip install uvicorn')
+
+        user, role, language, skills = create_benchmark_profile(options['size'], number=os.getpid() % 10000)
+        try:
+            session = SessionStore()
+            session.update({
+                SESSION_KEY: str(user.pk),
+                BACKEND_SESSION_KEY: 'django.contrib.auth.backends.ModelBackend',
+                HASH_SESSION_KEY: user.get_session_auth_hash(),
+            })
+            session.create()
+            form = {
+                'language': language.pk,
+                'role': role.pk,
+                'skills': [str(pk) for pk in skills.values_list('pk', flat=True)],
+                'company_name': 'Benchmark Inc.',
+                'company_brief': 'Benchmark',
+            }
+            results = {
+                server: self.benchmark(server, session.session_key, form, options) for server in options['servers']
+            }
+        finally:
+            user.delete()
+
+        report = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(report)
+        self.stdout.write(report)
+
+    def start(self, server, options):
+        command = [
+            sys.executable, '-m', 'gunicorn', *SERVERS[server],
+            '--workers', str(options['workers']), '--bind', f'127.0.0.1:{options["port"]}', '--timeout', '300',
+        ]
+        # Keep the network out of the timings, as in benchmark_cv.
+        env = {**os.environ, 'DJANGO_CV_ASSET_OFFLINE': 'true'}
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{server} server exited: {process.stderr.read().decode()}')
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', options['port'], timeout=1)
+                connection.request('GET', '/login/')
+                connection.getresponse().read()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f'{server} server did not start within 30s')
+
+    def benchmark(self, server, session_key, form, options):
+        rng = random.Random(options['seed'])
+        kinds = [
+            'render' if rng.random() < options['render_ratio'] else rng.choice(['login', 'form'])
+            for _ in range(options['requests'])
+        ]
+        process = self.start(server, options)
+        try:
+            clients = [Client(options['port'], session_key) for _ in range(options['concurrency'])]
+            tokens = []
+            for client in clients:
+                _, content = client.request('GET', '/')
+                tokens.append(CSRF_INPUT.search(content.decode()).group(1))
+
+            def drive(number):
+                # Each client is a browser sending its share of the requests one after the other.
+                client, token = clients[number], tokens[number]
+                samples = []
+                for index in range(number, len(kinds), len(clients)):
+                    kind = kinds[index]
+                    start = time.perf_counter()
+                    if kind == 'login':
+                        status, _ = client.request('GET', '/login/')
+                    elif kind == 'form':
+                        status, _ = client.request('GET', '/')
+                    else:
+                        # A distinct brief per request keeps the PDF cache out of the measurement.
+                        data = {**form, 'brief': f'Benchmark brief {index}', 'csrfmiddlewaretoken': token}
+                        status, _ = client.request('POST', '/', urlencode(data, doseq=True))
+                    samples.append((kind, status, time.perf_counter() - start))
+                return samples
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(len(clients)) as executor:
+                samples = [sample for batch in executor.map(drive, range(len(clients))) for sample in batch]
+            elapsed = time.perf_counter() - start
+            for client in clients:
+                client.close()
+        finally:
+            process.terminate()
+            process.wait()
+
+        result = {'requests_per_second': len(samples) / elapsed, 'elapsed': elapsed, 'kinds': {}}
+        for kind in ('login', 'form', 'render'):
+            latencies = [latency for sample_kind, _, latency in samples if sample_kind == kind]
+            if not latencies:
+                continue
+            result['kinds'][kind] = {
+                'count': len(latencies),
+                'errors': sum(1 for sample_kind, status, _ in samples if sample_kind == kind and status >= 400),
+                'p50': statistics.median(latencies),
+                'p99': percentile(latencies, 0.99),
+            }
+        self.stderr.write(f'{server}: {result["requests_per_second"]:.1f} requests/s')
+        return result
@@ -0,0 +1,37 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from modeltranslation.settings import AVAILABLE_LANGUAGES
+
+from core.models import User
+from core.resumes import EXPORT_CHUNK_SIZE, export_resumes
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the resume of every user, with their experiences, educations, skills, languages, socials '
+        'and CV history, as JSON Lines that import_resumes reads back. Users are streamed a chunk at a time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='File to write to instead of stdout')
+        parser.add_argument('--email', nargs='+', help='Only export these users')
+        parser.add_argument('--language', choices=AVAILABLE_LANGUAGES, default=AVAILABLE_LANGUAGES[0],
+                            help='Language of the names in the resumes')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help='Users read, with the rows of their resumes, per round of queries')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(email__in=options['email']) if options['email'] else None
+        start = time.perf_counter()
+        count = 0
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else self.stdout
+        try:
+            for document in export_resumes(users, options['language'], options['chunk_size']):
+                output.write(json.dumps(document, ensure_ascii=False) + '\n')
+                count += 1
+        finally:
+            if output is not self.stdout:
+                output.close()
+        self.stderr.write(f'Exported {count} resume(s) in {time.perf_counter() - start:.1f}s')
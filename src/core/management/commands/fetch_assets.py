@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.assets import FONT_URLS, asset_store
+from core.models import SocialNetwork
+
+
+class Command(BaseCommand):
+    help = 'Download fonts and social network icons into the local asset store used for PDF rendering'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=int, default=10, help='Timeout in seconds for each download')
+        parser.add_argument(
+            '--force', action='store_true', help='Download every asset, even those stored less than CV_ASSET_TTL ago',
+        )
+
+    def handle(self, *args, **options):
+        urls = FONT_URLS + list(SocialNetwork.objects.values_list('icon_url', flat=True))
+        failed = 0
+        for url in urls:
+            age = asset_store.age(url)
+            if not options['force'] and age is not None and age < settings.CV_ASSET_TTL:
+                continue
+            try:
+                stored = asset_store.populate(url, options['timeout'])
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'{url}: {exc}')
+                continue
+            for stored_url in stored:
+                self.stdout.write(stored_url)
+        self.stdout.write(f'Stored assets in {asset_store.directory}')
+        if failed:
+            raise CommandError(f'{failed} of {len(urls)} assets could not be downloaded')
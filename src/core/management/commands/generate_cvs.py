@@ -0,0 +1,185 @@
+import csv
+import multiprocessing
+import re
+import time
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.context import build_cv_context
+from core.models import Brief, Company, Cv, CvArtifact, CVLanguage, User
+from core.render_engine import RenderEngine
+
+
+def timed_render(engine, task):
+    index, context, language = task
+    start = time.perf_counter()
+    pdf = engine.render(context, language)
+    return index, pdf, time.perf_counter() - start
+
+
+def split(value):
+    return [item.strip() for item in (value or '').split(';') if item.strip()]
+
+
+def safe_name(value):
+    return re.sub(r'[^\w\- ]+', '', str(value)).strip()
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Render CVs in bulk from a CSV spec and write them to a zip file. '
+        'Spec columns: email, company_name, company_brief, brief, roles, languages, skills; '
+        'roles, languages and skills are optional ";"-separated lists defaulting to every role, '
+        'every CV language and the first 10 skills of the user. Listed skills must all be skills of the user.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('spec', help='CSV file describing the CVs to generate')
+        parser.add_argument('--output', '-o', required=True, help='Zip file to write the PDFs to')
+        parser.add_argument(
+            '--processes', type=int, default=multiprocessing.cpu_count(),
+            help='Number of render processes; 0 renders in this process',
+        )
+
+    def handle(self, *args, **options):
+        with open(options['spec'], newline='') as file:
+            rows = list(csv.DictReader(file))
+        if not rows:
+            raise CommandError('The spec file is empty')
+
+        users = {
+            user.email: user
+            for user in User.objects.filter(email__in={row['email'] for row in rows}).prefetch_related('roles__role', 'skills__skill')
+        }
+        missing = {row['email'] for row in rows} - users.keys()
+        if missing:
+            raise CommandError(f'Unknown users: {", ".join(sorted(missing))}')
+        languages = list(CVLanguage.objects.all())
+
+        contexts = {}
+        jobs = []
+        for line, row in enumerate(rows, start=2):
+            user = users[row['email']]
+            roles = [role for role in user.roles.all() if not split(row.get('roles')) or role.role.name in split(row.get('roles'))]
+            cv_languages = [language for language in languages if not split(row.get('languages')) or language.language in split(row.get('languages'))]
+            skill_names = split(row.get('skills'))
+            if skill_names:
+                skills = [skill for skill in user.skills.all() if skill.skill.name in skill_names]
+                unknown = set(skill_names) - {skill.skill.name for skill in skills}
+                if unknown:
+                    raise CommandError(f'Line {line}: {user.email} has no skills {", ".join(sorted(unknown))}')
+            else:
+                skills = list(user.skills.all()[:10])
+            for role in roles:
+                for language in cv_languages:
+                    if user.pk not in contexts:
+                        contexts[user.pk] = build_cv_context(user, role, '', user.skills.none())
+                    jobs.append({
+                        'user': user,
+                        'role': role,
+                        'language': language,
+                        'skills': skills,
+                        'brief': row.get('brief') or '',
+                        'company_name': row.get('company_name') or '',
+                        'company_brief': row.get('company_brief') or '',
+                    })
+        if not jobs:
+            raise CommandError('The spec does not match any role or language')
+
+        tasks = []
+        for index, job in enumerate(jobs):
+            context = dict(contexts[job['user'].pk])
+            context.update({
+                'role': job['role'],
+                'brief': job['brief'],
+                'skills': [skill.skill.name for skill in job['skills']],
+            })
+            tasks.append((index, context, job['language'].language))
+
+        start = time.perf_counter()
+        timings = []
+        with zipfile.ZipFile(options['output'], 'w', zipfile.ZIP_STORED) as archive:
+            for index, pdf, seconds in self.render_all(tasks, options['processes']):
+                job = jobs[index]
+                name = ' - '.join(safe_name(part) for part in (
+                    f'{job["user"].first_name} {job["user"].last_name}',
+                    job['role'].role.name,
+                    job['company_name'] or index,
+                    job['language'].language,
+                ))
+                archive.writestr(f'{index:05d} {name}.pdf', pdf)
+                job['artifact'] = CvArtifact.objects.store(BytesIO(pdf))
+                timings.append(seconds)
+        elapsed = time.perf_counter() - start
+
+        self.record(jobs)
+        self.stdout.write(
+            f'Rendered {len(timings)} CVs in {elapsed:.2f}s '
+            f'({len(timings) / elapsed:.2f} CVs/s, '
+            f'p50 {percentile(timings, 50):.3f}s, p95 {percentile(timings, 95):.3f}s per render) '
+            f'into {options["output"]}'
+        )
+
+    def render_all(self, tasks, processes):
+        # The engine replaces crashed workers and stops hung renders; one thread per worker keeps it busy.
+        engine = RenderEngine(size=max(processes, 0))
+        try:
+            if processes <= 0:
+                yield from (timed_render(engine, task) for task in tasks)
+                return
+            with ThreadPoolExecutor(max_workers=processes) as executor:
+                yield from executor.map(lambda task: timed_render(engine, task), tasks)
+        finally:
+            engine.close()
+
+    def record(self, jobs):
+        names = {job['company_name']: job['company_brief'] for job in jobs}
+        companies = {company.name: company for company in Company.objects.filter(name__in=names)}
+        Company.objects.bulk_create(
+            [Company(name=name, brief=brief) for name, brief in names.items() if name not in companies],
+            ignore_conflicts=True,
+        )
+        companies = {company.name: company for company in Company.objects.filter(name__in=names)}
+
+        briefs = {}
+        for brief in Brief.objects.filter(
+            user_role__in={job['role'].pk for job in jobs}, company__in=[company.pk for company in companies.values()]
+        ).order_by('created_at'):
+            briefs.setdefault((brief.user_role_id, brief.company_id), brief)
+        new_briefs = {}
+        for job in jobs:
+            key = (job['role'].pk, companies[job['company_name']].pk)
+            if key not in briefs and key not in new_briefs:
+                new_briefs[key] = Brief(user_role=job['role'], company=companies[job['company_name']], brief=job['brief'])
+        Brief.objects.bulk_create(new_briefs.values())
+        briefs.update(new_briefs)
+
+        cvs = []
+        cv_skills = defaultdict(list)
+        for job in jobs:
+            cv = Cv(
+                user=job['user'],
+                cv_language=job['language'],
+                role=job['role'].role,
+                brief=briefs[(job['role'].pk, companies[job['company_name']].pk)],
+                artifact=job['artifact'],
+            )
+            cvs.append(cv)
+            cv_skills[cv.pk] = [skill.skill_id for skill in job['skills']]
+        Cv.objects.bulk_create(cvs)
+        Cv.skills.through.objects.bulk_create([
+            Cv.skills.through(cv_id=cv_id, skill_id=skill_id)
+            for cv_id, skill_ids in cv_skills.items()
+            for skill_id in skill_ids
+        ])
@@ -0,0 +1,66 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from modeltranslation.settings import AVAILABLE_LANGUAGES
+
+from core.resumes import DOCUMENT_BATCH_SIZE, import_resumes
+
+JSON_LINES_SUFFIXES = ('.jsonl', '.ndjson')
+
+
+def read_documents(paths):
+    """Yield the documents of `paths`: JSON Lines from stdin and .jsonl files, an object or array elsewhere."""
+    for path in paths:
+        if path == '-':
+            yield from read_lines(sys.stdin)
+        elif path.endswith(JSON_LINES_SUFFIXES):
+            with open(path) as file:
+                yield from read_lines(file)
+        else:
+            with open(path) as file:
+                data = json.load(file)
+            yield from data if isinstance(data, list) else [data]
+
+
+def read_lines(file):
+    for number, line in enumerate(file, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise CommandError(f'Line {number}: {exc}') from None
+
+
+class Command(BaseCommand):
+    help = (
+        'Create or update users from JSON Resume documents (https://jsonresume.org/schema/), '
+        'adding the skills, languages, experiences and educations they list. '
+        'Each user is imported in its own transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='JSON or JSON Lines files, "-" to read JSON Lines from stdin')
+        parser.add_argument('--language', choices=AVAILABLE_LANGUAGES, default=AVAILABLE_LANGUAGES[0],
+                            help='Language of the names in the resumes')
+        parser.add_argument('--batch-size', type=int, default=DOCUMENT_BATCH_SIZE,
+                            help='Resumes whose reference rows are resolved together')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        imported = failed = 0
+        results = import_resumes(read_documents(options['paths']), options['language'], options['batch_size'])
+        for result in results:
+            if 'error' in result:
+                failed += 1
+                self.stderr.write(f'{result.get("email", "?")}: {result["error"]}')
+                continue
+            imported += 1
+            rows = ' '.join(f'{name}={count}' for name, count in result['rows'].items() if count)
+            self.stdout.write(f'{result["email"]} {"created" if result["created"] else "updated"} {rows}')
+            for reason in result['skipped']:
+                self.stderr.write(f'{result["email"]}: skipped {reason}')
+        self.stdout.write(f'Imported {imported} resume(s) in {time.perf_counter() - start:.1f}s')
+        if failed:
+            raise CommandError(f'{failed} resume(s) could not be imported')
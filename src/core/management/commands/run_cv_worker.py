@@ -0,0 +1,60 @@
+import time
+from datetime import timedelta
+from threading import Event, Thread
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Drain the queue of CV generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Number of jobs rendered at the same time')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=600, help='Requeue jobs running for longer than this many seconds')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of polling')
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_stale(timezone.now() - timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale job(s)')
+
+        stop = Event()
+        threads = [
+            Thread(target=self.drain, args=(stop, options['poll_interval'], options['once']), daemon=True)
+            for _ in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def drain(self, stop, poll_interval, once):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                job = jobs.claim_next()
+                if job is None:
+                    if once:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                job = jobs.run(job)
+                if job.status == job.StatusEnum.QUEUED:
+                    time.sleep(poll_interval)
+                    continue
+                self.stdout.write(
+                    f'{job.pk} {job.status} wait={job.wait_time:.2f}s run={job.run_time:.2f}s {job.error}'.rstrip()
+                )
+        finally:
+            connection.close()
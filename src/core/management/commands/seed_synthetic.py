@@ -0,0 +1,261 @@
+import multiprocessing
+import random
+import string
+import time
+import uuid
+from datetime import date, timedelta
+from itertools import islice, product
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import (Brief, City, Company, Country, Cv, CVLanguage,
+                         Education, EducationCourse, EducationDegree,
+                         EducationInstitution, Experience, ExperienceCompany,
+                         ExperienceRole, Language, Role, Skill, SocialNetwork,
+                         State, User, UserLanguage, UserRole, UserSkill,
+                         UserSocialNetwork)
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ferreira', 'Gomes']
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Deterministically generate synthetic users, reference data and CV history for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Between 0 and 999999')
+        parser.add_argument('--users', type=int, default=1000, help='At most 10000000')
+        parser.add_argument('--cvs', type=int, default=10000, help='Number of Cv (and Brief) history rows')
+        parser.add_argument('--experiences-per-user', type=int, default=5)
+        parser.add_argument('--educations-per-user', type=int, default=2)
+        parser.add_argument('--skills-per-user', type=int, default=15)
+        parser.add_argument('--languages-per-user', type=int, default=2)
+        parser.add_argument('--socials-per-user', type=int, default=3)
+        parser.add_argument('--skills-per-cv', type=int, default=10)
+        parser.add_argument('--countries', type=int, default=5)
+        parser.add_argument('--states-per-country', type=int, default=10)
+        parser.add_argument('--cities-per-state', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(),
+                            help='Processes hashing passwords')
+        parser.add_argument('--shared-password', action='store_true',
+                            help='Hash a single password and reuse it for every user')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = f'seed{options["seed"]}'
+        self.batch_size = options['batch_size']
+        if not 0 <= options['seed'] < 10 ** 6:
+            raise CommandError('The seed must be between 0 and 999999')
+        if options['users'] > 10 ** 7:
+            raise CommandError('At most 10000000 users can be seeded')
+        if self.seeded():
+            raise CommandError(f'Data for seed {options["seed"]} already exists')
+        if options['countries'] * options['states_per_country'] > len(string.ascii_uppercase) ** 2:
+            raise CommandError('Too many states for unique two-letter abbreviations')
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            self.seed_reference(options)
+            self.seed_users(options)
+            self.seed_history(options)
+        self.stdout.write(f'Done in {time.perf_counter() - start:.1f}s')
+
+    def seeded(self):
+        """Whether any row of this seed exists, reference rows included."""
+        return any(queryset.exists() for queryset in (
+            User.objects.filter(email__startswith=f'{self.prefix}.'),
+            Country.objects.filter(name_en__startswith=f'Country {self.prefix}-'),
+            ExperienceCompany.objects.filter(name__startswith=f'Company {self.prefix}-'),
+            SocialNetwork.objects.filter(name__startswith=f'Network {self.prefix}-'),
+            Company.objects.filter(name__startswith=f'Employer {self.prefix}-'),
+        ))
+
+    def make_id(self):
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def insert(self, model, objects):
+        start = time.perf_counter()
+        total = 0
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+            total += len(batch)
+        self.stdout.write(f'{model._meta.db_table}: {total} rows in {time.perf_counter() - start:.1f}s')
+
+    def translated(self, model, count, label_en, label_pt_br, **fields):
+        objects = [
+            model(id=self.make_id(), name=f'{label_pt_br} {self.prefix}-{i}', name_en=f'{label_en} {self.prefix}-{i}',
+                  name_pt_br=f'{label_pt_br} {self.prefix}-{i}', **fields)
+            for i in range(count)
+        ]
+        self.insert(model, objects)
+        return [obj.pk for obj in objects]
+
+    def seed_reference(self, options):
+        rng = self.rng
+        countries = self.translated(Country, options['countries'], 'Country', 'País')
+        abbreviations = (''.join(pair) for pair in product(string.ascii_uppercase, repeat=2))
+        taken = set(State.objects.values_list('abbreviation', flat=True))
+        states = []
+        for country in countries:
+            for i in range(options['states_per_country']):
+                abbreviation = next(code for code in abbreviations if code not in taken)
+                name = f'{self.prefix}-{len(states)}'
+                states.append(State(id=self.make_id(), name=f'Estado {name}', name_en=f'State {name}',
+                                    name_pt_br=f'Estado {name}', abbreviation=abbreviation, country_id=country))
+        self.insert(State, states)
+        cities = [
+            City(id=self.make_id(), name=f'Cidade {self.prefix}-{s}-{i}', name_en=f'City {self.prefix}-{s}-{i}',
+                 name_pt_br=f'Cidade {self.prefix}-{s}-{i}', state_id=state.pk)
+            for s, state in enumerate(states)
+            for i in range(options['cities_per_state'])
+        ]
+        self.insert(City, cities)
+        self.cities = [city.pk for city in cities]
+
+        institutions = [
+            EducationInstitution(id=self.make_id(), name=f'Universidade {self.prefix}-{i}',
+                                 name_en=f'University {self.prefix}-{i}', name_pt_br=f'Universidade {self.prefix}-{i}',
+                                 acronym=f'U{i}'[:10], city_id=rng.choice(self.cities))
+            for i in range(max(10, len(self.cities) // 10))
+        ]
+        self.insert(EducationInstitution, institutions)
+        self.institutions = [institution.pk for institution in institutions]
+        self.degrees = self.translated(EducationDegree, 5, 'Degree', 'Grau')
+        self.courses = self.translated(EducationCourse, 100, 'Course', 'Curso')
+        self.experience_roles = self.translated(ExperienceRole, 200, 'Role', 'Cargo')
+        self.skills = self.translated(Skill, 300, 'Skill', 'Habilidade')
+        self.languages = self.translated(Language, 20, 'Language', 'Idioma')
+        self.roles = self.translated(Role, 30, 'Position', 'Posição')
+
+        companies = [
+            ExperienceCompany(id=self.make_id(), name=f'Company {self.prefix}-{i}') for i in range(1000)
+        ]
+        self.insert(ExperienceCompany, companies)
+        self.experience_companies = [company.pk for company in companies]
+
+        networks = [
+            SocialNetwork(id=self.make_id(), name=f'Network {self.prefix}-{i}',
+                          base_url=f'https://{self.prefix}-{i}.example.com',
+                          icon_url=f'https://{self.prefix}-{i}.example.com/icon.png')
+            for i in range(10)
+        ]
+        self.insert(SocialNetwork, networks)
+        self.networks = [network.pk for network in networks]
+
+        for language in CVLanguage.LanguageEnum.values:
+            CVLanguage.objects.get_or_create(language=language)
+        self.cv_languages = list(CVLanguage.objects.values_list('pk', flat=True))
+
+    def hash_passwords(self, options):
+        count = options['users']
+        passwords = [f'{self.prefix}-{i}' for i in range(count)]
+        if options['shared_password'] or count == 0:
+            return [make_password(self.prefix)] * count
+        if options['processes'] <= 1:
+            return [make_password(password) for password in passwords]
+        with multiprocessing.Pool(options['processes'], initializer=init_worker) as pool:
+            return pool.map(make_password, passwords, chunksize=max(1, count // (options['processes'] * 4)))
+
+    def seed_users(self, options):
+        rng = self.rng
+        start = time.perf_counter()
+        hashes = self.hash_passwords(options)
+        self.stdout.write(f'Hashed {len(hashes)} passwords in {time.perf_counter() - start:.1f}s')
+
+        users = [
+            User(
+                id=self.make_id(), email=f'{self.prefix}.{i}@example.com', password=password,
+                first_name=rng.choice(FIRST_NAMES), middle_name=rng.choice(LAST_NAMES), last_name=rng.choice(LAST_NAMES),
+                birth_date=date(1960, 1, 1) + timedelta(days=rng.randrange(365 * 40)),
+                tel=f'+{options["seed"]:06d}{i:07d}', city_id=rng.choice(self.cities),
+            )
+            for i, password in enumerate(hashes)
+        ]
+        self.insert(User, users)
+        self.users = [user.pk for user in users]
+
+        self.user_roles = {}
+        self.user_skills = {}
+        user_roles, user_skills, experiences, educations, languages, socials = [], [], [], [], [], []
+        for user in self.users:
+            for role in rng.sample(self.roles, rng.randint(1, 3)):
+                user_roles.append(UserRole(id=self.make_id(), user_id=user, role_id=role))
+                self.user_roles.setdefault(user, []).append((user_roles[-1].pk, role))
+            self.user_skills[user] = rng.sample(self.skills, min(options['skills_per_user'], len(self.skills)))
+            user_skills += [UserSkill(id=self.make_id(), user_id=user, skill_id=skill) for skill in self.user_skills[user]]
+            for company in rng.sample(self.experience_companies, options['experiences_per_user']):
+                start_date = date(2000, 1, 1) + timedelta(days=rng.randrange(365 * 20))
+                experiences.append(Experience(
+                    id=self.make_id(), user_id=user, company_id=company, role_id=rng.choice(self.experience_roles),
+                    description=f'Synthetic experience at {company[:8]}', start_date=start_date,
+                    end_date=start_date + timedelta(days=rng.randrange(30, 365 * 5)) if rng.random() < 0.8 else None,
+                ))
+            for course in rng.sample(self.courses, options['educations_per_user']):
+                start_date = date(1990, 1, 1) + timedelta(days=rng.randrange(365 * 25))
+                educations.append(Education(
+                    id=self.make_id(), user_id=user, institution_id=rng.choice(self.institutions), course_id=course,
+                    degree_id=rng.choice(self.degrees), start_date=start_date,
+                    end_date=start_date + timedelta(days=365 * 4) if rng.random() < 0.9 else None,
+                ))
+            for index, language in enumerate(rng.sample(self.languages, options['languages_per_user'])):
+                is_native = index == 0
+                level = UserLanguage.LevelEnum.C2 if is_native else rng.choice(UserLanguage.LevelEnum.values)
+                languages.append(UserLanguage(id=self.make_id(), user_id=user, language_id=language, level=level,
+                                              is_native=is_native))
+            socials += [
+                UserSocialNetwork(id=self.make_id(), user_id=user, social_network_id=network, username=f'{user[:8]}-{user[-12:]}')
+                for network in rng.sample(self.networks, options['socials_per_user'])
+            ]
+        for model, objects in ((UserRole, user_roles), (UserSkill, user_skills), (Experience, experiences),
+                               (Education, educations), (UserLanguage, languages), (UserSocialNetwork, socials)):
+            self.insert(model, objects)
+
+    def seed_history(self, options):
+        rng = self.rng
+        companies = [
+            Company(id=self.make_id(), name=f'Employer {self.prefix}-{i}', brief='Synthetic employer')
+            for i in range(max(1, options['cvs'] // 100))
+        ]
+        self.insert(Company, companies)
+        companies = [company.pk for company in companies]
+        if not self.users:
+            return
+
+        totals = {Brief: 0, Cv: 0, Cv.skills.through: 0}
+        start = time.perf_counter()
+        remaining = options['cvs']
+        while remaining:
+            briefs, cvs, cv_skills = [], [], []
+            for _ in range(min(remaining, self.batch_size)):
+                user = rng.choice(self.users)
+                user_role, role = rng.choice(self.user_roles[user])
+                briefs.append(Brief(id=self.make_id(), user_role_id=user_role, company_id=rng.choice(companies),
+                                    brief='Synthetic brief'))
+                cvs.append(Cv(id=self.make_id(), user_id=user, cv_language_id=rng.choice(self.cv_languages),
+                              role_id=role, brief_id=briefs[-1].pk))
+                skills = self.user_skills[user]
+                cv_skills += [
+                    Cv.skills.through(cv_id=cvs[-1].pk, skill_id=skill)
+                    for skill in rng.sample(skills, min(options['skills_per_cv'], len(skills)))
+                ]
+            for model, objects in ((Brief, briefs), (Cv, cvs), (Cv.skills.through, cv_skills)):
+                model.objects.bulk_create(objects, batch_size=self.batch_size)
+                totals[model] += len(objects)
+            remaining -= len(cvs)
+        for model, total in totals.items():
+            self.stdout.write(f'{model._meta.db_table}: {total} rows')
+        self.stdout.write(f'History inserted in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,183 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._series[key] = (counts, total + value)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{format_labels(labels + [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{format_labels(labels)} {cumulative}')
+        return lines
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class Registry:
+    """Metrics of this process in the Prometheus text format.
+
+    Besides histograms, collectors are callables returning `(name, type, documentation, value)`
+    tuples read at scrape time, used to expose counters kept by other modules.
+    """
+
+    def __init__(self):
+        self.histograms = []
+        self.collectors = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        histogram = Histogram(*args, **kwargs)
+        self.histograms.append(histogram)
+        return histogram
+
+    def collector(self, function):
+        self.collectors.append(function)
+        return function
+
+    def expose(self) -> str:
+        lines = []
+        for histogram in self.histograms:
+            lines += histogram.expose()
+        for collector in self.collectors:
+            for name, kind, documentation, value in collector():
+                lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# Generations are labelled by outcome: served from the PDF cache, rendered, or failed.
+render_seconds = registry.histogram(
+    'cv_render_seconds', 'Time spent generating a CV end to end', labelnames=['outcome'],
+)
+stage_seconds = registry.histogram('cv_render_stage_seconds', 'Time spent in each stage of CV generation', labelnames=['stage'])
+pdf_bytes = registry.histogram(
+    'cv_pdf_bytes', 'Size of the generated PDFs',
+    buckets=(16 * 1024, 32 * 1024, 64 * 1024, 128 * 1024, 256 * 1024, 512 * 1024, 1024 * 1024),
+)
+render_queries = registry.histogram(
+    'cv_render_queries', 'Database queries issued per CV generation',
+    buckets=(5, 10, 15, 20, 30, 50, 100), labelnames=['outcome'],
+)
+
+_local = threading.local()
+
+
+def timings():
+    """Stage timings recorded in this thread since the last `reset()`, in seconds."""
+    if not hasattr(_local, 'timings'):
+        _local.timings = {}
+    return _local.timings
+
+
+def reset():
+    _local.timings = {}
+
+
+def record(name, seconds):
+    current = timings()
+    current[name] = current.get(name, 0.0) + seconds
+    stage_seconds.observe(seconds, stage=name)
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+def server_timing(values) -> str:
+    return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in values.items())
+
+
+@registry.collector
+def render_counters():
+    from .admission import admission
+    from .fragments import fragment_cache
+    from .pdf_cache import pdf_cache
+    from .references import reference_cache
+    from .render_engine import render_engine
+    from .rendering import RenderOutput, render_assets
+    from .single_flight import single_flight
+
+    cache = pdf_cache.stats()
+    assets = render_assets.stats()
+    output = RenderOutput.stats()
+    fragments = fragment_cache.stats().values()
+    admitted = admission.stats()
+    flights = single_flight.stats()
+    engine = render_engine.stats()
+    references = reference_cache.stats()
+    return [
+        ('cv_pdf_cache_hits_total', 'counter', 'PDF cache hits', cache['hits']),
+        ('cv_pdf_cache_misses_total', 'counter', 'PDF cache misses', cache['misses']),
+        ('cv_pdf_cache_evictions_total', 'counter', 'PDF cache evictions', cache['evictions']),
+        ('cv_fragment_cache_hits_total', 'counter', 'CV section fragment cache hits', sum(f['hits'] for f in fragments)),
+        ('cv_fragment_cache_misses_total', 'counter', 'CV section fragment cache misses', sum(f['misses'] for f in fragments)),
+        ('cv_reference_cache_hits_total', 'counter', 'Reference table lookups served from memory', references['hits']),
+        ('cv_reference_cache_loads_total', 'counter', 'Reference table loads', references['loads']),
+        ('cv_stylesheet_hits_total', 'counter', 'Renders served by the parsed stylesheet registry', assets['hits']),
+        ('cv_stylesheet_reloads_total', 'counter', 'Stylesheet registry reloads', assets['reloads']),
+        ('cv_output_buffers_total', 'counter', 'PDF output buffers created', output['created']),
+        ('cv_output_spills_total', 'counter', 'PDF output buffers spilled to disk', output['spills']),
+        ('cv_renders_total', 'counter', 'PDFs rendered', engine['renders']),
+        ('cv_render_pool_restarts_total', 'counter', 'Render pools replaced after a worker died', engine['restarts']),
+        ('cv_admission_in_flight', 'gauge', 'Renders holding an admission slot', admitted['in_flight']),
+        ('cv_admission_queued', 'gauge', 'Renders waiting for an admission slot', admitted['queued']),
+        ('cv_admission_admitted_total', 'counter', 'Renders admitted', admitted['admitted']),
+        ('cv_admission_rejected_total', 'counter', 'Renders refused by admission control', admitted['rejected']),
+        ('cv_single_flight_leaders_total', 'counter', 'Renders started by single-flight leaders', flights['leaders']),
+        ('cv_single_flight_followers_total', 'counter', 'Requests served by an identical in-flight render', flights['followers']),
+        ('cv_single_flight_timeouts_total', 'counter', 'Requests that gave up waiting for an identical render', flights['timeouts']),
+    ]
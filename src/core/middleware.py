@@ -0,0 +1,70 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse
+from django.utils.translation import gettext as _
+
+from core import metrics
+from core.admission import RenderRejected
+
+
+class ServerTimingMiddleware:
+    """Report the CV generation stages timed during the request in a `Server-Timing` header.
+
+    Runs natively under both WSGI and ASGI. Async views report the timings of work run in other
+    threads through a `timings` attribute on the response.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics.reset()
+        start = time.perf_counter()
+        return self.add_header(self.get_response(request), start)
+
+    async def __acall__(self, request):
+        metrics.reset()
+        start = time.perf_counter()
+        return self.add_header(await self.get_response(request), start)
+
+    def add_header(self, response, start):
+        timings = {**metrics.timings(), **getattr(response, 'timings', {})}
+        if timings:
+            timings['total'] = time.perf_counter() - start
+            response['Server-Timing'] = metrics.server_timing(timings)
+        return response
+
+
+class AdmissionMiddleware:
+    """Answer renders refused by admission control with `503 Service Unavailable`."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, RenderRejected):
+            return None
+        response = HttpResponse(_('Too many CVs are being generated, please try again shortly.'), status=503)
+        response['Retry-After'] = str(exception.retry_after)
+        return response
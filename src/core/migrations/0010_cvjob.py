@@ -0,0 +1,45 @@
+# Generated by Django 4.1.12 on 2026-10-18 16:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_brief_company_cv_brief_company_brief_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CvJob',
+            fields=[
+                ('id', models.CharField(default=uuid.uuid4, max_length=50, primary_key=True, serialize=False)),
+                ('brief', models.CharField(blank=True, max_length=255, verbose_name='brief')),
+                ('company_name', models.CharField(blank=True, max_length=255, verbose_name='company name')),
+                ('company_brief', models.CharField(blank=True, max_length=255, verbose_name='company brief')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10, verbose_name='status')),
+                ('pdf', models.BinaryField(blank=True, null=True, verbose_name='pdf')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='started at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='finished at')),
+                ('cv_language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.cvlanguage')),
+                ('role', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.userrole')),
+                ('skills', models.ManyToManyField(related_name='+', to='core.userskill')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'cv job',
+                'verbose_name_plural': 'cv jobs',
+                'db_table': 'core_cv_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cvjob',
+            index=models.Index(fields=['status', 'created_at'], name='cv_job_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.12 on 2026-10-18 16:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_cvjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='profile updated at'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='profile version'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.12 on 2026-10-18 16:51
+
+import core.artifacts
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_user_profile_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CvArtifact',
+            fields=[
+                ('id', models.CharField(default=uuid.uuid4, max_length=50, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='sha256')),
+                ('file', models.FileField(max_length=255, storage=core.artifacts.get_artifact_storage, upload_to='', verbose_name='file')),
+                ('size', models.PositiveBigIntegerField(verbose_name='size')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'cv artifact',
+                'verbose_name_plural': 'cv artifacts',
+                'db_table': 'core_cv_artifacts',
+            },
+        ),
+        migrations.AddField(
+            model_name='cv',
+            name='artifact',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='cvs', to='core.cvartifact'),
+        ),
+    ]
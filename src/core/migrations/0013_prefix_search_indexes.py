@@ -0,0 +1,121 @@
+import core.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+# The admin autocomplete lookups search these columns with `istartswith`, which PostgreSQL compiles
+# to UPPER(column::text) LIKE UPPER(%s): only a text_pattern_ops index on that expression serves it.
+# Other databases have no such operator class and keep their default plans.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_cvartifact'),
+    ]
+
+    operations = [
+        core.indexes.AddPostgresIndex(
+            model_name='city',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='city_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='city',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='city_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='state',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='state_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='state',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='state_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='country',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='country_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='country',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='country_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='educationinstitution',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='institution_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='educationinstitution',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='institution_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='educationinstitution',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('acronym'), name='text_pattern_ops'), name='institution_acronym_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='educationcourse',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='course_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='educationcourse',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='course_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='educationdegree',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='degree_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='educationdegree',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='degree_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='experiencerole',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='exp_role_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='experiencerole',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='exp_role_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='skill',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='skill_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='skill',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='skill_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='language',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='language_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='language',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='language_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='role',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_en'), name='text_pattern_ops'), name='role_name_en_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='role',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name_pt_br'), name='text_pattern_ops'), name='role_name_pt_br_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='experiencecompany',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='exp_company_name_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='socialnetwork',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='social_network_name_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='user',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('email'), name='text_pattern_ops'), name='user_email_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='user',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('first_name'), name='text_pattern_ops'), name='user_first_name_prefix'),
+        ),
+        core.indexes.AddPostgresIndex(
+            model_name='user',
+            index=models.Index(core.indexes.PortableOpClass(django.db.models.functions.text.Upper('last_name'), name='text_pattern_ops'), name='user_last_name_prefix'),
+        ),
+    ]
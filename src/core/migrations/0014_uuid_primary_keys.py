@@ -0,0 +1,199 @@
+# Generated by Django 4.1.12 on 2026-10-18 17:01
+
+from django.db import migrations, models
+import uuid
+
+BATCH_SIZE = 5000
+
+# Ids that are not UUIDs get a UUID derived from them, identical wherever they are referenced.
+LEGACY_ID_NAMESPACE = uuid.UUID('0d0c9b6e-52a4-4e8b-9a37-3c1f2f6d9a10')
+
+
+def normalize(value):
+    try:
+        return uuid.UUID(value).hex
+    except ValueError:
+        return uuid.uuid5(LEGACY_ID_NAMESPACE, value).hex
+
+
+def key_columns(apps):
+    """Yield the (table, column) of every core primary key and of every foreign key to one."""
+    models_ = list(apps.get_app_config('core').get_models(include_auto_created=True))
+    models_.append(apps.get_model('admin', 'LogEntry'))
+    for model in models_:
+        for field in model._meta.concrete_fields:
+            if field.primary_key and isinstance(field, models.CharField):
+                yield model._meta.db_table, field.column
+            elif field.is_relation and field.related_model._meta.app_label == 'core':
+                yield model._meta.db_table, field.column
+
+
+def normalize_ids(apps, schema_editor):
+    """Rewrite ids as 32 hex digits, the form UUIDField stores on SQLite and casts to uuid on PostgreSQL.
+
+    Each column is walked in keyset batches of distinct values so large tables are never loaded at once.
+    """
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    for table, column in key_columns(apps):
+        table, column = quote(table), quote(column)
+        last = ''
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT DISTINCT {column} FROM {table} WHERE {column} > %s ORDER BY {column} LIMIT %s',
+                    [last, BATCH_SIZE],
+                )
+                values = [row[0] for row in cursor.fetchall()]
+                if not values:
+                    break
+                changes = [(normalize(value), value) for value in values if normalize(value) != value]
+                if changes:
+                    cursor.executemany(f'UPDATE {table} SET {column} = %s WHERE {column} = %s', changes)
+            last = values[-1]
+    if connection.vendor == 'postgresql':
+        # Check the deferred foreign keys now: PostgreSQL refuses to alter tables with pending trigger events.
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin', '0003_logentry_add_action_flag_choices'),
+        ('core', '0013_prefix_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='brief',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='city',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='company',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='country',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='cv',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='cvartifact',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='cvjob',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='cvlanguage',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='education',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='educationcourse',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='educationdegree',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='educationinstitution',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='experience',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='experiencecompany',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='experiencerole',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='language',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='role',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='skill',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='socialnetwork',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='state',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='userlanguage',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='userrole',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='userskill',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='usersocialnetwork',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.12 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_uuid_primary_keys'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='education',
+            options={'ordering': ['-start_date', '-end_date'], 'verbose_name': 'education', 'verbose_name_plural': 'education'},
+        ),
+        migrations.AddIndex(
+            model_name='brief',
+            index=models.Index(fields=['user_role', 'company'], name='brief_user_role_company_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=models.Index(fields=['user', '-created_at'], name='cv_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='education',
+            index=models.Index(fields=['user', '-start_date', '-end_date'], name='education_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='experience',
+            index=models.Index(fields=['user', '-start_date', '-end_date'], name='experience_user_start_idx'),
+        ),
+    ]
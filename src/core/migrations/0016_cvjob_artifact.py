@@ -0,0 +1,43 @@
+# Generated by Django 4.1.12 on 2026-10-18 19:24
+
+from io import BytesIO
+
+from django.core.files import File
+from django.db import migrations, models
+import django.db.models.deletion
+
+from core.artifacts import artifact_name, artifact_storage, content_digest
+
+
+def store_job_pdfs(apps, schema_editor):
+    """Move the PDF of finished jobs to the artifact holding the same content."""
+    CvArtifact = apps.get_model('core', 'CvArtifact')
+    CvJob = apps.get_model('core', 'CvJob')
+    for job in CvJob.objects.filter(pdf__isnull=False).only('pk', 'pdf').iterator():
+        source = BytesIO(bytes(job.pdf))
+        digest, size = content_digest(source)
+        name = artifact_name(digest)
+        if not artifact_storage.exists(name):
+            name = artifact_storage.save(name, File(source, name=name))
+        artifact, _ = CvArtifact.objects.get_or_create(sha256=digest, defaults={'file': name, 'size': size})
+        CvJob.objects.filter(pk=job.pk).update(artifact=artifact)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cvjob',
+            name='artifact',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='jobs', to='core.cvartifact'),
+        ),
+        migrations.RunPython(store_job_pdfs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='cvjob',
+            name='pdf',
+        ),
+    ]
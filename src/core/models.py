@@ -1,18 +1,24 @@
-from pathlib import Path
-from tempfile import NamedTemporaryFile
+import time
 from typing import Any, List
 from uuid import uuid4
 
 from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager,
                                         PermissionsMixin)
-from django.db import models
-from django.template.loader import get_template
-from django.utils.timezone import localdate
-from django.utils.translation import activate, deactivate
+from django.core.files import File
+from django.db import models, transaction
+from django.utils.timezone import localdate, now
 from django.utils.translation import gettext_lazy as _
-from weasyprint import CSS, HTML
 
+from . import metrics
+from .admission import admission
+from .artifacts import (artifact_name, artifact_storage, content_digest,
+                        get_artifact_storage)
+from .indexes import prefix_index
+from .pdf_cache import fingerprint, pdf_cache
+from .render_engine import render_engine
+from .rendering import RenderOutput
 from .signals import cv_generated
+from .single_flight import flight_key, single_flight
 
 # Create your models here.
 
@@ -38,9 +44,13 @@ class UserManager(BaseUserManager):
         user.save()
         return user
 
+    def bump_profile_version(self, **filters):
+        """Mark the profile of the matching users as changed, without sending `post_save`."""
+        return self.filter(**filters).update(profile_version=models.F('profile_version') + 1, profile_updated_at=now())
+
 
 class User(PermissionsMixin, AbstractBaseUser):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     first_name = models.CharField(_('first name'), max_length=50)
     middle_name = models.CharField(_('middle name'), max_length=50)
     last_name = models.CharField(_('last name'), max_length=50)
@@ -49,13 +59,25 @@ class User(PermissionsMixin, AbstractBaseUser):
     tel = models.CharField(_('tel'), max_length=14, unique=True)
     social_networks = models.ManyToManyField('SocialNetwork', related_name='+', through='UserSocialNetwork')
     city = models.ForeignKey('City', on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    profile_version = models.PositiveIntegerField(_('profile version'), default=1, editable=False)
+    profile_updated_at = models.DateTimeField(_('profile updated at'), default=now, editable=False)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'middle_name', 'last_name', 'birth_date', 'tel']
+    # Maintained by `UserManager.bump_profile_version` only, so a save never writes back a stale copy.
+    PROFILE_VERSION_FIELDS = frozenset(['profile_version', 'profile_updated_at'])
     objects = UserManager()
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.PROFILE_VERSION_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f'{self.first_name} {self.middle_name[0]}. {self.last_name}'
 
@@ -74,44 +96,60 @@ class User(PermissionsMixin, AbstractBaseUser):
         verbose_name = _('user')
         verbose_name_plural = _('users')
         db_table = 'core_users'
+        indexes = [
+            prefix_index('email', 'user_email_prefix'),
+            prefix_index('first_name', 'user_first_name_prefix'),
+            prefix_index('last_name', 'user_last_name_prefix'),
+        ]
 
     def generate_cv(self, language: 'CVLanguage', role: 'Role', brief: str, skills: List['Skill'], company_name: str, company_brief: str):
-        tel = self.tel
-        self.tel = f'({tel[3:5]}) {tel[5]} {tel[6:10]}-{tel[10:]}'
-
-        activate(language.language)
-        template = get_template('cv/index.html')
-        html = template.render({
-            'user': self,
-            'brief': brief,
-            'role': role,
-            'skills': skills.values_list('skill__name', flat=True),
-            'socials': UserSocialNetwork.objects.filter(user=self),
-            'experiences': self.experiences.all(),
-            'educations': self.educations.all(),
-            'languages': self.languages.all(),
-        })
-
-        company, _ = Company.objects.get_or_create(name=company_name, defaults={'brief': company_brief})
-        user_brief, _ = Brief.objects.get_or_create(user_role=role, company=company, defaults={'brief': brief})
-        try:
-            Cv.objects.create(user=self, cv_language=language, role=role, brief=user_brief, skills=skills)
-        except:
-            pass
-
-        html = HTML(string=html)
-        css = Path(__file__).parent / 'static/css/styles_out.css'
-        css = CSS(filename=css)
-        cv_path = NamedTemporaryFile(suffix='.pdf', delete=True)
-        cv = cv_path.name
-        html.write_pdf(cv, stylesheets=[css])
-        deactivate()
+        start = time.perf_counter()
+        outcome = 'failed'
+        with metrics.count_queries() as queries:
+            try:
+                cv, outcome = self._generate_cv(language, role, brief, skills, company_name, company_brief)
+            finally:
+                metrics.render_queries.observe(queries.count, outcome=outcome)
+                metrics.render_seconds.observe(time.perf_counter() - start, outcome=outcome)
         cv_generated.send(sender=self, cv=cv)
-        return cv_path
+        return cv
+
+    def _generate_cv(self, language, role, brief, skills, company_name, company_brief):
+        """Generate the CV and record it, returning the PDF file and whether it was 'cached' or 'rendered'."""
+        from .context import build_cv_context
+
+        key = cached = None
+        if pdf_cache.enabled:
+            with metrics.stage('cache'):
+                key = fingerprint(self, language, role, brief, skills, company_name, company_brief)
+                cached = pdf_cache.open(key)
+
+        def record(pdf):
+            # Recorded once the PDF exists, so a failed render leaves no history behind.
+            Cv.objects.record(self, language, role, brief, skills, company_name, company_brief, pdf)
+            return pdf
+
+        def render():
+            with metrics.stage('db'):
+                context = build_cv_context(self, role, brief, skills, language.language)
+            output = RenderOutput()
+            with admission.admit(self.pk):
+                render_engine.render_to(context, language.language, output)
+            output.seek(0)
+            if key is not None:
+                pdf_cache.put(key, output)
+            return record(output)
+
+        if cached is not None:
+            return record(cached), 'cached'
+        # Identical requests already rendering on this host hand over the PDF, and the Cv, of
+        # the first one instead: the record is written by the flight leader only.
+        flight = flight_key(self, language, role, brief, skills, company_name, company_brief)
+        return single_flight.run(flight, render), 'rendered'
 
 
 class Country(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
 
     def __str__(self):
@@ -121,10 +159,14 @@ class Country(models.Model):
         verbose_name = _('country')
         verbose_name_plural = _('countries')
         db_table = 'core_countries'
+        indexes = [
+            prefix_index('name_en', 'country_name_en_prefix'),
+            prefix_index('name_pt_br', 'country_name_pt_br_prefix'),
+        ]
         ordering = ['name']
 
 class State(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
     abbreviation = models.CharField(_('abbreviation'), max_length=2, unique=True)
     country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='states')
@@ -136,6 +178,10 @@ class State(models.Model):
         verbose_name = _('state')
         verbose_name_plural = _('states')
         db_table = 'core_states'
+        indexes = [
+            prefix_index('name_en', 'state_name_en_prefix'),
+            prefix_index('name_pt_br', 'state_name_pt_br_prefix'),
+        ]
         constraints = [
             models.UniqueConstraint(fields=['name', 'country'], name='unique_state')
         ]
@@ -143,7 +189,7 @@ class State(models.Model):
 
 
 class City(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
     state = models.ForeignKey(State, on_delete=models.CASCADE, related_name='cities')
 
@@ -158,6 +204,10 @@ class City(models.Model):
         verbose_name = _('city')
         verbose_name_plural = _('cities')
         db_table = 'core_cities'
+        indexes = [
+            prefix_index('name_en', 'city_name_en_prefix'),
+            prefix_index('name_pt_br', 'city_name_pt_br_prefix'),
+        ]
         constraints = [
             models.UniqueConstraint(fields=['name', 'state'], name='unique_city')
         ]
@@ -165,7 +215,7 @@ class City(models.Model):
 
 
 class EducationInstitution(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100)
     acronym = models.CharField(_('acronym'), max_length=10)
     city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='+')
@@ -181,6 +231,11 @@ class EducationInstitution(models.Model):
         verbose_name = _('education institution')
         verbose_name_plural = _('education institutions')
         db_table = 'core_education_institutions'
+        indexes = [
+            prefix_index('name_en', 'institution_name_en_prefix'),
+            prefix_index('name_pt_br', 'institution_name_pt_br_prefix'),
+            prefix_index('acronym', 'institution_acronym_prefix'),
+        ]
         constraints = [
             models.UniqueConstraint(fields=['name', 'city'], name='unique_education_institution')
         ]
@@ -188,7 +243,7 @@ class EducationInstitution(models.Model):
 
 
 class EducationDegree(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
 
     def __str__(self):
@@ -198,11 +253,15 @@ class EducationDegree(models.Model):
         verbose_name = _('education degree')
         verbose_name_plural = _('education degrees')
         db_table = 'core_education_degrees'
+        indexes = [
+            prefix_index('name_en', 'degree_name_en_prefix'),
+            prefix_index('name_pt_br', 'degree_name_pt_br_prefix'),
+        ]
         ordering = ['name']
 
 
 class EducationCourse(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
 
     def __str__(self):
@@ -212,11 +271,15 @@ class EducationCourse(models.Model):
         verbose_name = _('education course')
         verbose_name_plural = _('education courses')
         db_table = 'core_education_courses'
+        indexes = [
+            prefix_index('name_en', 'course_name_en_prefix'),
+            prefix_index('name_pt_br', 'course_name_pt_br_prefix'),
+        ]
         ordering = ['name']
 
 
 class Education(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='educations')
     institution = models.ForeignKey(EducationInstitution, on_delete=models.CASCADE, related_name='+')
     course = models.ForeignKey(EducationCourse, on_delete=models.CASCADE, related_name='+')
@@ -240,11 +303,14 @@ class Education(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['user', 'institution', 'course', 'degree'], name='unique_education')
         ]
-        ordering = ['-start_date__year', '-end_date__year']
+        indexes = [
+            models.Index(fields=['user', '-start_date', '-end_date'], name='education_user_start_idx'),
+        ]
+        ordering = ['-start_date', '-end_date']
 
 
 class ExperienceCompany(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
 
     def __str__(self):
@@ -254,11 +320,14 @@ class ExperienceCompany(models.Model):
         verbose_name = _('experience company')
         verbose_name_plural = _('experience companies')
         db_table = 'core_experience_companies'
+        indexes = [
+            prefix_index('name', 'exp_company_name_prefix'),
+        ]
         ordering = ['name']
 
 
 class ExperienceRole(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=255, unique=True)
 
     def __str__(self):
@@ -268,11 +337,15 @@ class ExperienceRole(models.Model):
         verbose_name = _('experience role')
         verbose_name_plural = _('experience roles')
         db_table = 'core_experience_roles'
+        indexes = [
+            prefix_index('name_en', 'exp_role_name_en_prefix'),
+            prefix_index('name_pt_br', 'exp_role_name_pt_br_prefix'),
+        ]
         ordering = ['name']
 
 
 class Experience(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='experiences')
     company = models.ForeignKey(ExperienceCompany, on_delete=models.CASCADE, related_name='+')
     role = models.ForeignKey(ExperienceRole, on_delete=models.CASCADE, related_name='+')
@@ -292,11 +365,14 @@ class Experience(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['user', 'company', 'role'], name='unique_experience')
         ]
+        indexes = [
+            models.Index(fields=['user', '-start_date', '-end_date'], name='experience_user_start_idx'),
+        ]
         ordering = ['-start_date', '-end_date']
 
 
 class Skill(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
 
     def __str__(self):
@@ -306,11 +382,15 @@ class Skill(models.Model):
         verbose_name = _('skill')
         verbose_name_plural = _('skills')
         db_table = 'core_skills'
+        indexes = [
+            prefix_index('name_en', 'skill_name_en_prefix'),
+            prefix_index('name_pt_br', 'skill_name_pt_br_prefix'),
+        ]
         ordering = ['name']
 
 
 class UserSkill(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='skills')
     skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='+')
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
@@ -329,7 +409,7 @@ class UserSkill(models.Model):
 
 
 class Language(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
 
     def __str__(self):
@@ -339,6 +419,10 @@ class Language(models.Model):
         verbose_name = _('language')
         verbose_name_plural = _('languages')
         db_table = 'core_languages'
+        indexes = [
+            prefix_index('name_en', 'language_name_en_prefix'),
+            prefix_index('name_pt_br', 'language_name_pt_br_prefix'),
+        ]
         ordering = ['name']
 
 
@@ -359,7 +443,7 @@ class UserLanguage(models.Model):
         B2 = 'B2', _('Upper Intermediate')
         C1 = 'C1', _('Advanced')
         C2 = 'C2', _('Proficient')
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='languages')
     language = models.ForeignKey(Language, on_delete=models.CASCADE, related_name='+')
     level = models.CharField(_('level'), max_length=2, choices=LevelEnum.choices)
@@ -389,7 +473,7 @@ class UserLanguage(models.Model):
 
 
 class Role(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
     users = models.ManyToManyField(User, related_name='+', through='UserRole')
 
@@ -400,11 +484,15 @@ class Role(models.Model):
         verbose_name = _('role')
         verbose_name_plural = _('roles')
         db_table = 'core_roles'
+        indexes = [
+            prefix_index('name_en', 'role_name_en_prefix'),
+            prefix_index('name_pt_br', 'role_name_pt_br_prefix'),
+        ]
         ordering = ['name']
 
 
 class UserRole(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='roles')
     role = models.ForeignKey(Role, on_delete=models.CASCADE, related_name='+')
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
@@ -427,7 +515,7 @@ class CVLanguage(models.Model):
         EN = 'en-us', _('English')
         PT_BR = 'pt-br', _('Portuguese (Brazil)')
 
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     language = models.CharField(_('language'), max_length=5, unique=True, choices=LanguageEnum.choices)
 
     def __str__(self):
@@ -441,7 +529,7 @@ class CVLanguage(models.Model):
 
 
 class SocialNetwork(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
     base_url = models.URLField(_('base url'), unique=True)
     icon_url = models.URLField(_('icon url'), unique=True)
@@ -454,11 +542,14 @@ class SocialNetwork(models.Model):
         verbose_name = _('social network')
         verbose_name_plural = _('social networks')
         db_table = 'core_social_networks'
+        indexes = [
+            prefix_index('name', 'social_network_name_prefix'),
+        ]
         ordering = ['name']
 
 
 class UserSocialNetwork(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
     social_network = models.ForeignKey(SocialNetwork, on_delete=models.CASCADE, related_name='+')
     username = models.CharField(_('username'), max_length=100)
@@ -496,7 +587,7 @@ class UserSocialNetwork(models.Model):
 
 
 class Project(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='projects')
     name = models.CharField(_('name'), max_length=100, unique=True)
     description = models.TextField(_('description'), null=True, blank=True)
@@ -523,7 +614,7 @@ class Project(models.Model):
 
 
 class Company(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(_('name'), max_length=100, unique=True)
     brief = models.CharField(_('brief'), max_length=255)
 
@@ -535,7 +626,7 @@ class Company(models.Model):
 
 
 class Brief(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user_role = models.ForeignKey(UserRole, on_delete=models.CASCADE, related_name='+')
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
     brief = models.CharField(_('user brief'), max_length=255)
@@ -548,17 +639,82 @@ class Brief(models.Model):
         verbose_name = _('brief')
         verbose_name_plural = _('briefs')
         db_table = 'core_briefs'
+        indexes = [
+            models.Index(fields=['user_role', 'company'], name='brief_user_role_company_idx'),
+        ]
         ordering = ['-created_at']
 
 
+class CvArtifactManager(models.Manager):
+    def store(self, source) -> 'CvArtifact':
+        """Return the artifact holding the content of the file object `source`.
+
+        Artifacts are addressed by the sha256 of their content, so a PDF identical to
+        one already stored is not written again.
+        """
+        digest, size = content_digest(source)
+        artifact = self.filter(sha256=digest).first()
+        if artifact is not None:
+            return artifact
+        name = artifact_name(digest)
+        if not artifact_storage.exists(name):
+            name = artifact_storage.save(name, File(source, name=name))
+            source.seek(0)
+        artifact, _ = self.get_or_create(sha256=digest, defaults={'file': name, 'size': size})
+        return artifact
+
+    def usage(self, user: User) -> dict:
+        """Number of stored CVs of `user` and the distinct artifacts and bytes they reference."""
+        cvs = Cv.objects.filter(user=user, artifact__isnull=False)
+        totals = self.filter(pk__in=cvs.values('artifact_id')).aggregate(
+            artifacts=models.Count('pk'), bytes=models.Sum('size')
+        )
+        return {'cvs': cvs.count(), 'artifacts': totals['artifacts'], 'bytes': totals['bytes'] or 0}
+
+
+class CvArtifact(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    sha256 = models.CharField(_('sha256'), max_length=64, unique=True)
+    file = models.FileField(_('file'), storage=get_artifact_storage, max_length=255)
+    size = models.PositiveBigIntegerField(_('size'))
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    objects = CvArtifactManager()
+
+    def __str__(self):
+        return self.sha256
+
+    class Meta:
+        verbose_name = _('cv artifact')
+        verbose_name_plural = _('cv artifacts')
+        db_table = 'core_cv_artifacts'
+
+
+class CvManager(models.Manager):
+    def record(self, user, language, role, brief, skills, company_name, company_brief, pdf) -> 'Cv':
+        """Add a generated CV to the history of `user`, with the content of the file object `pdf` as its artifact."""
+        with metrics.stage('artifact'):
+            artifact = CvArtifact.objects.store(pdf)
+        with metrics.stage('records'), transaction.atomic():
+            company, _ = Company.objects.get_or_create(name=company_name, defaults={'brief': company_brief})
+            user_brief, _ = Brief.objects.get_or_create(user_role=role, company=company, defaults={'brief': brief})
+            cv = self.create(
+                user=user, cv_language=language, role_id=role.role_id, brief=user_brief, artifact=artifact,
+            )
+            cv.skills.set([skill.skill_id for skill in skills])
+        return cv
+
+
 class Cv(models.Model):
-    id = models.CharField(max_length=50, primary_key=True, default=uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
     cv_language = models.ForeignKey(CVLanguage, on_delete=models.CASCADE, related_name='+')
     role = models.ForeignKey(Role, on_delete=models.CASCADE, related_name='+')
     brief = models.ForeignKey(Brief, on_delete=models.CASCADE, related_name='+')
     skills = models.ManyToManyField(Skill, related_name='+')
+    artifact = models.ForeignKey(CvArtifact, on_delete=models.PROTECT, related_name='cvs', null=True, blank=True)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    objects = CvManager()
 
     def __str__(self):
         return f'{self.user}'
@@ -567,4 +723,54 @@ class Cv(models.Model):
         verbose_name = _('cv')
         verbose_name_plural = _('cvs')
         db_table = 'core_cvs'
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='cv_user_created_idx'),
+        ]
+        ordering = ['-created_at']
+
+
+class CvJob(models.Model):
+    class StatusEnum(models.enums.TextChoices):
+        QUEUED = 'queued', _('Queued')
+        RUNNING = 'running', _('Running')
+        DONE = 'done', _('Done')
+        FAILED = 'failed', _('Failed')
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    cv_language = models.ForeignKey(CVLanguage, on_delete=models.CASCADE, related_name='+')
+    role = models.ForeignKey(UserRole, on_delete=models.CASCADE, related_name='+')
+    skills = models.ManyToManyField(UserSkill, related_name='+')
+    brief = models.CharField(_('brief'), max_length=255, blank=True)
+    company_name = models.CharField(_('company name'), max_length=255, blank=True)
+    company_brief = models.CharField(_('company brief'), max_length=255, blank=True)
+    status = models.CharField(_('status'), max_length=10, choices=StatusEnum.choices, default=StatusEnum.QUEUED)
+    artifact = models.ForeignKey(CvArtifact, on_delete=models.PROTECT, related_name='jobs', null=True, blank=True)
+    error = models.TextField(_('error'), blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    started_at = models.DateTimeField(_('started at'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('finished at'), null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.user} - {self.get_status_display()}'
+
+    @property
+    def wait_time(self):
+        if not self.started_at:
+            return None
+        return (self.started_at - self.created_at).total_seconds()
+
+    @property
+    def run_time(self):
+        if not self.started_at or not self.finished_at:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+    class Meta:
+        verbose_name = _('cv job')
+        verbose_name_plural = _('cv jobs')
+        db_table = 'core_cv_jobs'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='cv_job_queue_idx'),
+        ]
         ordering = ['-created_at']
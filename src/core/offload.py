@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class RenderOffloader:
+    """Run blocking CV generation from async views in a thread pool.
+
+    At most CV_ASYNC_RENDER_CONCURRENCY calls run at once; the others wait on a semaphore
+    without holding a thread, so the event loop keeps serving other requests.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+
+    @property
+    def concurrency(self) -> int:
+        return max(1, int(settings.CV_ASYNC_RENDER_CONCURRENCY))
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix='cv-render')
+            return self._executor
+
+    def semaphore(self) -> asyncio.Semaphore:
+        with self._lock:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.concurrency)
+            return self._semaphore
+
+    @staticmethod
+    def call(function, *args, **kwargs):
+        # Executor threads are not request threads: drop their connection once done with it.
+        close_old_connections()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    async def run(self, function, *args, **kwargs):
+        self.waiting += 1
+        try:
+            await self.semaphore().acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor(), partial(self.call, function, *args, **kwargs))
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.semaphore().release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._semaphore = None
+
+    def stats(self):
+        return {'waiting': self.waiting, 'running': self.running, 'completed': self.completed}
+
+
+render_offloader = RenderOffloader()
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO, Optional
+
+from django.conf import settings
+from django.template.loader import get_template
+
+from .fragments import SECTIONS
+from .render_engine import TEMPLATE_NAME
+from .rendering import render_assets
+
+_digests = {}
+
+
+def file_digest(path) -> str:
+    """Return the sha256 of `path`, recomputed only when its mtime changes."""
+    path = str(path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _digests.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as file:
+            cached = (mtime, hashlib.sha256(file.read()).hexdigest())
+        _digests[path] = cached
+    return cached[1]
+
+
+def templates_digest() -> str:
+    """Return a digest of the CV template and every section partial it includes."""
+    digests = [file_digest(get_template(name).origin.name) for name in (TEMPLATE_NAME, *SECTIONS.values())]
+    return hashlib.sha256(''.join(digests).encode()).hexdigest()
+
+
+def fingerprint(user, language, role, brief, skills, company_name, company_brief) -> str:
+    from .models import User, UserSocialNetwork
+
+    render_assets.get()
+    parts = {
+        'user': [str(user.pk), user.updated_at.isoformat()],
+        # Bumped by the receivers when a shared row the CV shows changes, such as a renamed role or city.
+        'profile_version': User.objects.values_list('profile_version', flat=True).get(pk=user.pk),
+        'language': language.language,
+        'role': str(role.pk),
+        'brief': brief or '',
+        'skills': sorted(str(skill.skill_id) for skill in skills),
+        'company': [company_name or '', company_brief or ''],
+        'experiences': list(user.experiences.order_by('id').values_list('id', 'updated_at')),
+        'educations': list(user.educations.order_by('id').values_list('id', 'updated_at')),
+        'languages': list(user.languages.order_by('id').values_list('id', 'updated_at')),
+        'socials': list(
+            UserSocialNetwork.objects.filter(user=user).order_by('id').values_list('id', 'social_network_id', 'username')
+        ),
+        'templates': templates_digest(),
+        'stylesheets': render_assets.digest,
+    }
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def version_tag(user, language, role, brief, skills, company_name, company_brief) -> str:
+    """Like `fingerprint`, but trusting `user.profile_version` instead of reading the profile rows."""
+    render_assets.get()
+    parts = {
+        'user': [str(user.pk), user.profile_version],
+        'language': language.language,
+        'role': str(role.pk),
+        'brief': brief or '',
+        'skills': sorted(str(skill_id) for skill_id in skills.values_list('skill_id', flat=True)),
+        'company': [company_name or '', company_brief or ''],
+        'templates': templates_digest(),
+        'stylesheets': render_assets.digest,
+    }
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PdfCache:
+    """Content-addressed PDF store on disk, evicting least recently used files past a size budget.
+
+    Recency is tracked through the files' mtime so every worker on the host shares one LRU order.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.CV_PDF_CACHE_DIR)
+
+    @property
+    def max_bytes(self) -> int:
+        return int(settings.CV_PDF_CACHE_MAX_BYTES)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f'{key}.pdf'
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Return the cached PDF opened for reading, or None.
+
+        The file is opened here so that an eviction right after the lookup cannot remove it
+        before the caller reads it.
+        """
+        try:
+            file = open(self.path_for(key), 'rb')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        os.utime(file.fileno())
+        with self._lock:
+            self.hits += 1
+        return file
+
+    def put(self, key: str, source) -> Path:
+        """Store the content of the file object `source`, leaving it rewound."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        source.seek(0)
+        with NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as dst:
+            shutil.copyfileobj(source, dst)
+        source.seek(0)
+        os.replace(dst.name, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+        return total
+
+    def clear(self):
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob('*.pdf'):
+            path.unlink(missing_ok=True)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+pdf_cache = PdfCache()
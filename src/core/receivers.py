@@ -1,8 +1,48 @@
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
+from modeltranslation.translator import translator
 
+from .fragments import fragment_cache
+from .models import (City, Country, Education, EducationCourse,
+                     EducationDegree, EducationInstitution, Experience,
+                     ExperienceCompany, ExperienceRole, Language, Project,
+                     Role, Skill, SocialNetwork, State, User, UserLanguage,
+                     UserRole, UserSkill, UserSocialNetwork)
+from .references import REFERENCE_MODELS, reference_cache
 from .signals import cv_generated
 
+# Rows owned by a single user, shown in a cached CV section.
+USER_FRAGMENT_MODELS = [Experience, Education, UserLanguage, UserSocialNetwork]
+
+# Shared rows whose (translated) names appear in cached CV sections.
+REFERENCE_FRAGMENT_MODELS = [
+  model for model in translator.get_registered_models()
+  if model._meta.app_label == 'core' and model not in USER_FRAGMENT_MODELS + [Project]
+] + [ExperienceCompany, SocialNetwork]
+
+# Rows owned by a single user and printed on their CV.
+USER_PROFILE_MODELS = [Experience, Education, UserSkill, UserLanguage, UserSocialNetwork, UserRole]
+
+# Shared rows printed on CVs, with the lookup from `User` to them.
+REFERENCE_PROFILE_LOOKUPS = {
+  City: 'city',
+  State: 'city__state',
+  Country: 'city__state__country',
+  Skill: 'skills__skill',
+  Language: 'languages__language',
+  Role: 'roles__role',
+  ExperienceCompany: 'experiences__company',
+  ExperienceRole: 'experiences__role',
+  EducationInstitution: 'educations__institution',
+  EducationCourse: 'educations__course',
+  EducationDegree: 'educations__degree',
+  SocialNetwork: 'social_networks',
+}
+
+# Saving only these fields does not change what the CV shows.
+USER_UNPRINTED_FIELDS = frozenset(['last_login', 'password'])
+
 
 @receiver(cv_generated)
 def send_cv_by_email(sender, cv, *args, **kwargs):
@@ -14,7 +54,58 @@ def send_cv_by_email(sender, cv, *args, **kwargs):
   #     to=[sender.email],
   #     connection=connection
   #   )
-  #   for arg in cv:
-  #     email.attach_file(arg, 'application/pdf')
+  #   email.attach('cv.pdf', cv.read(), 'application/pdf')
+  #   cv.seek(0)
   #   email.send()
   pass
+
+
+def invalidate_user_fragments(sender, instance, **kwargs):
+  fragment_cache.invalidate_user(instance.user_id)
+
+
+def invalidate_all_fragments(sender, **kwargs):
+  fragment_cache.invalidate_all()
+
+
+for model in USER_FRAGMENT_MODELS:
+  post_save.connect(invalidate_user_fragments, sender=model, dispatch_uid=f'cv_fragments_{model.__name__}_save')
+  post_delete.connect(invalidate_user_fragments, sender=model, dispatch_uid=f'cv_fragments_{model.__name__}_delete')
+
+for model in REFERENCE_FRAGMENT_MODELS:
+  post_save.connect(invalidate_all_fragments, sender=model, dispatch_uid=f'cv_fragments_{model.__name__}_save')
+  post_delete.connect(invalidate_all_fragments, sender=model, dispatch_uid=f'cv_fragments_{model.__name__}_delete')
+
+
+def invalidate_reference_table(sender, **kwargs):
+  reference_cache.invalidate(sender)
+
+
+for model in REFERENCE_MODELS:
+  post_save.connect(invalidate_reference_table, sender=model, dispatch_uid=f'reference_cache_{model.__name__}_save')
+  post_delete.connect(invalidate_reference_table, sender=model, dispatch_uid=f'reference_cache_{model.__name__}_delete')
+
+
+def bump_own_profile_version(sender, instance, created, update_fields=None, **kwargs):
+  if created or (update_fields is not None and update_fields <= USER_UNPRINTED_FIELDS):
+    return
+  User.objects.bump_profile_version(pk=instance.pk)
+
+
+def bump_owner_profile_version(sender, instance, **kwargs):
+  User.objects.bump_profile_version(pk=instance.user_id)
+
+
+def bump_referencing_profile_versions(sender, instance, **kwargs):
+  User.objects.bump_profile_version(**{REFERENCE_PROFILE_LOOKUPS[sender]: instance})
+
+
+post_save.connect(bump_own_profile_version, sender=User, dispatch_uid='profile_version_User_save')
+
+for model in USER_PROFILE_MODELS:
+  post_save.connect(bump_owner_profile_version, sender=model, dispatch_uid=f'profile_version_{model.__name__}_save')
+  post_delete.connect(bump_owner_profile_version, sender=model, dispatch_uid=f'profile_version_{model.__name__}_delete')
+
+# Deleting a shared row cascades to the owned rows pointing at it, which bump their owners.
+for model in REFERENCE_PROFILE_LOOKUPS:
+  post_save.connect(bump_referencing_profile_versions, sender=model, dispatch_uid=f'profile_version_{model.__name__}_save')
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from modeltranslation.translator import translator
+from modeltranslation.utils import get_language as translation_language
+
+from .models import CVLanguage, Country, EducationDegree, Role, Skill, SocialNetwork
+
+# Tables small and stable enough to be held in memory by every worker.
+REFERENCE_MODELS = [CVLanguage, SocialNetwork, Role, Skill, EducationDegree, Country]
+
+
+class ReferenceCache:
+    """Rows of the small reference tables, held in memory by each worker.
+
+    Tables are loaded whole, once per language for the translated ones since their order depends
+    on it. Each table has a generation in the `cv` cache, bumped when one of its rows changes;
+    workers compare it with the generation of their copy at most every
+    CV_REFERENCE_CACHE_CHECK_INTERVAL seconds, so lookups are dictionary hits in between.
+    The cached instances are shared: treat them as read-only.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.loads = 0
+        self._tables = {}
+        self._generations = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches['cv']
+
+    def _key(self, model):
+        return f'cv-reference-generation:{model._meta.label_lower}'
+
+    def _current_generations(self):
+        now = time.monotonic()
+        checked_at = self._checked_at
+        if checked_at is None or now - checked_at >= settings.CV_REFERENCE_CACHE_CHECK_INTERVAL:
+            keys = {self._key(model): model for model in REFERENCE_MODELS}
+            found = self.cache.get_many(keys)
+            self._generations = {model: found.get(key, 0) for key, model in keys.items()}
+            self._checked_at = now
+        return self._generations
+
+    def _load(self, model, key, generation):
+        # The generation is read before the rows, so a change racing the load only causes a reload.
+        rows = {row.pk: row for row in model.objects.all()}
+        with self._lock:
+            self._tables[key] = (generation, rows)
+            self.loads += 1
+        return rows
+
+    def _table(self, model):
+        if model not in REFERENCE_MODELS:
+            raise ValueError(f'{model.__name__} is not a cached reference table')
+        language = translation_language() if model in translator.get_registered_models() else None
+        return (model, language), self._current_generations()[model]
+
+    def rows(self, model) -> dict:
+        """The rows of `model` by primary key, in the order of its manager in the active language."""
+        key, generation = self._table(model)
+        cached = self._tables.get(key)
+        if cached is None or cached[0] != generation:
+            return self._load(model, key, generation)
+        with self._lock:
+            self.hits += 1
+        return cached[1]
+
+    def all(self, model) -> list:
+        return list(self.rows(model).values())
+
+    def get(self, model, pk):
+        """The `model` row `pk`, reloading the table once when it is unknown, as it may be newer than the copy."""
+        try:
+            return self.rows(model)[pk]
+        except KeyError:
+            pass
+        try:
+            return self._load(model, *self._table(model))[pk]
+        except KeyError:
+            raise model.DoesNotExist(f'{model.__name__} matching {pk!r} does not exist') from None
+
+    def attach(self, instances, field_name):
+        """Point the `field_name` foreign key of each of `instances` at the cached row, saving a join."""
+        for instance in instances:
+            field = instance._meta.get_field(field_name)
+            setattr(instance, field_name, self.get(field.related_model, getattr(instance, field.attname)))
+        return instances
+
+    def clear(self, model=None):
+        """Drop the copies of this worker, of `model` only when given."""
+        with self._lock:
+            self._tables = {
+                key: value for key, value in self._tables.items() if model is not None and key[0] is not model
+            }
+            self._checked_at = None
+
+    def _bump(self, model):
+        self.clear(model)
+        # Not `incr`: backends emulating it, such as FileBasedCache, rewrite the counter with the
+        # default timeout, after which it would restart at a generation already used.
+        key = self._key(model)
+        self.cache.set(key, self.cache.get(key, 0) + 1, None)
+
+    def invalidate(self, model):
+        """Drop the copies of `model` of every worker, now and once the current transaction commits.
+
+        The second bump covers the workers that reloaded the table before the change was committed.
+        """
+        self._bump(model)
+        transaction.on_commit(lambda: self._bump(model))
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'loads': self.loads}
+
+
+reference_cache = ReferenceCache()
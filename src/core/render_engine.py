@@ -0,0 +1,168 @@
+import atexit
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.translation import activate, deactivate
+from weasyprint import HTML
+
+from . import metrics
+from .assets import BASE_URL, url_fetcher
+from .rendering import render_assets
+
+TEMPLATE_NAME = 'cv/index.html'
+
+
+def render_timed(context: dict, language: str, target=None):
+    """Render `cv/index.html` with a materialised context.
+
+    Returns the PDF bytes, or None when written to the `target` file object, and the seconds
+    spent in each stage (template, layout, pdf).
+    """
+    timings = {}
+    activate(language)
+    try:
+        start = time.perf_counter()
+        html = get_template(TEMPLATE_NAME).render({**context, 'pdf': True})
+        timings['template'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stylesheets, font_config = render_assets.get()
+        document = HTML(string=html, base_url=BASE_URL, url_fetcher=url_fetcher).render(
+            stylesheets=stylesheets, font_config=font_config
+        )
+        timings['layout'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pdf = document.write_pdf(target)
+        timings['pdf'] = time.perf_counter() - start
+        return pdf, timings
+    finally:
+        deactivate()
+
+
+def render(context: dict, language: str) -> bytes:
+    """Render `cv/index.html` with a materialised context and return the PDF bytes."""
+    return render_timed(context, language)[0]
+
+
+def init_worker():
+    import django
+    django.setup()
+    get_template(TEMPLATE_NAME)
+    render_assets.warm()
+
+
+class RenderEngine:
+    """Pool of long-lived processes rendering CVs outside of the request process.
+
+    The pool is created lazily on first use, with `size` processes or else CV_RENDER_POOL_SIZE;
+    with a size of 0 renders run in-process.
+    Contexts sent to the pool must be fully materialised (lists, not querysets) because
+    they are pickled into the worker. A worker dying mid-render breaks the pool: it is
+    replaced and the render retried once.
+    """
+
+    def __init__(self, size=None):
+        self._size = size
+        self.renders = 0
+        self.pooled = 0
+        self.restarts = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        if self._size is not None:
+            return self._size
+        return int(settings.CV_RENDER_POOL_SIZE)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                options = {}
+                # Older interpreters keep the workers for the lifetime of the pool.
+                if settings.CV_RENDER_POOL_MAX_TASKS and sys.version_info >= (3, 11):
+                    options['max_tasks_per_child'] = settings.CV_RENDER_POOL_MAX_TASKS
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    mp_context=multiprocessing.get_context(settings.CV_RENDER_POOL_START_METHOD),
+                    initializer=init_worker,
+                    **options,
+                )
+            return self._pool
+
+    def _discard(self, pool, terminate=False):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+                self.restarts += 1
+        if terminate:
+            # A running render cannot be cancelled: stop its worker rather than let it hold the slot.
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _render_pooled(self, context: dict, language: str):
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                future = pool.submit(render_timed, context, language)
+                self.pooled += 1
+                return future.result(timeout=settings.CV_RENDER_TIMEOUT)
+            except FutureTimeoutError:
+                if not future.cancel():
+                    self._discard(pool, terminate=True)
+                raise
+            except BrokenProcessPool:
+                self._discard(pool)
+                if attempt:
+                    raise
+
+    def _observe(self, timings, size):
+        for name, seconds in timings.items():
+            metrics.record(name, seconds)
+        metrics.pdf_bytes.observe(size)
+
+    def render(self, context: dict, language: str) -> bytes:
+        self.renders += 1
+        if self.size <= 0:
+            pdf, timings = render_timed(context, language)
+        else:
+            pdf, timings = self._render_pooled(context, language)
+        self._observe(timings, len(pdf))
+        return pdf
+
+    def render_to(self, context: dict, language: str, output):
+        """Render into the empty file object `output`, without an intermediate copy when in-process."""
+        self.renders += 1
+        if self.size <= 0:
+            _, timings = render_timed(context, language, output)
+        else:
+            pdf, timings = self._render_pooled(context, language)
+            output.write(pdf)
+        self._observe(timings, output.tell())
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'renders': self.renders,
+            'pooled': self.pooled,
+            'restarts': self.restarts,
+        }
+
+
+render_engine = RenderEngine()
+atexit.register(render_engine.close)
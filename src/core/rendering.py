@@ -0,0 +1,107 @@
+import hashlib
+import threading
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+from weasyprint import CSS
+from weasyprint.text.fonts import FontConfiguration
+
+STYLESHEETS = [Path(__file__).parent / 'static/css/styles_out.css']
+
+
+class RenderAssets:
+    """Parsed stylesheets and the font configuration shared by every render in this process.
+
+    The files are stat'ed on each access and re-parsed only when their content hash changes.
+    """
+
+    def __init__(self, stylesheets: Iterable[Path]):
+        self.paths = [Path(path) for path in stylesheets]
+        self.hits = 0
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self._digest = None
+        self._stylesheets: List[CSS] = []
+        self._font_config = None
+
+    def _read_mtimes(self):
+        return tuple(path.stat().st_mtime_ns for path in self.paths)
+
+    def _read_digest(self):
+        digest = hashlib.sha256()
+        for path in self.paths:
+            digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def _load(self, digest):
+        font_config = FontConfiguration()
+        self._stylesheets = [CSS(filename=path, font_config=font_config) for path in self.paths]
+        self._font_config = font_config
+        self._digest = digest
+        self.reloads += 1
+
+    def get(self) -> Tuple[List[CSS], FontConfiguration]:
+        with self._lock:
+            mtimes = self._read_mtimes()
+            if mtimes != self._mtimes:
+                digest = self._read_digest()
+                if digest != self._digest:
+                    self._load(digest)
+                self._mtimes = mtimes
+            else:
+                self.hits += 1
+            return self._stylesheets, self._font_config
+
+    def warm(self):
+        self.get()
+
+    @property
+    def digest(self):
+        return self._digest
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'reloads': self.reloads,
+            'digest': self._digest,
+        }
+
+
+render_assets = RenderAssets(STYLESHEETS)
+
+
+class RenderOutput(SpooledTemporaryFile):
+    """Buffer holding a rendered PDF in memory, spilling to a temporary file above CV_OUTPUT_SPOOL_BYTES."""
+
+    created = 0
+    spills = 0
+    spilled_bytes = 0
+    _lock = threading.Lock()
+
+    def __init__(self, max_size=None):
+        if max_size is None:
+            max_size = settings.CV_OUTPUT_SPOOL_BYTES
+        self.spilled = False
+        super().__init__(max_size=max_size, mode='w+b', suffix='.pdf')
+        with self._lock:
+            RenderOutput.created += 1
+
+    def rollover(self):
+        if not self.spilled:
+            self.spilled = True
+            size = self.tell()
+            with self._lock:
+                RenderOutput.spills += 1
+                RenderOutput.spilled_bytes += size
+        super().rollover()
+
+    @classmethod
+    def stats(cls):
+        return {
+            'created': cls.created,
+            'spills': cls.spills,
+            'spilled_bytes': cls.spilled_bytes,
+        }
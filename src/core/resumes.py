@@ -0,0 +1,591 @@
+import re
+from datetime import date
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils.translation import get_language, override
+from modeltranslation.manager import MultilingualManager
+from modeltranslation.settings import AVAILABLE_LANGUAGES
+from modeltranslation.utils import build_localized_fieldname
+from modeltranslation.utils import get_language as translation_language
+from modeltranslation.utils import resolution_order
+
+from .fragments import fragment_cache
+from .models import (City, Cv, Education, EducationCourse, EducationDegree,
+                     EducationInstitution, Experience, ExperienceCompany,
+                     ExperienceRole, Language, Role, Skill, SocialNetwork,
+                     State, User, UserLanguage, UserRole, UserSkill,
+                     UserSocialNetwork)
+from .references import REFERENCE_MODELS, reference_cache
+
+# Documents whose reference rows are looked up and created together.
+DOCUMENT_BATCH_SIZE = 100
+
+# Rows per INSERT statement.
+INSERT_BATCH_SIZE = 500
+
+# Users exported per query, with the rows of their resumes fetched together.
+EXPORT_CHUNK_SIZE = 200
+
+# JSON Resume leaves `fluency` free-form: map the usual wordings to CEFR levels.
+FLUENCY_LEVELS = {
+    'beginner': UserLanguage.LevelEnum.A1,
+    'elementary': UserLanguage.LevelEnum.A2,
+    'intermediate': UserLanguage.LevelEnum.B1,
+    'upper intermediate': UserLanguage.LevelEnum.B2,
+    'advanced': UserLanguage.LevelEnum.C1,
+    'fluent': UserLanguage.LevelEnum.C2,
+    'proficient': UserLanguage.LevelEnum.C2,
+    **{level.lower(): level for level in UserLanguage.LevelEnum.values},
+}
+
+DATE_PATTERN = re.compile(r'^(\d{4})(?:-(\d{2}))?(?:-(\d{2}))?')
+
+
+class ResumeError(ValueError):
+    """Raised for a document that does not describe a complete profile."""
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def text(value) -> str:
+    return value.strip() if isinstance(value, str) else ''
+
+
+def too_long(model, field, value) -> Optional[str]:
+    """Why `value` does not fit the `field` column of `model`, when it does not."""
+    max_length = model._meta.get_field(field).max_length
+    if len(value) > max_length:
+        return f'{value[:max_length]!r}... is longer than {max_length} characters'
+    return None
+
+
+def parse_date(value, field) -> Optional[date]:
+    """Parse the `YYYY`, `YYYY-MM` or `YYYY-MM-DD` dates of JSON Resume."""
+    value = text(value)
+    if not value:
+        return None
+    match = DATE_PATTERN.match(value)
+    if match is None:
+        raise ResumeError(f'{field}: invalid date {value!r}')
+    year, month, day = match.groups()
+    try:
+        return date(int(year), int(month or 1), int(day or 1))
+    except ValueError:
+        raise ResumeError(f'{field}: invalid date {value!r}') from None
+
+
+def parse(document) -> dict:
+    """Validate a JSON Resume document and flatten it into the rows of a profile.
+
+    Besides the JSON Resume schema (https://jsonresume.org/schema/), `basics` may hold `firstName`,
+    `middleName`, `lastName` and `birthDate`, which our users require, `location.region` may be
+    the abbreviation of a state and `roles` lists roles besides `basics.label`. Entries missing
+    a required reference are reported and skipped.
+    """
+    if not isinstance(document, dict):
+        raise ResumeError('A resume must be a JSON object')
+    basics = document.get('basics') or {}
+    email = text(basics.get('email'))
+    if not email:
+        raise ResumeError('basics.email is required')
+
+    names = text(basics.get('name')).split()
+    first_name = text(basics.get('firstName')) or (names[0] if names else '')
+    last_name = text(basics.get('lastName')) or (names[-1] if len(names) > 1 else '')
+    middle_name = text(basics.get('middleName')) or ' '.join(names[1:-1])
+    for field, value in [('first_name', first_name), ('middle_name', middle_name), ('last_name', last_name)]:
+        error = too_long(User, field, value)
+        if error:
+            raise ResumeError(f'basics: {User._meta.get_field(field).verbose_name} {error}')
+    tel = text(basics.get('phone'))
+    if tel:
+        tel = '+' + re.sub(r'\D', '', tel)
+        if len(tel) > User._meta.get_field('tel').max_length:
+            raise ResumeError(f'basics.phone: {tel} is too long')
+    location = basics.get('location') or {}
+    city = text(location.get('city'))
+    roles = [text(basics.get('label'))] + [text(role) for role in document.get('roles') or []]
+
+    profile = {
+        'email': User.objects.normalize_email(email),
+        'user': {
+            'first_name': first_name,
+            'middle_name': middle_name,
+            'last_name': last_name,
+            'birth_date': parse_date(basics.get('birthDate'), 'basics.birthDate'),
+            'tel': tel,
+        },
+        'city': city,
+        'region': text(location.get('region')),
+        'roles': [],
+        'socials': [],
+        'experiences': [],
+        'educations': [],
+        'skills': [],
+        'languages': [],
+        'skipped': [],
+    }
+
+    # Shared rows are created in bulk for a whole batch: names that do not fit are skipped here.
+    error = too_long(City, 'name', city)
+    if error:
+        profile['skipped'].append(f'basics.location.city: {error}')
+        profile['city'] = ''
+    for role in dict.fromkeys(filter(None, roles)):
+        error = too_long(Role, 'name', role)
+        if error:
+            profile['skipped'].append(f'roles: {error}')
+        else:
+            profile['roles'].append(role)
+
+    for index, entry in enumerate(basics.get('profiles') or []):
+        network, username = text(entry.get('network')), text(entry.get('username'))
+        if not (network and username):
+            profile['skipped'].append(f'basics.profiles[{index}]: network and username are required')
+        elif error := too_long(UserSocialNetwork, 'username', username):
+            profile['skipped'].append(f'basics.profiles[{index}].username: {error}')
+        else:
+            profile['socials'].append({'network': network, 'username': username})
+
+    for index, entry in enumerate(document.get('work') or []):
+        company, position = text(entry.get('name') or entry.get('company')), text(entry.get('position'))
+        start_date = parse_date(entry.get('startDate'), f'work[{index}].startDate')
+        if not (company and position and start_date):
+            profile['skipped'].append(f'work[{index}]: name, position and startDate are required')
+            continue
+        error = too_long(ExperienceCompany, 'name', company) or too_long(ExperienceRole, 'name', position)
+        if error:
+            profile['skipped'].append(f'work[{index}]: {error}')
+            continue
+        highlights = [text(highlight) for highlight in entry.get('highlights') or []]
+        description = '\n'.join(filter(None, [text(entry.get('summary'))] + highlights))
+        profile['experiences'].append({
+            'company': company,
+            'role': position,
+            'description': description or None,
+            'start_date': start_date,
+            'end_date': parse_date(entry.get('endDate'), f'work[{index}].endDate'),
+        })
+
+    for index, entry in enumerate(document.get('education') or []):
+        institution, course = text(entry.get('institution')), text(entry.get('area'))
+        degree = text(entry.get('studyType'))
+        start_date = parse_date(entry.get('startDate'), f'education[{index}].startDate')
+        if not (institution and course and degree and start_date):
+            profile['skipped'].append(f'education[{index}]: institution, area, studyType and startDate are required')
+            continue
+        error = (
+            too_long(EducationInstitution, 'name', institution)
+            or too_long(EducationCourse, 'name', course)
+            or too_long(EducationDegree, 'name', degree)
+        )
+        if error:
+            profile['skipped'].append(f'education[{index}]: {error}')
+            continue
+        profile['educations'].append({
+            'institution': institution,
+            'course': course,
+            'degree': degree,
+            'start_date': start_date,
+            'end_date': parse_date(entry.get('endDate'), f'education[{index}].endDate'),
+        })
+
+    for index, entry in enumerate(document.get('skills') or []):
+        keywords = [text(keyword) for keyword in entry.get('keywords') or []]
+        for name in filter(None, [text(entry.get('name'))] + keywords):
+            error = too_long(Skill, 'name', name)
+            if error:
+                profile['skipped'].append(f'skills[{index}]: {error}')
+            else:
+                profile['skills'].append(name)
+
+    for index, entry in enumerate(document.get('languages') or []):
+        language, fluency = text(entry.get('language')), text(entry.get('fluency')).lower()
+        if not language:
+            profile['skipped'].append(f'languages[{index}]: language is required')
+            continue
+        error = too_long(Language, 'name', language)
+        if error:
+            profile['skipped'].append(f'languages[{index}]: {error}')
+            continue
+        is_native = 'native' in fluency
+        level = UserLanguage.LevelEnum.C2 if is_native else FLUENCY_LEVELS.get(fluency, UserLanguage.LevelEnum.B1)
+        profile['languages'].append({'language': language, 'level': level, 'is_native': is_native})
+    return profile
+
+
+def name_fields(model):
+    if isinstance(model.objects, MultilingualManager):
+        return ['name'] + [build_localized_fieldname('name', language) for language in AVAILABLE_LANGUAGES]
+    return ['name']
+
+
+def lookup(model, names, fields) -> dict:
+    """Primary keys of the rows of `model` with one of `names` as name, in any language."""
+    queryset = model.objects.all()
+    if isinstance(model.objects, MultilingualManager):
+        queryset = queryset.rewrite(False)
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__in': names})
+    found = {}
+    for pk, *values in queryset.filter(condition).order_by().values_list('pk', *fields):
+        for value in values:
+            if value in names:
+                found.setdefault(value, pk)
+    return found
+
+
+def resolve(model, names, defaults=None) -> dict:
+    """Map each of `names` to the primary key of the `model` row of that name, creating the missing ones.
+
+    `defaults` holds the other required fields of the rows to create, by name; names without them
+    are only looked up.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    fields = name_fields(model)
+    found = lookup(model, names, fields)
+    missing = [name for name in names - found.keys() if defaults is None or name in defaults]
+    if missing:
+        # Rows created meanwhile by a concurrent import are skipped and picked up by the lookup below.
+        model.objects.bulk_create(
+            [model(name=name, **(defaults or {}).get(name, {})) for name in missing],
+            batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True,
+        )
+        found.update(lookup(model, set(missing), fields))
+        if model in REFERENCE_MODELS:
+            # bulk_create sends no `post_save`.
+            reference_cache.invalidate(model)
+    return found
+
+
+def acronym(name: str) -> str:
+    return ''.join(word[0] for word in name.split() if word[0].isupper())[:10] or name[:10]
+
+
+def entries(profiles, section, key) -> set:
+    return {entry[key] for profile in profiles for entry in profile[section]}
+
+
+def resolve_references(profiles) -> dict:
+    """Look up, and create when missing, every shared row the `profiles` reference, in a few queries per model."""
+    regions = {profile['region'] for profile in profiles if profile['region']}
+    states = {}
+    if regions:
+        fields = name_fields(State)
+        condition = Q(abbreviation__in={region.upper() for region in regions})
+        for field in fields:
+            condition |= Q(**{f'{field}__in': regions})
+        queryset = State.objects.rewrite(False).filter(condition).values_list('pk', 'abbreviation', *fields)
+        for pk, abbreviation, *names in queryset:
+            for key in [abbreviation, *names]:
+                states.setdefault(key, pk)
+    city_states = {
+        profile['city']: states.get(profile['region']) or states.get(profile['region'].upper())
+        for profile in profiles if profile['city']
+    }
+    cities = resolve(City, city_states, {city: {'state_id': state} for city, state in city_states.items() if state})
+
+    institution_cities = {}
+    for profile in profiles:
+        for education in profile['educations']:
+            if cities.get(profile['city']):
+                institution_cities.setdefault(education['institution'], cities[profile['city']])
+    institutions = resolve(EducationInstitution, entries(profiles, 'educations', 'institution'), {
+        name: {'city_id': city, 'acronym': acronym(name)} for name, city in institution_cities.items()
+    })
+
+    networks = {name.casefold(): pk for pk, name in SocialNetwork.objects.values_list('pk', 'name')}
+    return {
+        'cities': cities,
+        'institutions': institutions,
+        'networks': networks,
+        'roles': resolve(Role, {role for profile in profiles for role in profile['roles']}),
+        'skills': resolve(Skill, {skill for profile in profiles for skill in profile['skills']}),
+        'languages': resolve(Language, entries(profiles, 'languages', 'language')),
+        'companies': resolve(ExperienceCompany, entries(profiles, 'experiences', 'company')),
+        'experience_roles': resolve(ExperienceRole, entries(profiles, 'experiences', 'role')),
+        'courses': resolve(EducationCourse, entries(profiles, 'educations', 'course')),
+        'degrees': resolve(EducationDegree, entries(profiles, 'educations', 'degree')),
+    }
+
+
+def save_user(profile, references) -> Tuple[User, bool]:
+    fields = {name: value for name, value in profile['user'].items() if value}
+    city = references['cities'].get(profile['city'])
+    if city:
+        fields['city_id'] = city
+    user = User.objects.filter(email=profile['email']).first()
+    if user is None:
+        missing = [name for name in User.REQUIRED_FIELDS if name not in fields]
+        if missing:
+            raise ResumeError(f'New users require {", ".join(missing)}')
+        user = User(email=profile['email'], password=make_password(None), **fields)
+        user.save()
+        return user, True
+    for name, value in fields.items():
+        setattr(user, name, value)
+    user.save(update_fields=list(fields))
+    return user, False
+
+
+def count_rows(user, models) -> dict:
+    """The number of rows of each of `models` belonging to `user`, in one query."""
+    counts = {
+        f'{model._meta.model_name}_count': Subquery(
+            model.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(total=Count('pk')).values('total')
+        )
+        for model in models
+    }
+    found = User.objects.filter(pk=user.pk).values(**counts).get()
+    return {model: found[f'{model._meta.model_name}_count'] or 0 for model in models}
+
+
+def save_profile(profile, references) -> dict:
+    """Create or update the user of `profile` and add the rows it lists, in one transaction."""
+    skipped = list(profile['skipped'])
+    with transaction.atomic():
+        user, created = save_user(profile, references)
+        if profile['city'] and not references['cities'].get(profile['city']):
+            skipped.append(f'basics.location: unknown city {profile["city"]!r} and region {profile["region"]!r}')
+
+        rows = {
+            UserRole: [UserRole(user=user, role_id=references['roles'][name]) for name in profile['roles']],
+            UserSkill: [UserSkill(user=user, skill_id=references['skills'][name]) for name in profile['skills']],
+            UserLanguage: [
+                UserLanguage(user=user, language_id=references['languages'][entry['language']],
+                             level=entry['level'], is_native=entry['is_native'])
+                for entry in profile['languages']
+            ],
+            Experience: [
+                Experience(user=user, company_id=references['companies'][entry['company']],
+                           role_id=references['experience_roles'][entry['role']], description=entry['description'],
+                           start_date=entry['start_date'], end_date=entry['end_date'])
+                for entry in profile['experiences']
+            ],
+            Education: [],
+            UserSocialNetwork: [],
+        }
+        for entry in profile['educations']:
+            institution = references['institutions'].get(entry['institution'])
+            if institution is None:
+                skipped.append(f'education: unknown institution {entry["institution"]!r} outside of a known city')
+                continue
+            rows[Education].append(Education(
+                user=user, institution_id=institution, course_id=references['courses'][entry['course']],
+                degree_id=references['degrees'][entry['degree']], start_date=entry['start_date'], end_date=entry['end_date'],
+            ))
+        for entry in profile['socials']:
+            network = references['networks'].get(entry['network'].casefold())
+            if network is None:
+                skipped.append(f'basics.profiles: unknown network {entry["network"]!r}')
+                continue
+            rows[UserSocialNetwork].append(
+                UserSocialNetwork(user=user, social_network_id=network, username=entry['username'])
+            )
+
+        # Rows the user already has are left as they are, so importing a resume again is harmless.
+        # bulk_create does not tell which rows it ignored: the rows reported are counted instead.
+        before = dict.fromkeys(rows, 0) if created else count_rows(user, rows)
+        for model, objects in rows.items():
+            model.objects.bulk_create(objects, batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True)
+        after = count_rows(user, rows)
+
+        # bulk_create sends no `post_save`: invalidate what the receivers would have.
+        User.objects.bump_profile_version(pk=user.pk)
+        transaction.on_commit(lambda: fragment_cache.invalidate_user(user.pk))
+
+    return {
+        'email': user.email,
+        'id': user.pk,
+        'created': created,
+        'rows': {model._meta.model_name: after[model] - before[model] for model in rows},
+        'skipped': skipped,
+    }
+
+
+def import_batch(documents) -> list:
+    profiles = []
+    for document in documents:
+        try:
+            profiles.append(parse(document))
+        except ResumeError as exc:
+            profiles.append(exc)
+    references = resolve_references([profile for profile in profiles if isinstance(profile, dict)])
+    results = []
+    for profile in profiles:
+        if isinstance(profile, ResumeError):
+            results.append({'error': str(profile)})
+            continue
+        try:
+            results.append(save_profile(profile, references))
+        except (ResumeError, IntegrityError) as exc:
+            results.append({'email': profile['email'], 'error': str(exc)})
+    return results
+
+
+def import_resumes(documents: Iterable, language: Optional[str] = None,
+                   batch_size: int = DOCUMENT_BATCH_SIZE) -> Iterator[dict]:
+    """Import JSON Resume `documents`, yielding the outcome of each in order.
+
+    Names are read in `language`, the active one by default, and the shared rows missing from the
+    database are created with their name in that language. A document that cannot be imported
+    yields its `error` and leaves the database untouched.
+    """
+    language = language or get_language()
+    for batch in batched(documents, batch_size):
+        with override(language):
+            results = import_batch(batch)
+        yield from results
+
+
+def localized(field, path=None):
+    """The translated `field` at `path` in the active language, falling back as modeltranslation does."""
+    prefix = f'{path}__' if path else ''
+    fallbacks = [build_localized_fieldname(field, language) for language in resolution_order(translation_language())]
+    return Coalesce(
+        *(NullIf(F(prefix + name), Value('')) for name in fallbacks), F(prefix + field), output_field=TextField()
+    )
+
+
+def by_key(rows, key) -> dict:
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.pop(key), []).append(row)
+    return grouped
+
+
+def isoformat(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def fetch_chunk(user_ids) -> dict:
+    """The rows the resumes of `user_ids` list, by kind then by user, in one query per kind.
+
+    Only the printed columns are read, as dicts: exports are bound by the cost of building model
+    instances and resolving their translations otherwise. Rows come in the order of their model.
+    """
+    def rows(model, *fields, **expressions):
+        return by_key(model.objects.filter(user_id__in=user_ids).values('user_id', *fields, **expressions), 'user_id')
+
+    cvs = rows(
+        Cv, 'id', 'created_at', 'brief__brief', 'artifact__sha256', 'cv_language__language',
+        role_name=localized('name', 'role'), company_name=F('brief__company__name'),
+    )
+    cv_skills = Cv.skills.through.objects.filter(cv__user_id__in=user_ids).values('cv_id', name=localized('name', 'skill'))
+    return {
+        'roles': rows(UserRole, name=localized('name', 'role')),
+        'skills': rows(UserSkill, name=localized('name', 'skill')),
+        'languages': rows(UserLanguage, 'level', 'is_native', name=localized('name', 'language')),
+        'socials': rows(UserSocialNetwork, 'username', network=F('social_network__name')),
+        'experiences': rows(
+            Experience, 'start_date', 'end_date', 'company__name', role_name=localized('name', 'role'),
+            summary=localized('description'),
+        ),
+        'educations': rows(
+            Education, 'start_date', 'end_date', institution_name=localized('name', 'institution'),
+            course_name=localized('name', 'course'), degree_name=localized('name', 'degree'),
+        ),
+        'cvs': cvs,
+        'cv_skills': by_key(cv_skills.order_by('name'), 'cv_id'),
+    }
+
+
+def resume(user, rows) -> dict:
+    """The JSON Resume document of `user`, in the format `import_resumes` reads, with their CV history as `cvs`."""
+    def listed(kind):
+        return rows[kind].get(user['id'], [])
+
+    roles = [role['name'] for role in listed('roles')]
+    return {
+        'basics': {
+            'name': ' '.join(filter(None, [user['first_name'], user['middle_name'], user['last_name']])),
+            'label': roles[0] if roles else '',
+            'email': user['email'],
+            'phone': user['tel'],
+            'firstName': user['first_name'],
+            'middleName': user['middle_name'],
+            'lastName': user['last_name'],
+            'birthDate': isoformat(user['birth_date']),
+            'location': {'city': user['city_name'], 'region': user['city__state__abbreviation']} if user['city_name'] else {},
+            'profiles': [
+                {'network': social['network'], 'username': social['username']}
+                for social in listed('socials')
+            ],
+        },
+        'roles': roles,
+        'work': [
+            {
+                'name': experience['company__name'],
+                'position': experience['role_name'],
+                'summary': experience['summary'] or '',
+                'startDate': isoformat(experience['start_date']),
+                'endDate': isoformat(experience['end_date']),
+            }
+            for experience in listed('experiences')
+        ],
+        'education': [
+            {
+                'institution': education['institution_name'],
+                'area': education['course_name'],
+                'studyType': education['degree_name'],
+                'startDate': isoformat(education['start_date']),
+                'endDate': isoformat(education['end_date']),
+            }
+            for education in listed('educations')
+        ],
+        'skills': [{'name': name} for name in sorted(skill['name'] for skill in listed('skills'))],
+        'languages': [
+            {'language': language['name'], 'fluency': 'Native speaker' if language['is_native'] else language['level']}
+            for language in listed('languages')
+        ],
+        'cvs': [
+            {
+                'id': str(cv['id']),
+                'createdAt': isoformat(cv['created_at']),
+                'language': cv['cv_language__language'],
+                'role': cv['role_name'],
+                'company': cv['company_name'],
+                'brief': cv['brief__brief'],
+                'skills': [skill['name'] for skill in rows['cv_skills'].get(cv['id'], [])],
+                'sha256': cv['artifact__sha256'],
+            }
+            for cv in listed('cvs')
+        ],
+        'meta': {'id': str(user['id']), 'lastModified': isoformat(user['profile_updated_at'])},
+    }
+
+
+def export_resumes(users=None, language: Optional[str] = None,
+                   chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    """Yield the resume of each of `users`, every user by default, with names in `language`.
+
+    Users are read `chunk_size` at a time, through a server-side cursor on PostgreSQL, and the
+    rows their resumes list are fetched once per chunk, so memory holds a single chunk however
+    many users there are.
+    """
+    language = language or get_language()
+    with override(language):
+        users = (User.objects.all() if users is None else users).order_by('pk').values(
+            'id', 'email', 'first_name', 'middle_name', 'last_name', 'birth_date', 'tel', 'profile_updated_at',
+            'city__state__abbreviation', city_name=localized('name', 'city'),
+        ).iterator(chunk_size=chunk_size)
+    while True:
+        with override(language):
+            chunk = list(islice(users, chunk_size))
+            if not chunk:
+                return
+            rows = fetch_chunk([user['id'] for user in chunk])
+            documents = [resume(user, rows) for user in chunk]
+        yield from documents
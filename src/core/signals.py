@@ -1,3 +1,6 @@
 from django.dispatch import Signal
 
+# Sent by `User.generate_cv` with `cv`, the generated PDF as a binary file object positioned
+# at its start (it used to be the path of a temporary file). Receivers must not close it and
+# should seek back to 0 after reading it.
 cv_generated = Signal()
@@ -0,0 +1,149 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Optional
+
+from django.conf import settings
+
+POLL_INTERVAL = 0.05
+
+
+def flight_key(user, language, role, brief, skills, company_name, company_brief) -> str:
+    """Key of a render request: identical submissions of `GenerateForm` share it."""
+    parts = [
+        str(user.pk),
+        user.profile_version,
+        language.language,
+        str(role.pk),
+        brief or '',
+        sorted(str(skill.skill_id) for skill in skills),
+        company_name or '',
+        company_brief or '',
+    ]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+class SingleFlight:
+    """Coalesce identical renders running at the same time on this host.
+
+    The first request for a key locks `<key>.lock` and renders; identical requests block on the
+    same lock. Before releasing it, the leader publishes the PDF as `<key>.pdf`, which the
+    followers pick up instead of rendering. Whoever holds the lock unlinks the lock file before
+    releasing it, so lock files do not pile up; published results live CV_SINGLE_FLIGHT_RESULT_TTL
+    seconds.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.CV_SINGLE_FLIGHT_DIR)
+
+    @property
+    def timeout(self) -> float:
+        return float(settings.CV_SINGLE_FLIGHT_TIMEOUT)
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout > 0
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def lock(self, path: Path, timeout: float) -> Optional[int]:
+        deadline = time.monotonic() + timeout
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(POLL_INTERVAL)
+                continue
+            try:
+                current = os.stat(path).st_ino == os.fstat(fd).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                return fd
+            # The previous holder unlinked this file: lock the one now at `path` instead.
+            os.close(fd)
+
+    @staticmethod
+    def unlock(path: Path, fd: int):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+    def publish(self, path: Path, source):
+        source.seek(0)
+        with NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as dst:
+            shutil.copyfileobj(source, dst)
+        source.seek(0)
+        os.replace(dst.name, path)
+
+    def sweep(self):
+        expired = time.time() - float(settings.CV_SINGLE_FLIGHT_RESULT_TTL)
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    if entry.stat().st_mtime < expired:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+
+    def run(self, key: str, produce):
+        """Return the file object `produce()` returns, or the one an identical in-flight call produced."""
+        if not self.enabled:
+            return produce()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        started = time.time()
+        lock_path = self.directory / f'{key}.lock'
+        result_path = self.directory / f'{key}.pdf'
+
+        fd = self.lock(lock_path, 0)
+        if fd is None:
+            fd = self.lock(lock_path, self.timeout)
+            if fd is None:
+                self.count('timeouts')
+                return produce()
+            try:
+                if os.stat(result_path).st_mtime >= started:
+                    self.count('followers')
+                    result = open(result_path, 'rb')
+                    self.unlock(lock_path, fd)
+                    return result
+            except FileNotFoundError:
+                pass
+
+        try:
+            self.count('leaders')
+            result = produce()
+            self.publish(result_path, result)
+            self.sweep()
+            return result
+        finally:
+            self.unlock(lock_path, fd)
+
+    def stats(self):
+        return {'leaders': self.leaders, 'followers': self.followers, 'timeouts': self.timeouts}
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,60 @@
+from datetime import date
+
+from .models import (City, Country, CVLanguage, Education, EducationCourse,
+                     EducationDegree, EducationInstitution, Experience,
+                     ExperienceCompany, ExperienceRole, Language, Role, Skill,
+                     SocialNetwork, State, User, UserLanguage, UserRole,
+                     UserSkill, UserSocialNetwork)
+
+
+def create_profile(size: int, email: str = 'jon@doe.com', tel: str = '+5511912345678', password: str = 'secret'):
+    """Create a user with `size` experiences, educations, languages and social networks, 10 skills and a role.
+
+    Shared rows are reused between profiles. Used by the tests and the benchmarks; returns the user
+    and their user role.
+    """
+    country, _ = Country.objects.get_or_create(name='Brasil')
+    state, _ = State.objects.get_or_create(abbreviation='SP', defaults={'name': 'São Paulo', 'country': country})
+    city, _ = City.objects.get_or_create(name='Campinas', defaults={'state': state})
+    user = User.objects.create_user(
+        email=email, password=password, first_name='Jon', middle_name='Smith', last_name='Doe',
+        birth_date=date(1990, 1, 1), tel=tel, city=city,
+    )
+    institution, _ = EducationInstitution.objects.get_or_create(name='Unicamp', city=city, defaults={'acronym': 'UNICAMP'})
+    degree, _ = EducationDegree.objects.get_or_create(name='Bachelor')
+    for i in range(size):
+        company, _ = ExperienceCompany.objects.get_or_create(name=f'Company {i}')
+        experience_role, _ = ExperienceRole.objects.get_or_create(name=f'Developer {i}')
+        Experience.objects.create(
+            user=user, company=company, role=experience_role, start_date=date(2000 + i % 20, 1, 1),
+            description='Designed, built and operated services. ' * 5,
+        )
+        course, _ = EducationCourse.objects.get_or_create(name=f'Course {i}')
+        Education.objects.create(
+            user=user, institution=institution, course=course, degree=degree, start_date=date(2000 + i % 20, 1, 1),
+        )
+        language, _ = Language.objects.get_or_create(name=f'Language {i}')
+        UserLanguage.objects.create(user=user, language=language, level=UserLanguage.LevelEnum.B1, is_native=False)
+        network, _ = SocialNetwork.objects.get_or_create(
+            name=f'Network {i}', defaults={'base_url': f'https://network{i}.com', 'icon_url': f'https://network{i}.com/icon.png'},
+        )
+        UserSocialNetwork.objects.create(user=user, social_network=network, username=email)
+    for i in range(10):
+        skill, _ = Skill.objects.get_or_create(name=f'Skill {i}')
+        UserSkill.objects.create(user=user, skill=skill)
+    role, _ = Role.objects.get_or_create(name='Backend developer')
+    user_role = UserRole.objects.create(user=user, role=role)
+    return user, user_role
+
+
+def create_benchmark_profile(size: int, number: int = 0):
+    """Create a profile of `size` with an address and phone unique to `number`.
+
+    Returns the user, a user role, a CV language and a queryset of 10 user skills,
+    i.e. the arguments `User.generate_cv` expects.
+    """
+    user, user_role = create_profile(
+        size, email=f'synthetic{number}-{size}@example.com', tel=f'+5519{number:04d}{size:04d}', password=None,
+    )
+    cv_language, _ = CVLanguage.objects.get_or_create(language=CVLanguage.LanguageEnum.EN)
+    return user, user_role, cv_language, user.skills.all()
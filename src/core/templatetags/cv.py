@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.fragments import SECTIONS
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cv_section(context, name):
+    """Output the pre-rendered fragment of a CV section, or render its partial from the context."""
+    fragments = context.get('fragments') or {}
+    if name in fragments:
+        return fragments[name]
+    return mark_safe(context.template.engine.get_template(SECTIONS[name]).render(context))
@@ -1,3 +1,1542 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import signal
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from copy import deepcopy
+from datetime import date, timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from itertools import count
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlencode
+from uuid import UUID, uuid4
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import CommandError, call_command
+from django.core.cache.backends.filebased import FileBasedCache
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (AsyncRequestFactory, RequestFactory, SimpleTestCase,
+                         TestCase, TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import override
+
+from core import jobs, metrics, views
+from core.admission import AdmissionController, RenderRejected, admission
+from core.assets import FONT_URLS, AssetNotAvailable, AssetStore
+from core.context import (CV_CONTEXT_QUERIES, build_cv_context,
+                          section_querysets)
+from core.forms import GenerateForm
+from core.fragments import fragment_cache
+from core.indexes import prefix_index
+from core.models import (Brief, City, Company, Country, Cv, CvArtifact,
+                         CvJob, CVLanguage, Education, Experience,
+                         ExperienceCompany, ExperienceRole, Language, Role,
+                         Skill, SocialNetwork, User, UserSocialNetwork)
+from core.middleware import AdmissionMiddleware, ServerTimingMiddleware
+from core.offload import RenderOffloader, render_offloader
+from core.pdf_cache import file_digest, fingerprint, pdf_cache, version_tag
+from core.render_engine import RenderEngine
+from core.references import REFERENCE_MODELS, ReferenceCache, reference_cache
+from core.rendering import RenderAssets, RenderOutput
+from core.resumes import export_resumes, import_resumes
+from core.single_flight import SingleFlight, single_flight
+from core.synthetic import create_profile
+
+
+def warm_reference_cache():
+    for model in REFERENCE_MODELS:
+        reference_cache.rows(model)
+
+
+class TemporaryCvCacheMixin:
+    """Point the fragment and reference caches at a `cv` cache in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cv_cache = FileBasedCache(directory.name, {})
+        for module in ('core.fragments', 'core.references'):
+            patcher = mock.patch(f'{module}.caches', {'cv': self.cv_cache})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class RenderSettingsMixin:
+    """Keep the files written by renders in a temporary directory, and renders off the network."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name)
+        rendering = self.settings(
+            CV_PDF_CACHE_DIR=path / 'pdf_cache',
+            CV_ADMISSION_DIR=path / 'admission',
+            CV_SINGLE_FLIGHT_DIR=path / 'single_flight',
+            CV_ASSET_DIR=path / 'assets',
+            CV_ASSET_OFFLINE=True,
+            CV_ARTIFACT_STORAGE_OPTIONS={'location': path / 'cvs'},
+        )
+        rendering.enable()
+        self.addCleanup(rendering.disable)
+
+    def generate_params(self, user, role):
+        language, _ = CVLanguage.objects.get_or_create(language=CVLanguage.LanguageEnum.EN)
+        return {
+            'language': language.pk,
+            'role': role.pk,
+            'brief': 'Brief',
+            'skills': list(user.skills.values_list('pk', flat=True)),
+            'company_name': 'Acme',
+            'company_brief': 'Anvils',
+        }
+
+
+class RenderAssetsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'styles.css')
+        with open(self.path, 'w') as file:
+            file.write('body { color: black; }')
+        self.assets = RenderAssets([self.path])
+
+    def test_parsed_stylesheets_are_reused(self):
+        stylesheets, font_config = self.assets.get()
+        self.assertEqual(self.assets.get(), (stylesheets, font_config))
+        self.assertEqual(self.assets.stats()['reloads'], 1)
+        self.assertEqual(self.assets.stats()['hits'], 1)
+
+    def test_touched_file_is_not_parsed_again(self):
+        stylesheets, _ = self.assets.get()
+        os.utime(self.path, ns=(0, 0))
+        self.assertIs(self.assets.get()[0], stylesheets)
+        self.assertEqual(self.assets.stats()['reloads'], 1)
+
+    def test_changed_file_is_parsed_again(self):
+        stylesheets, _ = self.assets.get()
+        digest = self.assets.digest
+        with open(self.path, 'w') as file:
+            file.write('body { color: white; }')
+        os.utime(self.path, ns=(0, 0))
+        self.assertIsNot(self.assets.get()[0], stylesheets)
+        self.assertNotEqual(self.assets.digest, digest)
+        self.assertEqual(self.assets.stats()['reloads'], 2)
+
+
+class RenderOutputTests(SimpleTestCase):
+    def test_spills_once_above_max_size(self):
+        before = RenderOutput.stats()
+        with RenderOutput(max_size=4) as output:
+            output.write(b'%PDF')
+            self.assertFalse(output.spilled)
+            output.write(b'-1.7')
+            output.write(b'%%EOF')
+            self.assertTrue(output.spilled)
+            output.seek(0)
+            self.assertEqual(output.read(), b'%PDF-1.7%%EOF')
+        after = RenderOutput.stats()
+        self.assertEqual(after['spills'] - before['spills'], 1)
+        self.assertEqual(after['spilled_bytes'] - before['spilled_bytes'], 8)
+
+
+class AssetStoreTests(SimpleTestCase):
+    URL = 'https://fonts.example.com/inter.woff2'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = self.settings(
+            CV_ASSET_DIR=Path(directory.name), CV_ASSET_OFFLINE=False, CV_ASSET_TTL=60, CV_ASSET_RETRY_AFTER=60,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.store = AssetStore()
+
+    def age(self, url, seconds):
+        when = time.time() - seconds
+        for path in self.store.paths_for(url) + (self.store.failure_path(url),):
+            if path.exists():
+                os.utime(path, (when, when))
+
+    def test_expired_entry_is_served_without_the_network(self):
+        self.store.save(self.URL, b'font', 'font/woff2')
+        self.age(self.URL, 120)
+        with mock.patch.object(self.store, 'download') as download:
+            self.assertEqual(self.store.fetch(self.URL)['string'], b'font')
+        download.assert_not_called()
+        self.assertEqual(self.store.stats()['stale'], 1)
+
+    def test_failed_download_is_not_retried_until_retry_after(self):
+        with mock.patch.object(self.store, 'download', side_effect=OSError('unreachable')) as download:
+            with self.assertRaises(OSError):
+                self.store.fetch(self.URL)
+            with self.assertRaises(AssetNotAvailable):
+                self.store.fetch(self.URL)
+            self.assertEqual(download.call_count, 1)
+            self.age(self.URL, 120)
+            with self.assertRaises(OSError):
+                self.store.fetch(self.URL)
+            self.assertEqual(download.call_count, 2)
+        self.assertEqual(self.store.stats()['failures'], 2)
+
+    def test_stored_entry_clears_the_failure(self):
+        self.store.record_failure(self.URL)
+        self.store.save(self.URL, b'font', 'font/woff2')
+        self.assertFalse(self.store.failed_recently(self.URL))
+
+    @override_settings(CV_ASSET_OFFLINE=True)
+    def test_offline_never_downloads(self):
+        with mock.patch.object(self.store, 'download') as download:
+            with self.assertRaises(AssetNotAvailable):
+                self.store.fetch(self.URL)
+        download.assert_not_called()
+
+
+class FetchAssetsCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = self.settings(CV_ASSET_DIR=Path(directory.name), CV_ASSET_TTL=60)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_fresh_entries_are_skipped_unless_forced(self):
+        with mock.patch('core.management.commands.fetch_assets.asset_store', AssetStore()) as store:
+            for url in FONT_URLS:
+                store.save(url, b'', 'text/css')
+            with mock.patch.object(store, 'populate') as populate:
+                call_command('fetch_assets', stdout=StringIO())
+                populate.assert_not_called()
+                call_command('fetch_assets', '--force', stdout=StringIO())
+                self.assertEqual(populate.call_count, len(FONT_URLS))
+
+    def test_failures_raise_command_error(self):
+        with mock.patch('core.assets.AssetStore.populate', side_effect=OSError('unreachable')):
+            with self.assertRaises(CommandError):
+                call_command('fetch_assets', '--force', stdout=StringIO(), stderr=StringIO())
+
+
+class PdfFingerprintTests(TestCase):
+    def setUp(self):
+        self.user, self.role = create_profile(1)
+        self.language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+
+    def fingerprint(self):
+        return fingerprint(self.user, self.language, self.role, 'Brief', self.user.skills.all(), 'Acme', 'Anvils')
+
+    def version_tag(self):
+        return version_tag(self.user, self.language, self.role, 'Brief', self.user.skills, 'Acme', 'Anvils')
+
+    def test_stable_for_an_unchanged_profile(self):
+        self.assertEqual(self.fingerprint(), self.fingerprint())
+
+    def test_shared_row_changes_change_the_key(self):
+        changes = [
+            (Role.objects.get(name='Backend developer'), 'name', 'Backend engineer'),
+            (ExperienceCompany.objects.get(name='Company 0'), 'name', 'Renamed company'),
+            (ExperienceRole.objects.get(name='Developer 0'), 'name', 'Engineer 0'),
+            (Language.objects.get(name='Language 0'), 'name', 'Renamed language'),
+            (City.objects.get(name='Campinas'), 'name', 'Sumaré'),
+            (SocialNetwork.objects.get(name='Network 0'), 'icon_url', 'https://network0.com/new-icon.png'),
+        ]
+        for row, field, value in changes:
+            with self.subTest(model=type(row).__name__):
+                key = self.fingerprint()
+                setattr(row, field, value)
+                row.save()
+                self.assertNotEqual(self.fingerprint(), key)
+
+    def test_section_template_changes_change_the_keys(self):
+        partial = get_template('cv/_experiences.html').origin.name
+        keys = self.fingerprint(), self.version_tag(), fragment_cache.keys(self.user.pk, 'en-us')
+        real_digest = file_digest
+
+        def edited(path):
+            return 'edited' if str(path) == partial else real_digest(path)
+
+        with mock.patch('core.pdf_cache.file_digest', side_effect=edited):
+            changed = self.fingerprint(), self.version_tag(), fragment_cache.keys(self.user.pk, 'en-us')
+        for key, changed_key in zip(keys, changed):
+            self.assertNotEqual(changed_key, key)
+
+
+class CvJobTests(RenderSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.role = create_profile(1)
+        self.language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+        self.client.force_login(self.user)
+
+    def enqueue(self):
+        return jobs.enqueue(self.user, self.language, self.role, 'Brief', self.user.skills.all(), 'Acme', 'Anvils')
+
+    def test_jobs_are_claimed_once_in_order(self):
+        first, second = self.enqueue(), self.enqueue()
+        self.assertEqual(jobs.claim_next(), first)
+        claimed = jobs.claim_next()
+        self.assertEqual(claimed, second)
+        self.assertEqual(claimed.status, CvJob.StatusEnum.RUNNING)
+        self.assertIsNone(jobs.claim_next())
+
+    def test_run_stores_the_pdf(self):
+        self.enqueue()
+        job = jobs.run(jobs.claim_next())
+        self.assertEqual(job.status, CvJob.StatusEnum.DONE)
+        self.assertTrue(job.artifact.file.read().startswith(b'%PDF'))
+        self.assertEqual(Cv.objects.get().artifact, job.artifact)
+
+    def test_failure_is_logged_not_shown(self):
+        self.enqueue()
+        with mock.patch.object(User, 'generate_cv', side_effect=OSError('/srv/secret/path')), \
+                self.assertLogs('core.jobs', 'ERROR') as logs:
+            job = jobs.run(jobs.claim_next())
+        self.assertEqual(job.status, CvJob.StatusEnum.FAILED)
+        self.assertEqual(job.error, jobs.FAILED_ERROR)
+        self.assertIn('/srv/secret/path', logs.output[0])
+        self.assertNotIn('secret', json.dumps(jobs.describe(job), default=str))
+
+    def test_rejected_render_is_queued_again(self):
+        self.enqueue()
+        with mock.patch.object(User, 'generate_cv', side_effect=RenderRejected(5)):
+            job = jobs.run(jobs.claim_next())
+        self.assertEqual(job.status, CvJob.StatusEnum.QUEUED)
+        self.assertEqual(jobs.claim_next(), job)
+
+    def test_rejected_renders_write_nothing(self):
+        self.enqueue()
+        with mock.patch.object(admission, 'admit', side_effect=RenderRejected(5)):
+            for _ in range(3):
+                job = jobs.run(jobs.claim_next())
+            response = self.client.post(reverse('home'), self.generate_params(self.user, self.role))
+        self.assertEqual(job.status, CvJob.StatusEnum.QUEUED)
+        self.assertEqual(response.status_code, 503)
+        for model in (Company, Brief, Cv, CvArtifact):
+            with self.subTest(model=model.__name__):
+                self.assertFalse(model.objects.exists())
+
+    def test_stale_jobs_are_queued_again(self):
+        job = self.enqueue()
+        jobs.claim_next()
+        self.assertEqual(jobs.requeue_stale(timezone.now() - timedelta(minutes=1)), 0)
+        self.assertEqual(jobs.requeue_stale(timezone.now() + timedelta(minutes=1)), 1)
+        self.assertEqual(jobs.claim_next(), job)
+
+    def test_job_views(self):
+        response = self.client.post(reverse('cv_jobs'), self.generate_params(self.user, self.role))
+        self.assertEqual(response.status_code, 202)
+        created = response.json()
+        self.assertEqual(self.client.get(created['status_url']).json()['status'], CvJob.StatusEnum.QUEUED)
+        self.assertEqual(self.client.get(created['download_url']).status_code, 404)
+
+        jobs.run(jobs.claim_next())
+        self.assertEqual(self.client.get(created['status_url']).json()['status'], CvJob.StatusEnum.DONE)
+        response = self.client.get(created['download_url'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(self.client.get(created['download_url'], HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        other, _ = create_profile(1, email='other@doe.com', tel='+5511900000001')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(created['status_url']).status_code, 404)
+
+
+class RunCvWorkerTests(RenderSettingsMixin, TransactionTestCase):
+    def test_once_drains_the_queue(self):
+        user, role = create_profile(1)
+        language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+        for _ in range(3):
+            jobs.enqueue(user, language, role, 'Brief', user.skills.all(), 'Acme', 'Anvils')
+        stdout = StringIO()
+        # SQLite's shared in-memory test database locks whole tables between threads.
+        concurrency = '1' if connection.vendor == 'sqlite' else '2'
+        call_command('run_cv_worker', '--once', '--concurrency', concurrency, stdout=stdout)
+        self.assertEqual(jobs.stats()[CvJob.StatusEnum.DONE], 3, stdout.getvalue())
+        self.assertEqual(stdout.getvalue().count(' done '), 3)
+
+
+class GenerateCvsCommandTests(RenderSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.role = create_profile(1)
+        CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.spec = Path(directory.name) / 'spec.csv'
+        self.output = Path(directory.name) / 'cvs.zip'
+
+    def generate(self, *rows, processes='0'):
+        header = 'email,company_name,company_brief,brief,roles,languages,skills\n'
+        self.spec.write_text(header + ''.join(f'{row}\n' for row in rows))
+        call_command('generate_cvs', str(self.spec), '--output', str(self.output), '--processes', processes, stdout=StringIO())
+
+    @override_settings(CV_RENDER_POOL_START_METHOD='fork', CV_RENDER_POOL_MAX_TASKS=0)
+    def test_renders_through_the_engine_pool(self):
+        with mock.patch.object(RenderEngine, '_render_pooled', autospec=True, side_effect=RenderEngine._render_pooled) as pooled:
+            self.generate('jon@doe.com,Acme,Anvils,Brief,,,', processes='1')
+        self.assertEqual(pooled.call_count, Cv.objects.count())
+        with zipfile.ZipFile(self.output) as archive:
+            self.assertEqual(len(archive.namelist()), Cv.objects.count())
+
+    def test_cvs_keep_their_pdf(self):
+        self.generate('jon@doe.com,Acme,Anvils,Brief,,,')
+        with zipfile.ZipFile(self.output) as archive:
+            pdfs = sorted(archive.read(name) for name in archive.namelist())
+        cvs = Cv.objects.select_related('artifact')
+        self.assertEqual(sorted(cv.artifact.file.read() for cv in cvs), pdfs)
+
+    def test_user_whose_first_row_matches_no_role(self):
+        self.generate('jon@doe.com,Acme,Anvils,Brief,Frontend developer,,', 'jon@doe.com,Acme,Anvils,Brief,,,Skill 1')
+        self.assertEqual(list(Cv.objects.values_list('skills__name', flat=True)), ['Skill 1'])
+
+    def test_unknown_skill_is_an_error(self):
+        with self.assertRaisesMessage(CommandError, 'Line 2: jon@doe.com has no skills Cooking'):
+            self.generate('jon@doe.com,Acme,Anvils,Brief,,,Skill 1;Cooking')
+        self.assertFalse(Cv.objects.exists())
+
+
+def hanging_render(context, language):
+    time.sleep(60)
+
+
+# Forked workers inherit the test settings, which keep renders off the network.
+@override_settings(CV_RENDER_POOL_SIZE=1, CV_RENDER_POOL_START_METHOD='fork', CV_RENDER_POOL_MAX_TASKS=0)
+class RenderEngineTests(RenderSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        user, role = create_profile(1)
+        self.context = build_cv_context(user, role, 'Brief', user.skills.all())
+        self.engine = RenderEngine()
+        self.addCleanup(self.engine.close)
+
+    def worker_pid(self):
+        return self.engine._get_pool().submit(os.getpid).result()
+
+    def test_workers_are_reused(self):
+        pid = self.worker_pid()
+        for _ in range(2):
+            self.assertTrue(self.engine.render(self.context, 'en-us').startswith(b'%PDF'))
+        self.assertEqual(self.worker_pid(), pid)
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(self.engine.stats()['pooled'], 2)
+
+    def test_crashed_worker_is_replaced(self):
+        pid = self.worker_pid()
+        os.kill(pid, signal.SIGKILL)
+        self.assertTrue(self.engine.render(self.context, 'en-us').startswith(b'%PDF'))
+        self.assertNotEqual(self.worker_pid(), pid)
+        self.assertEqual(self.engine.stats()['restarts'], 1)
+
+    def test_timed_out_render_frees_its_worker(self):
+        pid = self.worker_pid()
+        with mock.patch('core.render_engine.render_timed', hanging_render), self.settings(CV_RENDER_TIMEOUT=0.5):
+            with self.assertRaises(FutureTimeoutError):
+                self.engine.render(self.context, 'en-us')
+        self.assertTrue(self.engine.render(self.context, 'en-us').startswith(b'%PDF'))
+        self.assertNotEqual(self.worker_pid(), pid)
+        self.assertEqual(self.engine.stats()['restarts'], 1)
+
+    @override_settings(CV_RENDER_POOL_SIZE=0)
+    def test_size_zero_renders_in_process(self):
+        self.assertTrue(self.engine.render(self.context, 'en-us').startswith(b'%PDF'))
+        self.assertIsNone(self.engine._pool)
+
+    def test_render_to_writes_into_the_output(self):
+        for size in (0, 1):
+            with self.subTest(size=size), self.settings(CV_RENDER_POOL_SIZE=size), RenderOutput() as output:
+                self.engine.render_to(self.context, 'en-us', output)
+                output.seek(0)
+                self.assertTrue(output.read().startswith(b'%PDF'))
+
+
+def observations(histogram, **labels):
+    key = tuple(labels.get(name, '') for name in histogram.labelnames)
+    return sum(histogram._series.get(key, ([], 0.0))[0])
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_exposition(self):
+        registry = metrics.Registry()
+        histogram = registry.histogram('cv_test_seconds', 'Test', buckets=(1, 5), labelnames=['stage'])
+        histogram.observe(0.5, stage='layout')
+        histogram.observe(2, stage='layout')
+        registry.collector(lambda: [('cv_test_total', 'counter', 'Test counter', 3)])
+        self.assertEqual(registry.expose().splitlines(), [
+            '# HELP cv_test_seconds Test',
+            '# TYPE cv_test_seconds histogram',
+            'cv_test_seconds_bucket{stage="layout",le="1.0"} 1',
+            'cv_test_seconds_bucket{stage="layout",le="5.0"} 2',
+            'cv_test_seconds_bucket{stage="layout",le="+Inf"} 2',
+            'cv_test_seconds_sum{stage="layout"} 2.5',
+            'cv_test_seconds_count{stage="layout"} 2',
+            '# HELP cv_test_total Test counter',
+            '# TYPE cv_test_total counter',
+            'cv_test_total 3',
+        ])
+
+    def test_stages_are_timed_per_thread(self):
+        metrics.reset()
+        with metrics.stage('layout'):
+            pass
+        thread = threading.Thread(target=metrics.record, args=('pdf', 1.0))
+        thread.start()
+        thread.join()
+        self.assertEqual(list(metrics.timings()), ['layout'])
+
+
+class ServerTimingMiddlewareTests(SimpleTestCase):
+    def test_timed_stages_are_reported(self):
+        def view(request):
+            metrics.record('layout', 0.25)
+            return HttpResponse()
+
+        response = ServerTimingMiddleware(view)(RequestFactory().get('/'))
+        self.assertRegex(response['Server-Timing'], r'^layout;dur=250\.0, total;dur=[\d.]+$')
+
+    def test_untimed_requests_have_no_header(self):
+        metrics.record('layout', 0.25)
+        response = ServerTimingMiddleware(lambda request: HttpResponse())(RequestFactory().get('/'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class MetricsViewTests(RenderSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.role = create_profile(1)
+        self.language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+
+    def generate(self):
+        with self.user.generate_cv(self.language, self.role, 'Brief', self.user.skills.all(), 'Acme', 'Anvils'):
+            pass
+
+    def test_every_generation_is_observed(self):
+        series = [
+            (histogram, outcome)
+            for histogram in (metrics.render_seconds, metrics.render_queries)
+            for outcome in ('rendered', 'cached', 'failed')
+        ]
+        before = {(histogram, outcome): observations(histogram, outcome=outcome) for histogram, outcome in series}
+        self.generate()
+        self.generate()
+        with mock.patch('core.models.fingerprint', return_value='other'), \
+                mock.patch('core.models.render_engine.render_to', side_effect=OSError), self.assertRaises(OSError):
+            self.generate()
+        for histogram, outcome in series:
+            with self.subTest(histogram=histogram.name, outcome=outcome):
+                self.assertEqual(observations(histogram, outcome=outcome), before[histogram, outcome] + 1)
+
+    def test_exposed_to_allowed_addresses_only(self):
+        self.generate()
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('cv_render_seconds_count{outcome="rendered"}', response.content.decode())
+        self.assertIn('cv_renders_total ', response.content.decode())
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code, 404)
+
+
+class SeedSyntheticTests(TestCase):
+    def seed(self, seed, **options):
+        options = {
+            'users': 3, 'cvs': 4, 'countries': 1, 'states_per_country': 1, 'cities_per_state': 1,
+            'processes': 1, 'shared_password': True, **options,
+        }
+        call_command('seed_synthetic', seed=seed, stdout=StringIO(), **options)
+
+    def test_seeds_the_requested_rows(self):
+        self.seed(1)
+        self.assertEqual(User.objects.filter(email__startswith='seed1.').count(), 3)
+        self.assertEqual(Cv.objects.count(), 4)
+
+    def test_seeds_sharing_low_digits_do_not_collide(self):
+        self.seed(1)
+        self.seed(1001)
+        self.assertEqual(User.objects.values('tel').distinct().count(), 6)
+
+    def test_existing_seed_is_refused(self):
+        self.seed(1, users=0)
+        with self.assertRaisesMessage(CommandError, 'Data for seed 1 already exists'):
+            self.seed(1)
+
+    def test_failure_leaves_no_rows(self):
+        with mock.patch('core.management.commands.seed_synthetic.Command.seed_history', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.seed(1)
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Country.objects.exists())
+        self.seed(1)
+
+
+class BuildCvContextTests(TestCase):
+    def assertConstantQueries(self, size):
+        user, role = create_profile(size)
+        warm_reference_cache()
+        with self.assertNumQueries(CV_CONTEXT_QUERIES):
+            context = build_cv_context(user, role, 'Brief', user.skills.all())
+        self.assertEqual(len(context['experiences']), size)
+        self.assertEqual(len(context['skills']), 10)
+        return context
+
+    def test_small_profile(self):
+        self.assertConstantQueries(1)
+
+    def test_large_profile(self):
+        self.assertConstantQueries(25)
+
+    def test_render_issues_no_queries(self):
+        context = self.assertConstantQueries(5)
+        with self.assertNumQueries(0):
+            html = get_template('cv/index.html').render(context)
+        self.assertIn('Company 4', html)
+        self.assertIn('Campinas, Brasil', html)
+
+
+class FragmentCacheTests(TemporaryCvCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.role = create_profile(3)
+        warm_reference_cache()
+
+    def build(self):
+        return build_cv_context(self.user, self.role, 'Brief', self.user.skills.all(), 'en-us')
+
+    def test_cached_sections_skip_queries(self):
+        with self.assertNumQueries(CV_CONTEXT_QUERIES):
+            self.build()
+        hits = fragment_cache.stats()['experiences']['hits']
+        with self.assertNumQueries(CV_CONTEXT_QUERIES - 4):
+            context = self.build()
+        self.assertIn('Company 2', context['fragments']['experiences'])
+        self.assertEqual(fragment_cache.stats()['experiences']['hits'], hits + 1)
+        html = get_template('cv/index.html').render(context)
+        self.assertIn('Company 2', html)
+
+    def test_owned_row_change_invalidates_user(self):
+        self.build()
+        experience = self.user.experiences.first()
+        experience.description = 'Rewritten'
+        experience.save()
+        self.assertIn('Rewritten', self.build()['fragments']['experiences'])
+
+    def test_reference_row_change_invalidates_everyone(self):
+        self.build()
+        company = ExperienceCompany.objects.get(name='Company 1')
+        company.name = 'Renamed company'
+        company.save()
+        self.assertIn('Renamed company', self.build()['fragments']['experiences'])
+
+    def test_generations_do_not_expire(self):
+        fragment_cache.invalidate_user(self.user.pk)
+        fragment_cache.invalidate_all()
+        generations = fragment_cache._generations(self.user.pk)
+        later = time.time() + 2 * 24 * 60 * 60
+        with mock.patch('django.core.cache.backends.filebased.time.time', return_value=later):
+            self.assertEqual(fragment_cache._generations(self.user.pk), generations)
+
+    def test_generation_is_bumped_again_on_commit(self):
+        before = fragment_cache._generations(self.user.pk)[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            fragment_cache.invalidate_user(self.user.pk)
+            self.assertEqual(fragment_cache._generations(self.user.pk)[1], before + 1)
+        self.assertEqual(fragment_cache._generations(self.user.pk)[1], before + 2)
+
+
+class ProfileVersionTests(TestCase):
+    def setUp(self):
+        self.user, self.role = create_profile(2)
+
+    def version(self, user=None):
+        return User.objects.values_list('profile_version', flat=True).get(pk=(user or self.user).pk)
+
+    def test_owned_row_change_bumps_owner(self):
+        before = self.version()
+        skill = self.user.skills.first()
+        skill.delete()
+        self.assertEqual(self.version(), before + 1)
+
+    def test_reference_row_change_bumps_referencing_users(self):
+        other, _ = create_profile(0, email='jane@doe.com', tel='+5511987654321')
+        before, other_before = self.version(), self.version(other)
+        company = ExperienceCompany.objects.get(name='Company 1')
+        company.name = 'Renamed company'
+        company.save()
+        self.assertEqual(self.version(), before + 1)
+        self.assertEqual(self.version(other), other_before)
+
+    def test_login_does_not_bump(self):
+        before = self.version()
+        self.client.login(email='jon@doe.com', password='secret')
+        self.assertEqual(self.version(), before)
+
+    def test_saving_a_stale_instance_keeps_the_bump(self):
+        before = self.version()
+        self.user.skills.first().delete()
+        self.user.first_name = 'John'
+        self.user.save()
+        self.assertEqual(self.version(), before + 2)
+
+
+class CvDownloadTests(RenderSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.role = create_profile(1)
+        self.client.force_login(self.user)
+        self.params = self.generate_params(self.user, self.role)
+
+    def test_home_form_generates_with_a_post(self):
+        self.assertNotContains(self.client.get(reverse('home')), reverse('cv_download'))
+        response = self.client.post(reverse('home'), self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(Cv.objects.count(), 1)
+
+    def test_generated_cv_carries_the_download_validators(self):
+        generated = self.client.post(reverse('home'), self.params)
+        self.assertTrue(generated.has_header('Last-Modified'))
+        response = self.client.get(reverse('cv_download'), self.params, HTTP_IF_NONE_MATCH=generated['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_serves_the_generated_cv_without_rendering(self):
+        self.client.post(reverse('home'), self.params)
+        with mock.patch('core.models.render_engine.render_to') as render_to:
+            response = self.client.get(reverse('cv_download'), self.params)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+            response = self.client.get(reverse('cv_download'), self.params, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+        render_to.assert_not_called()
+        self.assertEqual(Cv.objects.count(), 1)
+
+    def test_cv_never_generated_answers_404(self):
+        response = self.client.get(reverse('cv_download'), self.params)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Company.objects.exists())
+        self.assertFalse(Cv.objects.exists())
+
+
+class CvPreviewTests(RenderSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.role = create_profile(2)
+        self.client.force_login(self.user)
+        self.params = self.generate_params(self.user, self.role)
+
+    def test_renders_html_without_records_or_pdf(self):
+        with mock.patch('core.models.render_engine.render_to') as render_to:
+            response = self.client.get(reverse('cv_preview'), self.params)
+        render_to.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        self.assertContains(response, 'Company 1')
+        self.assertContains(response, 'Skill 3')
+        self.assertFalse(Company.objects.exists())
+        self.assertFalse(Brief.objects.exists())
+        self.assertFalse(Cv.objects.exists())
+
+    def test_company_does_not_change_the_etag(self):
+        etag = self.client.get(reverse('cv_preview'), self.params)['ETag']
+        response = self.client.get(reverse('cv_preview'), {**self.params, 'company_name': 'Other'})
+        self.assertEqual(response['ETag'], etag)
+
+    def test_unmodified_since_answers_304(self):
+        last_modified = self.client.get(reverse('cv_preview'), self.params)['Last-Modified']
+        response = self.client.get(reverse('cv_preview'), self.params, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalid_form_answers_400(self):
+        response = self.client.get(reverse('cv_preview'), {**self.params, 'role': uuid4()})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('cv_preview'))
+        self.assertRedirects(response, f'/login/?next={reverse("cv_preview")}', fetch_redirect_response=False)
+
+
+class ConditionalPreviewTests(TestCase):
+    def setUp(self):
+        self.user, self.role = create_profile(2)
+        self.language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+        self.client.force_login(self.user)
+        self.params = {
+            'language': self.language.pk,
+            'role': self.role.pk,
+            'brief': 'Brief',
+            'skills': list(self.user.skills.values_list('pk', flat=True)),
+            'company_name': 'Acme',
+            'company_brief': 'Anvils',
+        }
+
+    def test_unchanged_profile_answers_304(self):
+        response = self.client.get(reverse('cv_preview'), self.params)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('cv_preview'), self.params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_profile_change_changes_etag(self):
+        etag = self.client.get(reverse('cv_preview'), self.params)['ETag']
+        experience = self.user.experiences.first()
+        experience.description = 'Rewritten'
+        experience.save()
+        response = self.client.get(reverse('cv_preview'), self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class CvArtifactTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storage = self.settings(CV_ARTIFACT_STORAGE_OPTIONS={'location': directory.name})
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.user, self.role = create_profile(1)
+        self.language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+        company = Company.objects.create(name='Acme', brief='Anvils')
+        self.brief = Brief.objects.create(user_role=self.role, company=company, brief='Brief')
+
+    def create_cv(self, content):
+        return Cv.objects.create(
+            user=self.user, cv_language=self.language, role=self.role.role, brief=self.brief,
+            artifact=CvArtifact.objects.store(BytesIO(content)),
+        )
+
+    def test_identical_pdfs_are_stored_once(self):
+        first = self.create_cv(b'%PDF-1.7 same')
+        second = self.create_cv(b'%PDF-1.7 same')
+        self.assertEqual(first.artifact.sha256, second.artifact.sha256)
+        self.assertEqual(CvArtifact.objects.count(), 1)
+        self.assertEqual(first.artifact.file.read(), b'%PDF-1.7 same')
+
+    def test_usage_counts_distinct_artifacts(self):
+        self.create_cv(b'%PDF-1.7 same')
+        self.create_cv(b'%PDF-1.7 same')
+        self.create_cv(b'%PDF-1.7 other')
+        self.assertEqual(CvArtifact.objects.usage(self.user), {'cvs': 3, 'artifacts': 2, 'bytes': 27})
+
+    def test_history_download_serves_stored_bytes(self):
+        cv = self.create_cv(b'%PDF-1.7 stored')
+        self.client.force_login(self.user)
+        url = reverse('cv_history_download', args=[cv.pk])
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.7 stored')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(reverse('cv_history')).json()['usage']['artifacts'], 1)
+
+
+class CvHistoryRecordTests(RenderSettingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.role = create_profile(1)
+        self.language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+
+    def generate(self):
+        return self.user.generate_cv(self.language, self.role, 'Brief', self.user.skills.all(), 'Acme', 'Anvils')
+
+    def test_cv_is_recorded_with_its_pdf(self):
+        for _ in range(2):
+            with self.generate() as pdf:
+                content = pdf.read()
+        cvs = Cv.objects.select_related('artifact', 'brief__company')
+        self.assertEqual(len(cvs), 2)
+        for cv in cvs:
+            self.assertEqual(cv.artifact.file.read(), content)
+            self.assertEqual(cv.brief.company.name, 'Acme')
+            self.assertEqual(cv.skills.count(), 10)
+
+    def test_cv_evicted_after_the_lookup_is_still_served(self):
+        with self.generate() as pdf:
+            content = pdf.read()
+        lookup = pdf_cache.open
+
+        def evicted(key):
+            file = lookup(key)
+            pdf_cache.clear()
+            return file
+
+        with mock.patch.object(pdf_cache, 'open', side_effect=evicted), \
+                mock.patch('core.models.render_engine.render_to') as render_to:
+            with self.generate() as pdf:
+                self.assertEqual(pdf.read(), content)
+        render_to.assert_not_called()
+        self.assertEqual(Cv.objects.count(), 2)
+
+    def test_failed_render_records_nothing(self):
+        with mock.patch('core.models.render_engine.render_to', side_effect=OSError), self.assertRaises(OSError):
+            self.generate()
+        self.assertFalse(Company.objects.exists())
+        self.assertFalse(Brief.objects.exists())
+        self.assertFalse(Cv.objects.exists())
+
+
+class CvFlightRecordTests(RenderSettingsMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.role = create_profile(1)
+        self.language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+
+    def test_flight_followers_record_nothing(self):
+        follower_waiting = threading.Event()
+        lock = single_flight.lock
+
+        def waiting_lock(path, timeout):
+            if timeout > 0:
+                follower_waiting.set()
+            return lock(path, timeout)
+
+        def gated_render(context, language, output):
+            # The leader holds the flight until the identical request queues behind it.
+            self.assertTrue(follower_waiting.wait(10))
+            output.write(b'%PDF-1.7 gated')
+
+        pdfs = []
+
+        def generate():
+            try:
+                with self.user.generate_cv(self.language, self.role, 'Brief', self.user.skills.all(), 'Acme', 'Anvils') as pdf:
+                    pdfs.append(pdf.read())
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=generate) for _ in range(2)]
+        with self.settings(CV_PDF_CACHE_MAX_BYTES=0), mock.patch.object(single_flight, 'lock', side_effect=waiting_lock), \
+                mock.patch('core.models.render_engine.render_to', side_effect=gated_render) as render_to:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(pdfs, [b'%PDF-1.7 gated'] * 2)
+        render_to.assert_called_once()
+        self.assertEqual(Cv.objects.count(), 1)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user, self.role = create_profile(1)
+
+    async def test_anonymous_home_redirects_to_login(self):
+        request = AsyncRequestFactory().get('/')
+        request.user = AnonymousUser()
+        response = await views.async_home(request)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith('/login/'))
+
+    async def test_home_renders_form(self):
+        request = AsyncRequestFactory().get('/')
+        request.user = self.user
+        response = await views.async_home(request)
+        self.assertContains(response, 'Skill 3')
+
+    async def test_login_page(self):
+        request = AsyncRequestFactory().get('/login/')
+        request.user = AnonymousUser()
+        response = await views.async_login_view(request)
+        self.assertContains(response, 'jon@doe.com')
+
+
+class AsgiHomeTests(RenderSettingsMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.role = create_profile(1)
+        self.params = self.generate_params(self.user, self.role)
+
+    async def test_form_posts_to_the_async_view(self):
+        request = AsyncRequestFactory().get('/')
+        request.user = self.user
+        response = await views.async_home(request)
+        self.assertContains(response, 'action=""')
+
+        request = AsyncRequestFactory().post(
+            '/', urlencode(self.params, doseq=True), content_type='application/x-www-form-urlencoded',
+        )
+        request.user = self.user
+        handler = ServerTimingMiddleware(AdmissionMiddleware(views.async_home))
+        with mock.patch.object(render_offloader, 'run', wraps=render_offloader.run) as run:
+            response = await handler(request)
+        run.assert_called_once()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_middleware_stays_async(self):
+        async def view(request):
+            response = HttpResponse()
+            response.timings = {'layout': 0.25}
+            return response
+
+        for middleware in (ServerTimingMiddleware, AdmissionMiddleware):
+            with self.subTest(middleware=middleware.__name__):
+                self.assertTrue(asyncio.iscoroutinefunction(middleware(view)))
+        response = async_to_sync(ServerTimingMiddleware(view))(RequestFactory().get('/'))
+        self.assertTrue(response['Server-Timing'].startswith('layout;dur=250.0, total;dur='))
+        self.assertFalse(asyncio.iscoroutinefunction(ServerTimingMiddleware(lambda request: HttpResponse())))
+
+
+@override_settings(CV_ASYNC_RENDER_CONCURRENCY=2)
+class RenderOffloaderTests(SimpleTestCase):
+    async def test_concurrency_is_bounded(self):
+        offloader = RenderOffloader()
+        self.addCleanup(offloader.shutdown)
+        lock = threading.Lock()
+        current = peak = 0
+
+        def work():
+            nonlocal current, peak
+            with lock:
+                current += 1
+                peak = max(peak, current)
+            time.sleep(0.05)
+            with lock:
+                current -= 1
+            return True
+
+        results = await asyncio.gather(*(offloader.run(work) for _ in range(6)))
+        self.assertEqual(results, [True] * 6)
+        self.assertEqual(peak, 2)
+        self.assertEqual(offloader.stats(), {'waiting': 0, 'running': 0, 'completed': 6})
+
+
+@override_settings(CV_ADMISSION_MAX_RENDERS=2, CV_ADMISSION_MAX_PER_USER=1, CV_ADMISSION_QUEUE_TIMEOUT=0,
+                   CV_ADMISSION_RETRY_AFTER=7)
+class AdmissionControllerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        admission_dir = self.settings(CV_ADMISSION_DIR=directory.name)
+        admission_dir.enable()
+        self.addCleanup(admission_dir.disable)
+        self.admission = AdmissionController()
+
+    def test_per_user_limit(self):
+        with self.admission.admit('jon'):
+            with self.assertRaises(RenderRejected) as raised, self.admission.admit('jon'):
+                pass
+            with self.admission.admit('jane'):
+                self.assertEqual(self.admission.stats()['in_flight'], 2)
+        self.assertEqual(raised.exception.retry_after, 7)
+        with self.admission.admit('jon'):
+            pass
+        self.assertEqual(self.admission.stats(), {'in_flight': 0, 'queued': 0, 'admitted': 3, 'rejected': 1})
+
+    def test_user_lock_files_are_removed(self):
+        with self.admission.admit('jon'), self.admission.admit('jane'):
+            pass
+        self.assertEqual(sorted(path.name for path in self.admission.directory.iterdir()), ['global-0.lock', 'global-1.lock'])
+
+    def test_global_limit_is_shared_between_controllers(self):
+        other_worker = AdmissionController()
+        with self.admission.admit('jon'), other_worker.admit('jane'):
+            with self.assertRaises(RenderRejected), self.admission.admit('joe'):
+                pass
+        with self.admission.admit('joe'):
+            pass
+
+    def test_rejection_answers_503(self):
+        response = AdmissionMiddleware(lambda request: None).process_exception(
+            RequestFactory().post('/'), RenderRejected(7)
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        flight_dir = self.settings(CV_SINGLE_FLIGHT_DIR=directory.name)
+        flight_dir.enable()
+        self.addCleanup(flight_dir.disable)
+        self.directory = directory.name
+
+    def test_identical_calls_share_one_render(self):
+        renders = []
+        started = threading.Event()
+
+        def produce():
+            renders.append(1)
+            started.set()
+            time.sleep(0.2)
+            return BytesIO(b'%PDF-1.7 shared')
+
+        # Separate instances stand for separate worker processes.
+        flights = [SingleFlight() for _ in range(3)]
+        results = [None] * 3
+
+        def call(index):
+            if index:
+                started.wait()
+            with flights[index].run('key', produce) as result:
+                results[index] = result.read()
+
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(results, [b'%PDF-1.7 shared'] * 3)
+        self.assertEqual(sum(flight.stats()['followers'] for flight in flights), 2)
+        self.assertFalse(any(name.endswith('.lock') for name in os.listdir(self.directory)))
+
+    def test_follower_renders_when_leader_fails(self):
+        def fail():
+            raise ValueError('boom')
+
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.run('key', fail)
+        self.assertEqual(flight.run('key', lambda: BytesIO(b'%PDF-1.7 retry')).read(), b'%PDF-1.7 retry')
+
+
+class AdminQueryBudgetTests(TestCase):
+    # Session, user, count and page rows, plus slack for the model's own needs.
+    CHANGELIST_BUDGET = 6
+    CHANGE_FORM_BUDGET = 12
+
+    def setUp(self):
+        user, role = create_profile(2)
+        language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+        jobs.enqueue(user, language, role, 'Brief', user.skills.all(), 'Acme', 'Anvils')
+        admin_user = User.objects.create_superuser(
+            email='admin@doe.com', password='secret', first_name='Ada', middle_name='M', last_name='Admin',
+            birth_date=date(1980, 1, 1), tel='+5511900000000',
+        )
+        self.client.force_login(admin_user)
+        self.models = [model for model in admin.site._registry if model._meta.app_label == 'core']
+        # Measure the same rows before and after adding more rows.
+        self.objects = {model: model.objects.order_by('pk').first() for model in self.models}
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def measure(self):
+        counts = {}
+        for model in self.models:
+            opts = model._meta
+            counts[opts.model_name, 'changelist'] = self.count_queries(
+                reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+            )
+            obj = self.objects[model]
+            if obj is not None:
+                counts[opts.model_name, 'change'] = self.count_queries(
+                    reverse(f'admin:{opts.app_label}_{opts.model_name}_change', args=[obj.pk])
+                )
+        return counts
+
+    def test_queries_do_not_grow_with_rows(self):
+        self.measure()  # Warm the content type cache.
+        small = self.measure()
+        create_profile(8, email='jane@doe.com', tel='+5511987654321')
+        large = self.measure()
+        self.assertEqual(small, large)
+        for (model_name, view), queries in large.items():
+            budget = self.CHANGELIST_BUDGET if view == 'changelist' else self.CHANGE_FORM_BUDGET
+            self.assertLessEqual(queries, budget, f'{model_name} {view}')
+
+
+class AdminAutocompleteTests(TestCase):
+    def setUp(self):
+        create_profile(1)
+        admin_user = User.objects.create_superuser(
+            email='admin@doe.com', password='secret', first_name='Ada', middle_name='M', last_name='Admin',
+            birth_date=date(1980, 1, 1), tel='+5511900000000',
+        )
+        self.client.force_login(admin_user)
+
+    def search(self, model_name, field_name, term):
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'core', 'model_name': model_name, 'field_name': field_name, 'term': term,
+        })
+        self.assertEqual(response.status_code, 200)
+        return [result['text'] for result in response.json()['results']]
+
+    def test_prefix_search(self):
+        self.assertEqual(self.search('user', 'city', 'camp'), ['Campinas'])
+        self.assertEqual(self.search('user', 'city', 'pinas'), [])
+        self.assertEqual(self.search('experience', 'company', 'Company'), ['Company 0'])
+
+    def test_prefix_index_sql(self):
+        # The operator class is PostgreSQL's; other databases index the bare expression when rebuilding a table.
+        sql = str(prefix_index('name_en', 'city_name_en_prefix').create_sql(City, connection.schema_editor(collect_sql=True)))
+        if connection.vendor == 'postgresql':
+            self.assertIn('((UPPER("name_en")) text_pattern_ops)', sql)
+        else:
+            self.assertIn('((UPPER("name_en")))', sql)
+
+    def test_change_form_uses_autocomplete_widgets(self):
+        experience = Experience.objects.get()
+        response = self.client.get(reverse('admin:core_experience_change', args=[experience.pk]))
+        fields = response.context['adminform'].form.fields
+        for name in ('user', 'company', 'role'):
+            self.assertIsInstance(fields[name].widget.widget, AutocompleteSelect)
+
+
+class UuidPrimaryKeyTests(RenderSettingsMixin, TestCase):
+    def test_legacy_ids_are_normalized_consistently(self):
+        migration = import_module('core.migrations.0014_uuid_primary_keys')
+        value = str(uuid4())
+        self.assertEqual(migration.normalize(value), UUID(value).hex)
+        self.assertEqual(migration.normalize('legacy-skill'), migration.normalize('legacy-skill'))
+        self.assertEqual(len(migration.normalize('legacy-skill')), 32)
+
+    def test_job_download_routes_by_uuid(self):
+        user, role = create_profile(1)
+        language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+        job = CvJob.objects.create(
+            user=user, cv_language=language, role=role, status=CvJob.StatusEnum.DONE, finished_at=timezone.now(),
+            artifact=CvArtifact.objects.store(BytesIO(b'%PDF-1.7')),
+        )
+        self.client.force_login(user)
+        url = reverse('cv_job_download', args=[job.pk])
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.7')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(f'/jobs/{job.pk.hex[:8]}/download/').status_code, 404)
+
+
+class UuidPrimaryKeyMigrationTests(TransactionTestCase):
+    migrate_from = [('core', '0013_prefix_search_indexes')]
+    migrate_to = [('core', '0014_uuid_primary_keys')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.addCleanup(lambda: executor.migrate(executor.loader.graph.leaf_nodes()))
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        self.user_id = str(uuid4())
+        user = apps.get_model('core', 'User').objects.create(
+            id=self.user_id, email='jon@doe.com', first_name='Jon', middle_name='Smith', last_name='Doe',
+            birth_date=date(1990, 1, 1), tel='+5511912345678',
+        )
+        skill = apps.get_model('core', 'Skill').objects.create(id='legacy-skill', name='Python')
+        apps.get_model('core', 'UserSkill').objects.create(id='legacy-user-skill', user=user, skill=skill)
+
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        self.apps = executor.loader.project_state(self.migrate_to).apps
+
+    def test_legacy_ids_and_their_references_are_converted(self):
+        migration = import_module('core.migrations.0014_uuid_primary_keys')
+        skill_id = UUID(migration.normalize('legacy-skill'))
+        user_skill = self.apps.get_model('core', 'UserSkill').objects.get()
+        self.assertEqual(user_skill.pk, UUID(migration.normalize('legacy-user-skill')))
+        self.assertEqual(user_skill.user_id, UUID(self.user_id))
+        self.assertEqual(user_skill.skill_id, skill_id)
+        self.assertEqual(self.apps.get_model('core', 'Skill').objects.get(pk=skill_id).name, 'Python')
+
+
+class CvJobArtifactMigrationTests(RenderSettingsMixin, TransactionTestCase):
+    migrate_from = [('core', '0015_hot_path_indexes')]
+    migrate_to = [('core', '0016_cvjob_artifact')]
+
+    def setUp(self):
+        super().setUp()
+        executor = MigrationExecutor(connection)
+        self.addCleanup(lambda: executor.migrate(executor.loader.graph.leaf_nodes()))
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        user = apps.get_model('core', 'User').objects.create(
+            email='jon@doe.com', first_name='Jon', middle_name='Smith', last_name='Doe',
+            birth_date=date(1990, 1, 1), tel='+5511912345678',
+        )
+        role = apps.get_model('core', 'Role').objects.create(name='Backend developer')
+        job = apps.get_model('core', 'CvJob').objects.create(
+            user=user,
+            cv_language=apps.get_model('core', 'CVLanguage').objects.create(language='en-us'),
+            role=apps.get_model('core', 'UserRole').objects.create(user=user, role=role),
+            status='done',
+            pdf=b'%PDF-1.7 job',
+        )
+        self.job_id = job.pk
+
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        self.apps = executor.loader.project_state(self.migrate_to).apps
+        # The cleanup migrates from what is applied now.
+        executor.loader.build_graph()
+
+    def test_job_pdfs_become_artifacts(self):
+        job = self.apps.get_model('core', 'CvJob').objects.select_related('artifact').get(pk=self.job_id)
+        self.assertEqual(job.artifact.size, len(b'%PDF-1.7 job'))
+        with job.artifact.file.open('rb') as file:
+            self.assertEqual(file.read(), b'%PDF-1.7 job')
+
+
+class HotPathIndexTests(TestCase):
+    def setUp(self):
+        self.user, self.role = create_profile(3)
+        company = Company.objects.create(name='Acme', brief='Anvils')
+        self.brief = Brief.objects.create(user_role=self.role, company=company, brief='Brief')
+
+    def assertIndexed(self, queryset, table, ordered=True):
+        """Fail when `queryset` reads `table` without an index, or sorts its rows instead of reading them in order."""
+        if connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            self.assertNotIn(table, re.findall(r'\bSCAN (\w+)', plan), plan)
+            if ordered:
+                self.assertNotIn('TEMP B-TREE', plan)
+        elif connection.vendor == 'postgresql':
+            # The test tables are tiny: rule sequential scans out so the plan shows which indexes can serve.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotRegex(plan, rf'Seq Scan on {table}\b')
+            if ordered:
+                # Plan nodes start a line, or follow an indented '->  ' when nested.
+                self.assertIsNone(re.search(r'(^|->\s+)(Incremental )?Sort\b', plan, re.M), plan)
+        else:
+            self.skipTest(f'No plan assertions for {connection.vendor}')
+
+    def test_profile_sections(self):
+        sections = section_querysets(self.user)
+        self.assertIndexed(sections['experiences'], Experience._meta.db_table)
+        self.assertIndexed(sections['educations'], Education._meta.db_table)
+        # Socials are ordered by the name of their network, which only a sort after the join provides.
+        self.assertIndexed(sections['socials'], UserSocialNetwork._meta.db_table, ordered=False)
+
+    def test_brief_lookup(self):
+        queryset = Brief.objects.filter(user_role=self.role, company=self.brief.company).order_by()
+        self.assertIndexed(queryset, Brief._meta.db_table)
+
+    def test_cv_history(self):
+        queryset = Cv.objects.filter(user=self.user, artifact__isnull=False).select_related('cv_language', 'artifact')
+        self.assertIndexed(queryset, Cv._meta.db_table)
+
+
+RESUME = {
+    'basics': {
+        'name': 'Ada Maria Lovelace', 'label': 'Software Engineer', 'email': 'ada@example.com',
+        'phone': '+55 (11) 98765-4321', 'birthDate': '1990-12-10', 'location': {'city': 'Campinas', 'region': 'SP'},
+        'profiles': [{'network': 'GitHub', 'username': 'ada'}],
+    },
+    'work': [
+        {'name': 'Acme', 'position': 'Engineer', 'startDate': '2015-03', 'endDate': '2018', 'summary': 'Anvils'},
+        {'name': 'Initech', 'position': 'Lead', 'startDate': '2018-04-01'},
+    ],
+    'education': [{'institution': 'Unicamp', 'area': 'Computer Science', 'studyType': 'Bachelor', 'startDate': '2008'}],
+    'skills': [{'name': 'Python', 'keywords': ['Django']}],
+    'languages': [{'language': 'Portuguese', 'fluency': 'Native speaker'}, {'language': 'English', 'fluency': 'C1'}],
+}
+
+
+class ResumeImportTests(TestCase):
+    def setUp(self):
+        create_profile(1)
+        SocialNetwork.objects.create(name='GitHub', base_url='https://github.com', icon_url='https://github.com/icon.png')
+
+    def resume(self, number):
+        resume = deepcopy(RESUME)
+        resume['basics'].update(email=f'ada.{number}@example.com', phone=f'+5519{number:09d}')
+        resume['skills'][0]['keywords'].append(f'Skill {number}')
+        resume['work'][0]['name'] = f'Company {number}'
+        return resume
+
+    def test_import_creates_profile(self):
+        [result] = import_resumes([RESUME], 'en')
+        self.assertTrue(result['created'])
+        user = User.objects.get(email='ada@example.com')
+        self.assertEqual((user.middle_name, user.tel, user.city.name), ('Maria', '+5511987654321', 'Campinas'))
+        self.assertEqual(
+            list(user.experiences.values_list('company__name', 'start_date')),
+            [('Initech', date(2018, 4, 1)), ('Acme', date(2015, 3, 1))],
+        )
+        self.assertEqual(list(user.languages.values_list('level', 'is_native')), [('C2', True), ('C1', False)])
+        self.assertEqual(user.skills.count(), 2)
+        self.assertEqual(user.educations.get().institution.city, user.city)
+        self.assertTrue(UserSocialNetwork.objects.filter(user=user, username='ada').exists())
+
+    def test_import_is_idempotent(self):
+        [first] = import_resumes([RESUME], 'en')
+        version = User.objects.get(email='ada@example.com').profile_version
+        [result] = import_resumes([RESUME], 'en')
+        self.assertFalse(result['created'])
+        self.assertEqual(first['rows'], {
+            'userrole': 1, 'userskill': 2, 'userlanguage': 2, 'experience': 2, 'education': 1, 'usersocialnetwork': 1,
+        })
+        self.assertEqual(result['rows'], dict.fromkeys(first['rows'], 0))
+        user = User.objects.get(email='ada@example.com')
+        self.assertGreater(user.profile_version, version)
+        self.assertEqual((user.experiences.count(), user.skills.count(), Skill.objects.filter(name='Python').count()), (2, 2, 1))
+
+    def test_reference_rows_are_resolved_in_bulk(self):
+        numbers = count()
+
+        def queries(size):
+            resumes = [self.resume(next(numbers)) for _ in range(size)]
+            with CaptureQueriesContext(connection) as captured:
+                results = list(import_resumes(resumes, 'en'))
+            self.assertFalse([result for result in results if 'error' in result])
+            return len(captured.captured_queries)
+
+        queries(1)
+        one, two, five = queries(1), queries(2), queries(5)
+        # Each resume adds its own skill and company: only the per-user inserts grow with the batch.
+        self.assertEqual(five - one, 4 * (two - one))
+
+    def test_names_must_fit_their_columns(self):
+        long_name = deepcopy(RESUME)
+        long_name['basics']['name'] = f'Ada {"M" * 51} Lovelace'
+        resume = deepcopy(RESUME)
+        resume['skills'][0]['keywords'].append('S' * 101)
+        resume['work'][1]['name'] = 'C' * 101
+        first, second = import_resumes([long_name, resume], 'en')
+        self.assertEqual(first['error'], f"basics: middle name {'M' * 50!r}... is longer than 50 characters")
+        self.assertEqual((second['rows']['userskill'], second['rows']['experience']), (2, 1))
+        self.assertEqual([entry.split(':')[0] for entry in second['skipped']], ['work[1]', 'skills[0]'])
+
+    def test_invalid_resume_does_not_stop_the_others(self):
+        incomplete = deepcopy(RESUME)
+        del incomplete['basics']['birthDate']
+        incomplete['basics']['email'] = 'nobody@example.com'
+        results = list(import_resumes([{'basics': {}}, incomplete, RESUME], 'en'))
+        self.assertEqual(results[0], {'error': 'basics.email is required'})
+        self.assertIn('birth_date', results[1]['error'])
+        self.assertTrue(results[2]['created'])
+        self.assertFalse(User.objects.filter(email='nobody@example.com').exists())
+
+    def test_endpoint_requires_staff(self):
+        self.client.force_login(User.objects.get(email='jon@doe.com'))
+        url = reverse('resume_import')
+        self.assertEqual(self.client.post(url, [RESUME], content_type='application/json').status_code, 403)
+        User.objects.filter(email='jon@doe.com').update(is_superuser=True)
+        response = self.client.post(url, RESUME, content_type='application/json')
+        self.assertEqual(response.json()['results'][0]['email'], 'ada@example.com')
+
+
+class ResumeExportTests(TestCase):
+    def setUp(self):
+        create_profile(1)
+        SocialNetwork.objects.create(name='GitHub', base_url='https://github.com', icon_url='https://github.com/icon.png')
+        list(import_resumes([RESUME], 'en'))
+
+    def test_export_round_trips(self):
+        [exported] = export_resumes(User.objects.filter(email='ada@example.com'), 'en')
+        self.assertEqual(exported['basics']['location'], {'city': 'Campinas', 'region': 'SP'})
+        self.assertEqual([work['name'] for work in exported['work']], ['Initech', 'Acme'])
+        self.assertEqual(exported['languages'][0], {'language': 'Portuguese', 'fluency': 'Native speaker'})
+
+        # Usernames are unique per network.
+        exported['basics'].update(email='copy@example.com', phone='+5519900000000')
+        exported['basics']['profiles'][0]['username'] = 'ada-copy'
+        [result] = import_resumes([exported], 'en')
+        self.assertTrue(result['created'])
+        [copy] = export_resumes(User.objects.filter(email='copy@example.com'), 'en')
+        for document in (exported, copy):
+            del document['meta'], document['basics']['email'], document['basics']['phone']
+        self.assertEqual(copy, exported)
+
+    def test_related_rows_are_fetched_per_chunk(self):
+        for number in range(3):
+            create_profile(2, email=f'user{number}@doe.com', tel=f'+55119000000{number:02d}')
+
+        def queries(chunk_size):
+            with CaptureQueriesContext(connection) as captured:
+                documents = list(export_resumes(chunk_size=chunk_size))
+            self.assertEqual(len(documents), User.objects.count())
+            return len(captured.captured_queries)
+
+        # Five users: one chunk, or three chunks of two.
+        self.assertEqual(queries(2) - queries(5), 2 * (queries(5) - 1))
+
+    def test_endpoint_streams_json_lines(self):
+        user = User.objects.get(email='jon@doe.com')
+        self.client.force_login(user)
+        url = reverse('resume_export')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        User.objects.filter(pk=user.pk).update(is_superuser=True)
+        response = self.client.get(url, {'language': 'pt-br'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(sorted(json.loads(line)['basics']['email'] for line in lines), ['ada@example.com', 'jon@doe.com'])
+
+    def test_command_writes_utf8(self):
+        resume = deepcopy(RESUME)
+        resume['basics'].update(name='João Silva Souza', email='joao@example.com', phone='+5519900000001', profiles=[])
+        list(import_resumes([resume], 'en'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'resumes.ndjson'
+            call_command('export_resumes', '--output', str(path), '--email', 'joao@example.com', stderr=StringIO())
+            [line] = path.read_text(encoding='utf-8').splitlines()
+        self.assertEqual(json.loads(line)['basics']['name'], 'João Silva Souza')
+
+
+@override_settings(CV_REFERENCE_CACHE_CHECK_INTERVAL=0)
+class ReferenceCacheTests(TemporaryCvCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        reference_cache.clear()
+        self.user, self.role = create_profile(1)
+        self.language = CVLanguage.objects.create(language=CVLanguage.LanguageEnum.EN)
+
+    def test_lookups_are_dictionary_hits(self):
+        warm_reference_cache()
+        hits = reference_cache.stats()['hits']
+        with self.assertNumQueries(0):
+            self.assertEqual(reference_cache.all(CVLanguage), [self.language])
+            self.assertEqual(reference_cache.get(Role, self.role.role_id).name, 'Backend developer')
+        self.assertGreater(reference_cache.stats()['hits'], hits)
+        # An unknown key may be a row newer than the copy.
+        with self.assertNumQueries(1), self.assertRaises(CVLanguage.DoesNotExist):
+            reference_cache.get(CVLanguage, self.role.role_id)
+
+    def test_generate_form_labels_from_cache(self):
+        warm_reference_cache()
+        # The user's roles and skills, whatever their number.
+        with self.assertNumQueries(2):
+            html = str(GenerateForm(self.user))
+        self.assertIn('Backend developer', html)
+        self.assertIn('Skill 9', html)
+        form = GenerateForm(self.user, {'language': str(uuid4())})
+        self.assertFalse(form.is_valid())
+        self.assertIn('language', form.errors)
+
+    def test_changes_invalidate_every_worker(self):
+        other = ReferenceCache()
+        self.assertEqual([role.name for role in other.all(Role)], ['Backend developer'])
+        role = Role.objects.create(name='Frontend developer')
+        self.assertEqual([role.name for role in other.all(Role)], ['Backend developer', 'Frontend developer'])
+        role.delete()
+        self.assertEqual([role.name for role in other.all(Role)], ['Backend developer'])
+        with override_settings(CV_REFERENCE_CACHE_CHECK_INTERVAL=60):
+            other.all(Role)
+            Role.objects.create(name='Frontend developer')
+            with self.assertNumQueries(0):
+                self.assertEqual(len(other.all(Role)), 1)
+
+    def test_generations_do_not_expire(self):
+        reference_cache.invalidate(Role)
+        generations = ReferenceCache()._current_generations()
+        self.assertGreater(generations[Role], 0)
+        later = time.time() + 2 * 24 * 60 * 60
+        with mock.patch('django.core.cache.backends.filebased.time.time', return_value=later):
+            self.assertEqual(ReferenceCache()._current_generations(), generations)
+
+    def test_tables_are_kept_per_language(self):
+        Skill.objects.filter(name='Skill 0').update(name_pt_br='Zumba')
+        with override('en-us'):
+            self.assertEqual(reference_cache.all(Skill)[0].name, 'Skill 0')
+        with override('pt-br'):
+            self.assertEqual(reference_cache.all(Skill)[-1].name, 'Zumba')
+
+    def test_bulk_imports_invalidate(self):
+        reference_cache.all(Skill)
+        list(import_resumes([RESUME], 'en'))
+        self.assertIn('Django', [skill.name for skill in reference_cache.all(Skill)])
@@ -1,8 +1,24 @@
+from django.conf import settings
 from django.urls import path
 
 from core import views
 
+if settings.CV_ASYNC_VIEWS:
+    login_view, home = views.async_login_view, views.async_home
+else:
+    login_view, home = views.login_view, views.home
+
 urlpatterns = [
-    path('login/', views.login_view, name='login'),
-    path('', views.home, name='home'),
+    path('login/', login_view, name='login'),
+    path('', home, name='home'),
+    path('download/', views.cv_download, name='cv_download'),
+    path('preview/', views.cv_preview, name='cv_preview'),
+    path('jobs/', views.cv_jobs, name='cv_jobs'),
+    path('jobs/<uuid:job_id>/', views.cv_job, name='cv_job'),
+    path('jobs/<uuid:job_id>/download/', views.cv_job_download, name='cv_job_download'),
+    path('cvs/', views.cv_history, name='cv_history'),
+    path('cvs/<uuid:cv_id>/download/', views.cv_history_download, name='cv_history_download'),
+    path('resumes/import/', views.resume_import, name='resume_import'),
+    path('resumes/export/', views.resume_export, name='resume_export'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
@@ -1,10 +1,29 @@
+import json
+from functools import wraps
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
-from django.http import FileResponse
-from django.shortcuts import redirect, render
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.http import (FileResponse, Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import override
+from django.views.decorators.http import require_GET, require_POST
+from modeltranslation.settings import AVAILABLE_LANGUAGES
 
+from core import jobs, metrics
+from core.context import build_cv_context
 from core.forms import GenerateForm, LoginForm
+from core.models import Cv, CvArtifact, CvJob
+from core.offload import render_offloader
+from core.pdf_cache import fingerprint, pdf_cache, version_tag
+from core.resumes import export_resumes, import_resumes
 
 
 # Create your views here.
@@ -20,14 +39,85 @@ def login_view(request):
     return render(request, 'login.html', {'form': form})
 
 
+def async_login_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path(), '/login/')
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def async_login_view(request):
+    form = LoginForm(request.POST or None)
+    if request.method == 'POST':
+        email = request.POST.get('email')
+        password = request.POST.get('password')
+        user = await sync_to_async(authenticate)(request, email=email, password=password)
+        if user is not None:
+            await sync_to_async(login)(request, user)
+            return redirect('home')
+    return await sync_to_async(render)(request, 'login.html', {'form': form})
+
+
+def cv_filename(user, language):
+    return f'{user.first_name} {user.last_name} - {language.language}.pdf'
+
+
+def cv_validators(user, data):
+    """ETag and Last-Modified timestamp of the CV `data` describes, read without rendering it."""
+    etag = version_tag(
+        user,
+        data.get('language'),
+        data.get('role'),
+        data.get('brief'),
+        data.get('skills'),
+        data.get('company_name'),
+        data.get('company_brief'),
+    )
+    return quote_etag(etag), int(user.profile_updated_at.timestamp())
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def home_context(form):
+    return {'form': form, 'async_generation': settings.CV_ASYNC_GENERATION}
+
+
+def enqueue_job(request, data):
+    job = jobs.enqueue(
+        request.user,
+        data.get('language'),
+        data.get('role'),
+        data.get('brief'),
+        data.get('skills'),
+        data.get('company_name'),
+        data.get('company_brief'),
+    )
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'status_url': reverse('cv_job', args=[job.pk]),
+        'download_url': reverse('cv_job_download', args=[job.pk]),
+    }, status=202)
+
+
 @login_required(login_url='/login/')
 def home(request):
     user = request.user
     if request.method == 'POST':
         filled = GenerateForm(user, request.POST)
         if not filled.is_valid():
-            return render(request, 'home.html', {'form': filled})
+            return render(request, 'home.html', home_context(filled))
         data = filled.cleaned_data
+        if settings.CV_ASYNC_GENERATION:
+            return enqueue_job(request, data)
         language = data.get('language')
         role = data.get('role')
         brief = data.get('brief')
@@ -36,8 +126,223 @@ def home(request):
         company_name = data.get('company_name')
         company_brief = data.get('company_brief')
         cv = user.generate_cv(language, role, brief, skills, company_name, company_brief)
-        response = FileResponse(open(cv.name, 'rb'), as_attachment=True, filename=f'{user.first_name} {user.last_name} - {language.language}.pdf')
-        cv.close()
-        return response
+        response = FileResponse(cv, as_attachment=True, filename=cv_filename(user, language))
+        # The same validators `cv_download` answers conditional requests with.
+        return set_validators(response, *cv_validators(user, data))
     form = GenerateForm(user=user)
-    return render(request, 'home.html', {'form': form})
+    return render(request, 'home.html', home_context(form))
+
+
+def generate_timed(user, data):
+    """Generate the CV `data` describes, returning it with the stage timings recorded meanwhile."""
+    metrics.reset()
+    cv = user.generate_cv(
+        data.get('language'),
+        data.get('role'),
+        data.get('brief'),
+        data.get('skills'),
+        data.get('company_name'),
+        data.get('company_brief'),
+    )
+    return cv, dict(metrics.timings())
+
+
+@async_login_required
+async def async_home(request):
+    user = request.user
+    if request.method == 'POST':
+        filled = GenerateForm(user, request.POST)
+        if not await sync_to_async(filled.is_valid)():
+            return await sync_to_async(render)(request, 'home.html', home_context(filled))
+        data = filled.cleaned_data
+        if settings.CV_ASYNC_GENERATION:
+            return await sync_to_async(enqueue_job)(request, data)
+        cv, timings = await render_offloader.run(generate_timed, user, data)
+        response = FileResponse(cv, as_attachment=True, filename=cv_filename(user, data.get('language')))
+        # Rendered in an executor thread, so the middleware cannot see these timings.
+        response.timings = timings
+        return set_validators(response, *await sync_to_async(cv_validators)(user, data))
+    form = GenerateForm(user=user)
+    return await sync_to_async(render)(request, 'home.html', home_context(form))
+
+
+@login_required(login_url='/login/')
+@require_GET
+def cv_download(request):
+    """Download the CV the query describes as generated by the last POST to the home page.
+
+    Nothing is rendered or recorded: CVs no longer in the PDF cache answer 404.
+    """
+    user = request.user
+    filled = GenerateForm(user, request.GET)
+    if not filled.is_valid():
+        return render(request, 'home.html', home_context(filled), status=400)
+    data = filled.cleaned_data
+    language = data.get('language')
+
+    etag, last_modified = cv_validators(user, data)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        cached = pdf_cache.open(fingerprint(
+            user,
+            language,
+            data.get('role'),
+            data.get('brief'),
+            data.get('skills'),
+            data.get('company_name'),
+            data.get('company_brief'),
+        ))
+        if cached is None:
+            raise Http404('This CV has not been generated')
+        response = FileResponse(cached, as_attachment=True, filename=cv_filename(user, language))
+    return set_validators(response, etag, last_modified)
+
+
+@login_required(login_url='/login/')
+@require_GET
+def cv_preview(request):
+    user = request.user
+    filled = GenerateForm(user, request.GET)
+    if not filled.is_valid():
+        return render(request, 'home.html', home_context(filled), status=400)
+    data = filled.cleaned_data
+    language = data.get('language')
+    role = data.get('role')
+    brief = data.get('brief')
+    skills = data.get('skills')
+
+    etag, last_modified = cv_validators(user, {**data, 'company_name': '', 'company_brief': ''})
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        context = build_cv_context(user, role, brief, skills, language.language)
+        with override(language.language):
+            response = render(request, 'cv/index.html', context)
+    return set_validators(response, etag, last_modified)
+
+
+@login_required(login_url='/login/')
+@require_POST
+def cv_jobs(request):
+    filled = GenerateForm(request.user, request.POST)
+    if not filled.is_valid():
+        return JsonResponse({'errors': filled.errors}, status=400)
+    return enqueue_job(request, filled.cleaned_data)
+
+
+@login_required(login_url='/login/')
+@require_GET
+def cv_job(request, job_id):
+    job = get_object_or_404(CvJob, pk=job_id, user=request.user)
+    return JsonResponse(jobs.describe(job))
+
+
+@login_required(login_url='/login/')
+@require_GET
+def cv_job_download(request, job_id):
+    job = get_object_or_404(
+        CvJob.objects.select_related('cv_language', 'artifact'), pk=job_id, user=request.user,
+        status=CvJob.StatusEnum.DONE,
+    )
+    # A finished job's PDF never changes.
+    etag = quote_etag(job.pk.hex)
+    last_modified = int(job.finished_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = FileResponse(
+            job.artifact.file.open('rb'), as_attachment=True, filename=cv_filename(request.user, job.cv_language)
+        )
+    return set_validators(response, etag, last_modified)
+
+
+@login_required(login_url='/login/')
+@require_GET
+def cv_history(request):
+    cvs = Cv.objects.filter(user=request.user, artifact__isnull=False).select_related(
+        'cv_language', 'role', 'brief__company', 'artifact'
+    )
+    return JsonResponse({
+        'usage': CvArtifact.objects.usage(request.user),
+        'cvs': [
+            {
+                'id': cv.pk,
+                'created_at': cv.created_at,
+                'language': cv.cv_language.language,
+                'role': cv.role.name,
+                'company': cv.brief.company.name,
+                'size': cv.artifact.size,
+                'download_url': reverse('cv_history_download', args=[cv.pk]),
+            }
+            for cv in cvs
+        ],
+    })
+
+
+@login_required(login_url='/login/')
+@require_GET
+def cv_history_download(request, cv_id):
+    cv = get_object_or_404(
+        Cv.objects.select_related('cv_language', 'artifact'), pk=cv_id, user=request.user, artifact__isnull=False
+    )
+    # Artifacts are addressed by their content, so their digest is a strong validator.
+    etag = quote_etag(cv.artifact.sha256)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(
+            cv.artifact.file.open('rb'), as_attachment=True, filename=cv_filename(request.user, cv.cv_language)
+        )
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    return response
+
+
+def resume_language(request):
+    language = request.GET.get('language', AVAILABLE_LANGUAGES[0])
+    if language not in AVAILABLE_LANGUAGES:
+        return None
+    return language
+
+
+def invalid_language():
+    return JsonResponse({'errors': {'language': [f'Choose one of {", ".join(AVAILABLE_LANGUAGES)}']}}, status=400)
+
+
+@login_required(login_url='/login/')
+@require_POST
+def resume_import(request):
+    """Import the JSON Resume document, or array of documents, posted as the request body."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    language = resume_language(request)
+    if language is None:
+        return invalid_language()
+    try:
+        data = json.loads(request.body)
+    except ValueError as exc:
+        return JsonResponse({'errors': {'body': [str(exc)]}}, status=400)
+    results = import_resumes(data if isinstance(data, list) else [data], language)
+    return JsonResponse({'results': list(results)})
+
+
+@login_required(login_url='/login/')
+@require_GET
+def resume_export(request):
+    """Stream the resume and CV history of every user as JSON Lines.
+
+    WSGI only: listed in CV_WSGI_ONLY_VIEWS, which `cv_maker.asgi` serves through the WSGI handler.
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+    language = resume_language(request)
+    if language is None:
+        return invalid_language()
+    lines = (json.dumps(document, ensure_ascii=False) + '\n' for document in export_resumes(language=language))
+    response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename="resumes.ndjson"'
+    return response
+
+
+@require_GET
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.CV_METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(metrics.registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
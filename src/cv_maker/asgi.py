@@ -9,8 +9,24 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from django.conf import settings
 from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cv_maker.settings')
+os.environ.setdefault('DJANGO_CV_ASYNC_VIEWS', 'true')
 
-application = get_asgi_application()
+asgi_application = get_asgi_application()
+wsgi_application = WsgiToAsgi(get_wsgi_application())
+wsgi_only_paths = {reverse(name) for name in settings.CV_WSGI_ONLY_VIEWS}
+
+
+async def application(scope, receive, send):
+    """Serve CV_WSGI_ONLY_VIEWS with the WSGI handler, in a thread of their own, and the rest with ASGI."""
+    if scope['type'] == 'http' and scope['path'] in wsgi_only_paths:
+        async with ThreadSensitiveContext():
+            return await wsgi_application(scope, receive, send)
+    return await asgi_application(scope, receive, send)
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'modeltranslation',
     'core',
 ]
@@ -56,6 +57,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.AdmissionMiddleware',
 ]
 
 ROOT_URLCONF = 'cv_maker.urls'
@@ -125,6 +128,98 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# The `cv` cache holds rendered CV fragments and invalidation counters; it must be
+# shared by every worker, so use a file or memcached/redis backend rather than locmem.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'cv': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'tmp' / 'cache',
+    },
+}
+
+
+# CV rendering
+
+# Rendered PDFs are cached on disk keyed by a fingerprint of their inputs.
+# Set CV_PDF_CACHE_MAX_BYTES to 0 to disable the cache.
+CV_PDF_CACHE_DIR = BASE_DIR / 'tmp' / 'pdf_cache'
+CV_PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Size of the process pool rendering PDFs; 0 renders in the request process.
+# Workers are replaced after CV_RENDER_POOL_MAX_TASKS renders (0 keeps them), which needs
+# Python 3.11 and a start method other than 'fork'. Renders running past CV_RENDER_TIMEOUT
+# seconds fail and their worker is terminated.
+CV_RENDER_POOL_SIZE = 0
+CV_RENDER_POOL_MAX_TASKS = 200
+CV_RENDER_POOL_START_METHOD = 'spawn'
+CV_RENDER_TIMEOUT = 120
+
+# Rendered PDFs are kept in memory up to this size before spilling to a temporary file.
+CV_OUTPUT_SPOOL_BYTES = 4 * 1024 * 1024
+
+# Lifetime in seconds of cached CV sections; 0 disables the fragment cache.
+CV_FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Seconds between checks of the shared generations of the reference tables each worker keeps
+# in memory, the longest another worker can serve a changed row; 0 checks on every lookup.
+CV_REFERENCE_CACHE_CHECK_INTERVAL = 5
+
+# Local store of remote fonts and icons used while rendering PDFs, populated by
+# `manage.py fetch_assets`, which refreshes entries older than CV_ASSET_TTL. Renders serve stored
+# entries whatever their age and retry failed downloads after CV_ASSET_RETRY_AFTER seconds.
+# Offline mode never touches the network.
+CV_ASSET_DIR = BASE_DIR / 'tmp' / 'assets'
+CV_ASSET_TTL = 7 * 24 * 60 * 60
+CV_ASSET_RETRY_AFTER = 60 * 60
+CV_ASSET_OFFLINE = False
+
+# Generated PDFs are kept as content-addressed artifacts of their Cv record,
+# in any Django storage backend.
+CV_ARTIFACT_STORAGE = 'django.core.files.storage.FileSystemStorage'
+CV_ARTIFACT_STORAGE_OPTIONS = {'location': BASE_DIR / 'media' / 'cvs'}
+
+# Addresses allowed to scrape the Prometheus metrics at /metrics.
+CV_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# When enabled the home view queues a CvJob instead of rendering inline;
+# run `manage.py run_cv_worker` to drain the queue.
+CV_ASYNC_GENERATION = False
+
+# Serve the home and login pages with async views; enabled by `cv_maker.asgi`.
+# Their renders run in a thread pool, at most CV_ASYNC_RENDER_CONCURRENCY at a time;
+# combine with CV_RENDER_POOL_SIZE to lay out PDFs outside the event loop's process.
+CV_ASYNC_VIEWS = False
+CV_ASYNC_RENDER_CONCURRENCY = 2
+
+# Views streaming rows from the database, which Django 4.1 cannot do under ASGI: it iterates
+# streaming responses inside the event loop, where queries are refused. `cv_maker.asgi` hands
+# their requests to the WSGI handler, run in a thread.
+CV_WSGI_ONLY_VIEWS = ['resume_export']
+
+# Admission control of PDF renders, shared by every worker of the host through lock files.
+# At most CV_ADMISSION_MAX_RENDERS renders run at once, waiting up to CV_ADMISSION_QUEUE_TIMEOUT
+# seconds for a free slot, and CV_ADMISSION_MAX_PER_USER per user. Refused renders get a 503
+# asking to retry after CV_ADMISSION_RETRY_AFTER seconds. 0 disables a limit.
+CV_ADMISSION_DIR = BASE_DIR / 'tmp' / 'admission'
+CV_ADMISSION_MAX_RENDERS = 4
+CV_ADMISSION_MAX_PER_USER = 2
+CV_ADMISSION_QUEUE_TIMEOUT = 10
+CV_ADMISSION_RETRY_AFTER = 5
+
+# Identical renders in flight on the host are coalesced through lock and result files:
+# followers wait up to CV_SINGLE_FLIGHT_TIMEOUT seconds (0 disables coalescing) and
+# published PDFs are removed after CV_SINGLE_FLIGHT_RESULT_TTL seconds.
+CV_SINGLE_FLIGHT_DIR = BASE_DIR / 'tmp' / 'single_flight'
+CV_SINGLE_FLIGHT_TIMEOUT = 120
+CV_SINGLE_FLIGHT_RESULT_TTL = 60
+
 # HERE STARTS DYNACONF EXTENSION LOAD (Keep at the very bottom of settings.py)
 # Read more at https://www.dynaconf.com/django/
 import dynaconf  # noqa